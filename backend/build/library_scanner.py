@@ -3,6 +3,7 @@
 """Scan a library folder for Blender builds.
 
 - Detect build directories containing a Blender executable.
+- Read the executable from the install manifest of downloaded builds.
 - Optionally generate missing `.blinfo` files.
 
 CLI usage:
@@ -13,27 +14,41 @@ from __future__ import annotations
 import json
 import os
 from pathlib import Path
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Optional, Tuple
 
+import backend_path  # noqa: F401
 from info_extractor import extract_and_write, detect_executable
 
+from utils.install_manifest import manifest_executable
+
 
 def iter_build_folders(library_root: Path) -> Iterable[Path]:
     # Scan one level deep: <library_root>/<subfolder>/<build>
     if not library_root.is_dir():
         return []
     for sub in library_root.iterdir():
-        if not sub.is_dir():
+        # Hidden folders hold launcher data (e.g. the shared .blstore), not builds
+        if not sub.is_dir() or sub.name.startswith("."):
             continue
         for build in sub.iterdir():
             if build.is_dir():
                 yield build
 
 
+def manifest_exe_for(build: Path) -> Optional[Path]:
+    # Downloaded builds keep a manifest in the install folder, which is the build
+    # folder itself or its parent (<install>/blender-x.y.z-windows-x64/)
+    for root in (build, build.parent):
+        exe = manifest_executable(root)
+        if exe and (exe.parent == build or build in exe.parents):
+            return exe
+    return None
+
+
 def scan_library(library_root: Path, write_blinfo: bool = False) -> List[dict]:
     results: List[dict] = []
     for build in iter_build_folders(library_root):
-        exe = detect_executable(build)
+        exe = manifest_exe_for(build) or detect_executable(build)
         blinfo = build / ".blinfo"
         has_blinfo = blinfo.is_file()
         has_exe = exe is not None
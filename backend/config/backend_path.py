@@ -0,0 +1,13 @@
+"""
+Import hook for the scripts of this folder
+They are run directly by file path, so only their own folder is on
+sys.path; importing this module first adds backend/ as well, which makes
+the shared helpers importable as ``utils.*``.
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
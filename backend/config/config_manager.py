@@ -3,87 +3,358 @@
 """
 Configuration manager for Blender Launcher.
 Handles CRUD operations on config.json.
+
+The parsed configuration is kept in memory together with a path -> index
+map; the file is only read again when its mtime, size or inode changed.
+Changes go through the config journal (backend/utils/config_journal.py):
+those made within a short window are written together, atomically.
+Each change is checked against the config revision it was planned on;
+if another script committed first, it is planned again on the new data.
+With `--storage sqlite` (or BLENDER_LAUNCHER_CONFIG_STORAGE=sqlite) the
+executables live in config.sqlite3 instead (see library_store.py), migrated
+from config.json on first use; config.json is then an exported snapshot.
+`python config_manager.py bench [entries]` compares cached and uncached
+operations on a synthetic config.
+
+`python config_manager.py serve` stays resident and answers JSON-line
+requests on stdin, for example:
+    {"id": 1, "action": "update-title", "exe_path": "...", "new_title": "..."}
+    {"id": 2, "batch": [{"action": "remove-executable", "exe_path": "..."}, ...]}
+Each response is one JSON line carrying the request id; changes made to
+config.json by other processes are pushed as {"type": "config-changed", ...}.
 """
 
 import json
 import os
 import sys
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
 from pathlib import Path
-from typing import Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import backend_path  # noqa: F401
+from utils.config_journal import (CAS_RETRIES, ConfigConflict, ConfigJournal, apply_op, default_config_path,
+                                  file_stamp, write_snapshot)
+from library_store import LibraryStore, default_db_path
+
+# Changes made within this many seconds are written to config.json together
+DEFAULT_BATCH_WINDOW = 0.05
+# How often serve mode checks config.json for changes made by other processes
+WATCH_INTERVAL = 0.5
+# Storage used when none is given: "json" or "sqlite"
+STORAGE_ENV = 'BLENDER_LAUNCHER_CONFIG_STORAGE'
 
 
 class ConfigManager:
     """Main manager for configuration operations."""
     
-    def __init__(self, config_path: str):
+    def __init__(self, config_path: str, batch_window: float = DEFAULT_BATCH_WINDOW,
+                 storage: Optional[str] = None):
         """
         Initialize the configuration manager.
         
         Args:
             config_path: Path to the config.json file.
+            batch_window: Seconds to wait for more changes before writing (0 = write each change).
+            storage: "json" (default) or "sqlite".
         """
         self.config_path = Path(config_path)
+        # Snapshot of the file as last read or written, and the stat it matched
+        self._config: Optional[Dict] = None
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        # Config revision the snapshot reflects; changes are only recorded on top of it
+        self._revision: Optional[int] = None
+        # Executable path -> index in config['blenders'] (first occurrence wins)
+        self._index: Dict[str, int] = {}
+        # Held while the snapshot changes; the journal's timer thread takes it too
+        self._lock = threading.RLock()
+        self._journal = ConfigJournal(str(self.config_path), batch_window, on_due=self.flush)
+        self.storage = storage or os.environ.get(STORAGE_ENV) or 'json'
+        if self.storage not in ('json', 'sqlite'):
+            raise ValueError(f"Stockage inconnu: {self.storage}")
+        # SQLite mode: the rows are the reference and config.json an export of them
+        self._store: Optional[LibraryStore] = None
+        # SQLite mode: changes not exported to config.json yet, and the export timer
+        self._unexported: List[Dict] = []
+        self._export_timer: Optional[threading.Timer] = None
+        self._data_version: Optional[int] = None
         self.ensure_config_exists()
+        if self.storage == 'sqlite':
+            self._store = LibraryStore(default_db_path(str(self.config_path)))
+            # First use migrates config.json; later, edits made by other scripts are imported
+            self._sync()
     
     def ensure_config_exists(self) -> None:
         """Create config.json if it does not exist."""
         if not self.config_path.exists():
             default_config = {"blenders": []}
-            self.save_config(default_config)
+            # Checked again under the lock: another process may be creating it too
+            try:
+                self._journal.ensure_exists(default_config)
+            except OSError as e:
+                print(f"ERREUR - Impossible de sauvegarder la configuration: {e}", file=sys.stderr)
+    
+    def _reindex(self) -> None:
+        """Rebuild the path -> index map from the snapshot."""
+        self._index = {}
+        for i, blender in enumerate(self._config['blenders']):
+            path = blender.get('path') if isinstance(blender, dict) else None
+            if path is not None and path not in self._index:
+                self._index[path] = i
+    
+    def _adopt(self, config: Dict, stamp: Optional[Tuple[int, int, int]], revision: Optional[int]) -> None:
+        self._config = config
+        self._stamp = stamp
+        self._revision = revision
+        self._reindex()
+    
+    def invalidate(self) -> None:
+        """Drop the snapshot so the next access reads the file again."""
+        with self._lock:
+            self._config = None
+            self._stamp = None
+            self._revision = None
+            self._index = {}
     
     def load_config(self) -> Dict:
         """
         Load configuration from the JSON file.
         
+        The file is only parsed when it changed since the last read or write;
+        otherwise the in-memory snapshot is returned. The snapshot is shared:
+        callers that modify it must call save_config() afterwards.
+        
         Returns:
             Dict: Loaded configuration.
             
         Raises:
             Exception: Raised on read failures or invalid JSON format.
         """
-        try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+        with self._lock:
+            if self._store is not None:
+                self._sync()
+                return self._store.load()
             
-            # Basic validation
-            if not isinstance(config, dict):
-                raise ValueError("Format de configuration invalide")
+            stamp = file_stamp(str(self.config_path))
+            if self._config is not None and stamp is not None and stamp == self._stamp:
+                return self._config
             
-            if 'blenders' not in config:
-                config['blenders'] = []
-            
-            if not isinstance(config['blenders'], list):
-                config['blenders'] = []
+            try:
+                if stamp is None:
+                    raise FileNotFoundError(f"No such file: '{self.config_path}'")
+                # Changes still in the journal (this or another process) are applied on top
+                config, stamp, revision = self._journal.read()
+                self._adopt(config, stamp, revision)
+                return config
                 
-            return config
-            
-        except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
-            print(f"ERREUR - Impossible de charger la configuration: {e}", file=sys.stderr)
-            return {"blenders": []}
+            except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
+                print(f"ERREUR - Impossible de charger la configuration: {e}", file=sys.stderr)
+                self.invalidate()
+                return {"blenders": []}
     
     def save_config(self, config: Dict) -> bool:
         """
         Save configuration to the JSON file.
         
+        The whole configuration replaces the file's content, within the
+        current batch; it is dropped if another program (Electron) writes
+        config.json before the batch is written.
+        
         Args:
             config: Configuration payload to persist.
             
         Returns:
             bool: True on success, False otherwise.
         """
-        try:
-            # Create parent directory when needed
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
+        return self._change({"op": "replace", "config": config})
+    
+    def _change(self, op: Dict) -> bool:
+        """
+        Apply a journal entry to the snapshot and record it for the next write.
+        
+        Args:
+            op: Journal entry (see utils.config_journal.apply_op).
             
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump(config, f, indent=2, ensure_ascii=False)
+        Returns:
+            bool: True on success, False otherwise.
             
+        Raises:
+            ConfigConflict: Another writer committed since the snapshot was read
+                (a whole replacement is recorded regardless).
+        """
+        with self._lock:
+            if self._store is not None:
+                return self._store_change(op)
+            try:
+                if op["op"] == "replace":
+                    revision = self._journal.record([op])
+                    if self._journal.window <= 0:
+                        # Already written by flush(), which drops the snapshot if config.json changed meanwhile
+                        return self._config is not None
+                    self._adopt(json.loads(json.dumps(op["config"])), file_stamp(str(self.config_path)), revision)
+                    return True
+                config = self.load_config()
+                revision = self._revision
+                apply_op(config, op)
+                if op["op"] == "add":
+                    self._index.setdefault(op["entry"].get('path'), len(config['blenders']) - 1)
+                elif op["op"] == "remove":
+                    self._reindex()
+                self._revision = self._journal.record([op], expected_revision=revision)
+                return True
+                
+            except ConfigConflict:
+                self.invalidate()
+                raise
+            except Exception as e:
+                print(f"ERREUR - Impossible de sauvegarder la configuration: {e}", file=sys.stderr)
+                # The snapshot may hold changes that never reached the file
+                self.invalidate()
+                return False
+    
+    def _sync(self) -> bool:
+        """
+        SQLite mode: import config.json when another script changed it.
+        
+        Changes made here but not exported yet are applied again on top of
+        the imported content.
+        
+        Returns:
+            bool: True when config.json was imported.
+        """
+        with self._journal.lock:
+            stamp = file_stamp(str(self.config_path))
+            if stamp == self._store.json_stamp and not self._journal.pending():
+                return False
+            config, stamp, _ = self._journal.read()
+            for op in self._unexported:
+                apply_op(config, op)
+            self._store.replace(config)
+            self._store.json_stamp = stamp
+            return True
+    
+    def _store_change(self, op: Dict) -> bool:
+        try:
+            # Under the config lock, the import and the change are one transaction
+            with self._journal.lock:
+                self._sync()
+                self._store.apply(op)
+                # Writers based on an older revision must read again
+                self._journal.advance()
+            self._unexported.append(op)
+            if self._journal.window <= 0:
+                return self.flush()
+            if self._export_timer is None:
+                self._export_timer = threading.Timer(self._journal.window, self.flush)
+                self._export_timer.daemon = True
+                self._export_timer.start()
             return True
-            
         except Exception as e:
             print(f"ERREUR - Impossible de sauvegarder la configuration: {e}", file=sys.stderr)
             return False
     
+    def export_json(self, path: Optional[str] = None) -> bool:
+        """
+        Write the configuration as JSON (config.json by default) right away.
+        
+        Args:
+            path: Destination; another path leaves config.json untouched.
+            
+        Returns:
+            bool: True on success, False otherwise.
+        """
+        with self._lock:
+            try:
+                if path is not None and os.path.abspath(path) != os.path.abspath(self.config_path):
+                    write_snapshot(path, self.load_config())
+                    return True
+                if self._store is None:
+                    return self.flush()
+                if self._export_timer is not None:
+                    self._export_timer.cancel()
+                    self._export_timer = None
+                with self._journal.lock:
+                    self._sync()
+                    self._store.json_stamp = self._journal.overwrite(self._store.load())
+                    self._unexported = []
+                return True
+            except Exception as e:
+                print(f"ERREUR - Impossible de sauvegarder la configuration: {e}", file=sys.stderr)
+                return False
+    
+    def flush(self) -> bool:
+        """
+        Write pending changes to config.json now instead of at the end of the batch window.
+        
+        Returns:
+            bool: True on success (or nothing pending), False otherwise.
+        """
+        with self._lock:
+            if self._store is not None:
+                return self.export_json() if self._unexported else True
+            try:
+                if self._journal.pending():
+                    self._adopt(*self._journal.commit())
+                return True
+            except Exception as e:
+                print(f"ERREUR - Impossible de sauvegarder la configuration: {e}", file=sys.stderr)
+                self.invalidate()
+                return False
+    
+    def refresh(self) -> bool:
+        """
+        Re-read config.json if another process changed it since the last read or write.
+        
+        Returns:
+            bool: True when the file had changed.
+        """
+        with self._lock:
+            if self._store is not None:
+                # Other managers on the same database, or another script on config.json
+                data_version = self._store.data_version
+                changed = self._sync() or (self._data_version is not None and data_version != self._data_version)
+                self._data_version = self._store.data_version
+                return changed
+            if self._config is not None and file_stamp(str(self.config_path)) == self._stamp:
+                return False
+            self.invalidate()
+            self.load_config()
+            return True
+    
+    def _transact(self, plan: Callable[[], Tuple[Optional[Dict], Dict]]) -> Dict:
+        """
+        Run plan() and record the journal entry it returns; on a conflict, run it again on fresh data.
+        
+        Args:
+            plan: Checks the current configuration and returns (journal entry
+                or None, result). Runs under the manager lock, and under the
+                config lock in SQLite mode.
+            
+        Returns:
+            Dict: Result of the plan that was recorded, or a save error.
+        """
+        for _ in range(CAS_RETRIES):
+            with self._lock, (self._journal.lock if self._store is not None else nullcontext()):
+                op, result = plan()
+                if op is None:
+                    return result
+                try:
+                    if self._change(op):
+                        return result
+                    return {
+                        "success": False,
+                        "error": "Erreur lors de la sauvegarde"
+                    }
+                except ConfigConflict:
+                    # Another script committed since the snapshot was read: check again on its data
+                    continue
+        return {
+            "success": False,
+            "error": "Conflit d'écriture: la configuration est modifiée en continu"
+        }
+    
     def find_executable_index(self, exe_path: str) -> int:
         """
         Find an executable index in configuration.
@@ -94,13 +365,22 @@ class ConfigManager:
         Returns:
             int: Executable index (-1 if not found).
         """
-        config = self.load_config()
-        
-        for i, blender in enumerate(config['blenders']):
-            if blender.get('path') == exe_path:
-                return i
-        
-        return -1
+        with self._lock:
+            if self._store is not None:
+                self._sync()
+                return self._store.index_of(exe_path)
+            self.load_config()
+            return self._index.get(exe_path, -1)
+    
+    def _entry(self, exe_path: str) -> Optional[Dict]:
+        """Configured executable with this path, or None."""
+        with self._lock:
+            if self._store is not None:
+                self._sync()
+                return self._store.get(exe_path)
+            config = self.load_config()
+            index = self._index.get(exe_path)
+            return config['blenders'][index] if index is not None else None
     
     def update_executable_title(self, exe_path: str, new_title: str) -> Dict[str, Union[bool, str]]:
         """
@@ -113,32 +393,26 @@ class ConfigManager:
         Returns:
             Dict: Operation result with success and message.
         """
-        try:
-            config = self.load_config()
-            index = self.find_executable_index(exe_path)
+        def plan():
+            entry = self._entry(exe_path)
             
-            if index == -1:
-                return {
+            if entry is None:
+                return None, {
                     "success": False,
                     "error": f"Exécutable non trouvé: {exe_path}"
                 }
             
-            old_title = config['blenders'][index].get('title', 'Sans titre')
-            config['blenders'][index]['title'] = new_title
-            
-            if self.save_config(config):
-                return {
-                    "success": True,
-                    "message": f"Titre mis à jour: '{old_title}' → '{new_title}'",
-                    "old_title": old_title,
-                    "new_title": new_title,
-                    "updated_executable": config['blenders'][index]
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "Erreur lors de la sauvegarde"
-                }
+            old_title = entry.get('title', 'Sans titre')
+            return {"op": "update", "path": exe_path, "fields": {"title": new_title}}, {
+                "success": True,
+                "message": f"Titre mis à jour: '{old_title}' → '{new_title}'",
+                "old_title": old_title,
+                "new_title": new_title,
+                "updated_executable": dict(entry, title=new_title)
+            }
+        
+        try:
+            return self._transact(plan)
                 
         except Exception as e:
             return {
@@ -154,7 +428,25 @@ class ConfigManager:
             List[Dict]: Configured executables.
         """
         config = self.load_config()
-        return config.get('blenders', [])
+        # A copy, so callers cannot change the cached snapshot behind its index
+        return list(config.get('blenders', []))
+    
+    def find_executables(self, **criteria: str) -> List[Dict]:
+        """
+        Get the executables whose fields match every criterion.
+        
+        Args:
+            **criteria: Field values, e.g. version="4.2.0" or build_hash="a1b2c3".
+            
+        Returns:
+            List[Dict]: Matching executables, in configuration order.
+        """
+        with self._lock:
+            if self._store is not None:
+                self._sync()
+                return self._store.find(**criteria)
+            return [blender for blender in self.load_config()['blenders']
+                    if isinstance(blender, dict) and all(blender.get(k) == v for k, v in criteria.items())]
     
     def add_executable(self, exe_data: Dict) -> Dict[str, Union[bool, str]]:
         """
@@ -166,28 +458,21 @@ class ConfigManager:
         Returns:
             Dict: Operation result.
         """
-        try:
-            config = self.load_config()
-            
+        def plan():
             # Check whether executable already exists
-            if self.find_executable_index(exe_data.get('path', '')) != -1:
-                return {
+            if self._entry(exe_data.get('path', '')) is not None:
+                return None, {
                     "success": False,
                     "error": "Cet exécutable est déjà configuré"
                 }
             
-            config['blenders'].append(exe_data)
-            
-            if self.save_config(config):
-                return {
-                    "success": True,
-                    "message": f"Exécutable ajouté: {exe_data.get('title', exe_data.get('name', 'Sans nom'))}"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "Erreur lors de la sauvegarde"
-                }
+            return {"op": "add", "entry": exe_data}, {
+                "success": True,
+                "message": f"Exécutable ajouté: {exe_data.get('title', exe_data.get('name', 'Sans nom'))}"
+            }
+        
+        try:
+            return self._transact(plan)
                 
         except Exception as e:
             return {
@@ -205,28 +490,22 @@ class ConfigManager:
         Returns:
             Dict: Operation result.
         """
-        try:
-            config = self.load_config()
-            index = self.find_executable_index(exe_path)
+        def plan():
+            removed = self._entry(exe_path)
             
-            if index == -1:
-                return {
+            if removed is None:
+                return None, {
                     "success": False,
                     "error": f"Exécutable non trouvé: {exe_path}"
                 }
             
-            removed = config['blenders'].pop(index)
-            
-            if self.save_config(config):
-                return {
-                    "success": True,
-                    "message": f"Exécutable supprimé: {removed.get('title', removed.get('name', 'Sans nom'))}"
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "Erreur lors de la sauvegarde"
-                }
+            return {"op": "remove", "path": exe_path}, {
+                "success": True,
+                "message": f"Exécutable supprimé: {removed.get('title', removed.get('name', 'Sans nom'))}"
+            }
+        
+        try:
+            return self._transact(plan)
                 
         except Exception as e:
             return {
@@ -235,8 +514,186 @@ class ConfigManager:
             }
 
 
+def benchmark(entries: int = 5000, operations: int = 200) -> Dict[str, Union[int, float]]:
+    """
+    Time lookups and title updates on a synthetic config, with and without the cache.
+    
+    Args:
+        entries: Number of executables in the synthetic config.
+        operations: Number of lookups and of title updates to time.
+        
+    Returns:
+        Dict: Milliseconds per operation for each case.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, 'config.json')
+        paths = [f"C:/Blender/{i}/blender.exe" for i in range(entries)]
+        with open(config_path, 'w', encoding='utf-8') as f:
+            json.dump({"blenders": [
+                {"path": path, "name": "blender.exe", "title": f"Blender {i}", "icon": ""}
+                for i, path in enumerate(paths)
+            ]}, f, indent=2)
+        manager = ConfigManager(config_path)
+        # The same run with every change written on its own
+        unbatched = ConfigManager(config_path, batch_window=0)
+        targets = [paths[(i * 7919) % entries] for i in range(operations)]
+        
+        def per_op(action, uncached: bool = False, owner: Optional[ConfigManager] = None) -> float:
+            owner = owner or manager
+            start = time.perf_counter()
+            for i, path in enumerate(targets):
+                if uncached:
+                    # Behaves like the previous implementation: parse on every access
+                    owner.invalidate()
+                action(i, path)
+            owner.flush()
+            return round((time.perf_counter() - start) * 1000 / operations, 3)
+        
+        def lookup(i, path):
+            manager.find_executable_index(path)
+        
+        def rename(i, path):
+            manager.update_executable_title(path, f"Renamed {i}")
+        
+        def rename_unbatched(i, path):
+            unbatched.update_executable_title(path, f"Unbatched {i}")
+        
+        result = {
+            "entries": entries,
+            "operations": operations,
+            "lookup_ms_uncached": per_op(lookup, True),
+            "lookup_ms_cached": per_op(lookup),
+            "update_title_ms_uncached": per_op(rename, True),
+            "update_title_ms_cached": per_op(rename),
+            "update_title_ms_unbatched": per_op(rename_unbatched),
+        }
+        result["file_writes_batched"] = manager._journal.commits
+        result["file_writes_unbatched"] = unbatched._journal.commits
+        
+        # Same operations on the SQLite storage (migrated from the config above)
+        start = time.perf_counter()
+        sqlite_manager = ConfigManager(config_path, storage='sqlite')
+        result["sqlite_migration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        result["lookup_ms_sqlite"] = per_op(
+            lambda i, path: sqlite_manager.find_executable_index(path), owner=sqlite_manager)
+        result["update_title_ms_sqlite"] = per_op(
+            lambda i, path: sqlite_manager.update_executable_title(path, f"SQLite {i}"), owner=sqlite_manager)
+        result["file_writes_sqlite"] = sqlite_manager._journal.commits
+        sqlite_manager._store.close()
+        return result
+
+
+def handle_request(manager: ConfigManager, request: Dict) -> Dict:
+    """
+    Run one serve-mode request.
+    
+    Args:
+        manager: Configuration manager.
+        request: Decoded request; ``batch`` holds a list of requests that are
+            written to config.json together.
+        
+    Returns:
+        Dict: Operation result (without the request id).
+    """
+    if 'batch' in request:
+        if not isinstance(request['batch'], list):
+            return {"success": False, "error": "'batch' doit être une liste"}
+        # Held for the whole batch so the timer cannot write half of it
+        with manager._lock:
+            results = [handle_request(manager, item) if isinstance(item, dict)
+                       else {"success": False, "error": "Requête invalide"}
+                       for item in request['batch']]
+            flushed = manager.flush()
+        return {"success": flushed and all(r.get("success") for r in results), "results": results}
+    
+    action = request.get('action')
+    try:
+        if action == "update-title":
+            return manager.update_executable_title(request['exe_path'], request['new_title'])
+        if action == "get-executables":
+            return {"success": True, "executables": manager.get_executables()}
+        if action == "add-executable":
+            exe_data = request.get('executable') or {
+                key: request[key] for key in ("path", "name", "title", "icon") if key in request
+            }
+            return manager.add_executable(exe_data)
+        if action == "remove-executable":
+            return manager.remove_executable(request['exe_path'])
+        if action == "find-executables":
+            return {"success": True, "executables": manager.find_executables(**request.get('criteria', {}))}
+        if action == "export-json":
+            return {"success": manager.export_json(request.get('path'))}
+        if action == "flush":
+            return {"success": manager.flush()}
+        if action == "ping":
+            return {"success": True}
+    except KeyError as e:
+        return {"success": False, "error": f"Paramètre manquant: {e.args[0]}"}
+    return {"success": False, "error": f"Action non reconnue: {action}"}
+
+
+def serve(manager: ConfigManager, stdin=None, stdout=None, watch_interval: float = WATCH_INTERVAL) -> None:
+    """
+    Answer JSON-line requests until stdin closes, pushing external config changes.
+    
+    Args:
+        manager: Configuration manager.
+        stdin: Request stream (default: sys.stdin).
+        stdout: Response stream (default: sys.stdout).
+        watch_interval: Seconds between two checks of config.json.
+    """
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    write_lock = threading.Lock()
+    stopped = threading.Event()
+    
+    def send(message: Dict) -> None:
+        with write_lock:
+            stdout.write(json.dumps(message, ensure_ascii=False) + "\n")
+            stdout.flush()
+    
+    def watch() -> None:
+        while not stopped.wait(watch_interval):
+            try:
+                if manager.refresh():
+                    send({"type": "config-changed", "executables": manager.get_executables()})
+            except Exception as e:
+                send({"type": "error", "error": f"Erreur de surveillance: {str(e)}"})
+    
+    manager.load_config()
+    threading.Thread(target=watch, daemon=True).start()
+    send({"type": "ready", "config_path": str(manager.config_path)})
+    try:
+        for line in stdin:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                send({"id": None, "success": False, "error": f"JSON invalide: {str(e)}"})
+                continue
+            if not isinstance(request, dict):
+                send({"id": None, "success": False, "error": "Requête invalide"})
+                continue
+            try:
+                result = handle_request(manager, request)
+            except Exception as e:
+                result = {"success": False, "error": f"Erreur critique: {str(e)}"}
+            send(dict(result, id=request.get('id')))
+    finally:
+        stopped.set()
+        manager.flush()
+
+
 def main():
     """Main CLI entry point."""
+    storage = None
+    if "--storage" in sys.argv:
+        index = sys.argv.index("--storage")
+        storage = sys.argv[index + 1] if index + 1 < len(sys.argv) else ""
+        del sys.argv[index:index + 2]
+    
     if len(sys.argv) < 2:
         print(json.dumps({
             "success": False,
@@ -245,11 +702,14 @@ def main():
         sys.exit(1)
     
     try:
-        config_path = os.path.join(os.path.dirname(__file__), '..', '..', 'config.json')
-        manager = ConfigManager(config_path)
+        manager = ConfigManager(default_config_path(), storage=storage)
         
         action = sys.argv[1]
         
+        if action == "serve":
+            serve(manager)
+            return
+        
         if action == "update-title":
             if len(sys.argv) != 4:
                 result = {
@@ -293,12 +753,25 @@ def main():
                 exe_path = sys.argv[2]
                 result = manager.remove_executable(exe_path)
         
+        elif action == "export-json":
+            result = {
+                "success": manager.export_json(sys.argv[2] if len(sys.argv) > 2 else None)
+            }
+        
+        elif action == "bench":
+            entries = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+            result = {
+                "success": True,
+                "benchmark": benchmark(entries)
+            }
+        
         else:
             result = {
                 "success": False,
                 "error": f"Action non reconnue: {action}"
             }
         
+        manager.flush()
         print(json.dumps(result, ensure_ascii=False, indent=2))
         
     except Exception as e:
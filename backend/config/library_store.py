@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQLite storage for the executables list of config.json.
+
+Optional backend of ConfigManager (`--storage sqlite`) for large shared
+libraries: one row per executable, indexed by path, title, version and
+build hash, so a rename or a removal touches one row instead of rewriting
+the whole list. config.json stays the format the Electron side reads; the
+manager exports it from here and imports it back when another process
+changed it.
+"""
+
+import json
+import os
+import sqlite3
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executables (
+    path TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    name TEXT,
+    title TEXT,
+    icon TEXT,
+    version TEXT,
+    build_hash TEXT,
+    extra TEXT NOT NULL DEFAULT '{}'
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_executables_position ON executables(position);
+CREATE INDEX IF NOT EXISTS idx_executables_title ON executables(title);
+CREATE INDEX IF NOT EXISTS idx_executables_version ON executables(version);
+CREATE INDEX IF NOT EXISTS idx_executables_build_hash ON executables(build_hash);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Entry keys stored in their own (indexed) column; any other key goes to `extra`
+COLUMNS = ('name', 'title', 'icon', 'version', 'build_hash')
+# Keys of config.json other than "blenders"
+META_CONFIG = 'config'
+# Stamp of config.json when it was last imported or exported
+META_JSON_STAMP = 'json_stamp'
+
+
+def default_db_path(config_path: str) -> str:
+    """Database kept next to config.json."""
+    return os.path.join(os.path.dirname(os.path.abspath(config_path)), 'config.sqlite3')
+
+
+class LibraryStore:
+    """Executables of config.json as SQLite rows, in their config order."""
+
+    def __init__(self, db_path: str):
+        """
+        Open (or create) the database.
+
+        Args:
+            db_path: Path of the SQLite file.
+        """
+        self.db_path = db_path
+        parent = os.path.dirname(db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        # Serve mode writes from its batch timer thread; ConfigManager serializes access
+        self.conn = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @staticmethod
+    def _row_values(entry: Dict) -> Tuple:
+        extra = {key: value for key, value in entry.items() if key != 'path' and key not in COLUMNS}
+        return tuple(entry.get(column) for column in COLUMNS) + (json.dumps(extra, ensure_ascii=False),)
+
+    @staticmethod
+    def _entry(row: sqlite3.Row) -> Dict:
+        entry: Dict[str, Any] = {'path': row['path']}
+        for column in COLUMNS:
+            if row[column] is not None:
+                entry[column] = row[column]
+        entry.update(json.loads(row['extra'] or '{}'))
+        return entry
+
+    def get_meta(self, key: str) -> Optional[Any]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row['value']) if row else None
+
+    def set_meta(self, key: str, value: Any) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+
+    @property
+    def json_stamp(self) -> Optional[Tuple[int, ...]]:
+        stamp = self.get_meta(META_JSON_STAMP)
+        return tuple(stamp) if stamp else None
+
+    @json_stamp.setter
+    def json_stamp(self, stamp: Optional[Tuple[int, ...]]) -> None:
+        self.set_meta(META_JSON_STAMP, list(stamp) if stamp else None)
+
+    @property
+    def data_version(self) -> int:
+        """Changes whenever another connection commits to the database."""
+        return self.conn.execute('PRAGMA data_version').fetchone()[0]
+
+    def get(self, path: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT * FROM executables WHERE path = ?", (path,)).fetchone()
+        return self._entry(row) if row else None
+
+    def index_of(self, path: str) -> int:
+        """
+        Index of an executable in the config order.
+
+        Returns:
+            int: Executable index (-1 if not found).
+        """
+        row = self.conn.execute(
+            "SELECT (SELECT COUNT(*) FROM executables WHERE position < e.position) FROM executables e WHERE path = ?",
+            (path,),
+        ).fetchone()
+        return row[0] if row else -1
+
+    def find(self, **criteria: str) -> List[Dict]:
+        """
+        Executables matching every criterion, in config order.
+
+        Args:
+            **criteria: Values for indexed columns (title, version, build_hash...).
+        """
+        unknown = set(criteria) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Colonnes inconnues: {', '.join(sorted(unknown))}")
+        where = " AND ".join(f"{column} = ?" for column in criteria) or "1"
+        rows = self.conn.execute(
+            f"SELECT * FROM executables WHERE {where} ORDER BY position", tuple(criteria.values())
+        )
+        return [self._entry(row) for row in rows]
+
+    def load(self) -> Dict:
+        """The whole configuration, in config.json layout."""
+        config = dict(self.get_meta(META_CONFIG) or {})
+        config['blenders'] = [self._entry(row) for row in self.conn.execute(
+            "SELECT * FROM executables ORDER BY position")]
+        return config
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM executables").fetchone()[0]
+
+    def add(self, entry: Dict) -> bool:
+        """Append an executable; returns False when its path is already listed."""
+        with self.conn:
+            cursor = self.conn.execute(
+                f"""
+                INSERT OR IGNORE INTO executables (path, position, {', '.join(COLUMNS)}, extra)
+                VALUES (?, (SELECT COALESCE(MAX(position), -1) + 1 FROM executables), {', '.join('?' * len(COLUMNS))}, ?)
+                """,
+                (entry.get('path'),) + self._row_values(entry),
+            )
+        return cursor.rowcount > 0
+
+    def update(self, path: str, fields: Dict) -> bool:
+        """Change some fields of an executable, leaving the others untouched."""
+        columns = {key: value for key, value in fields.items() if key in COLUMNS}
+        extra = {key: value for key, value in fields.items() if key not in COLUMNS and key != 'path'}
+        with self.conn:
+            if extra:
+                row = self.conn.execute("SELECT extra FROM executables WHERE path = ?", (path,)).fetchone()
+                if row is None:
+                    return False
+                merged = dict(json.loads(row['extra'] or '{}'), **extra)
+                columns['extra'] = json.dumps(merged, ensure_ascii=False)
+            if not columns:
+                return self.get(path) is not None
+            cursor = self.conn.execute(
+                f"UPDATE executables SET {', '.join(f'{column} = ?' for column in columns)} WHERE path = ?",
+                tuple(columns.values()) + (path,),
+            )
+        return cursor.rowcount > 0
+
+    def remove(self, path: str) -> bool:
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM executables WHERE path = ?", (path,))
+        return cursor.rowcount > 0
+
+    def replace(self, config: Dict) -> None:
+        """Replace every row with the executables of a config.json payload."""
+        rows, seen = [], set()
+        for entry in config.get('blenders', []):
+            path = entry.get('path') if isinstance(entry, dict) else None
+            # The JSON list may hold duplicates; like the path index, the first one wins
+            if path is None or path in seen:
+                continue
+            seen.add(path)
+            rows.append((path, len(rows)) + self._row_values(entry))
+        with self.conn:
+            self.conn.execute("DELETE FROM executables")
+            self.conn.executemany(
+                f"INSERT INTO executables (path, position, {', '.join(COLUMNS)}, extra) "
+                f"VALUES (?, ?, {', '.join('?' * len(COLUMNS))}, ?)",
+                rows,
+            )
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (META_CONFIG, json.dumps({k: v for k, v in config.items() if k != 'blenders'}, ensure_ascii=False)),
+            )
+
+    def apply(self, op: Dict) -> None:
+        """
+        Apply a config journal entry (see utils.config_journal.apply_op) to the rows.
+
+        Args:
+            op: add, update, remove or replace entry.
+        """
+        kind = op.get('op')
+        if kind == 'add':
+            self.add(op.get('entry') or {})
+        elif kind == 'update':
+            self.update(op.get('path'), op.get('fields') or {})
+        elif kind == 'remove':
+            self.remove(op.get('path'))
+        elif kind == 'replace':
+            self.replace(op.get('config') or {})
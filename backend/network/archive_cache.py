@@ -0,0 +1,278 @@
+"""
+Local cache of downloaded build archives
+Verified archives are kept after an install, named by their SHA-256, so
+reinstalling a removed build or installing it on a second library root
+extracts the local copy instead of downloading it again. Lookups match the
+published digest when there is one, the URL otherwise. The cache has a size
+cap (stored in its index, 2 GB by default); the least recently used
+archives are evicted first. Installs and the prefetcher share the cache, so
+every change of the index happens under index.lock.
+
+CLI usage:
+    python backend/network/archive_cache.py list [--cache DIR]
+    python backend/network/archive_cache.py prune [--max-size BYTES] [--cache DIR]
+    python backend/network/archive_cache.py limit <BYTES> [--cache DIR]
+    python backend/network/archive_cache.py remove <sha256|url> [--cache DIR]
+"""
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+import backend_path  # noqa: F401
+from download_verify import file_name
+from http_cache import default_cache_root
+
+from utils.config_journal import FileLock
+
+DEFAULT_MAX_SIZE = 2 * 1024 * 1024 * 1024
+INDEX_NAME = 'index.json'
+LOCK_NAME = 'index.lock'
+# prune() leaves unknown files younger than this alone: they may be downloads
+# (incoming-*, prefetch-*, .part) another process is still writing
+STRAY_AGE = 24 * 60 * 60
+ARCHIVE_SUFFIXES = ('.tar.xz', '.tar.gz', '.tar.bz2', '.tar', '.zip', '.dmg')
+
+ENTRY_FIELDS = ('sha256', 'url', 'size', 'file', 'created', 'last_used')
+
+
+def default_cache_dir() -> str:
+    return os.path.join(default_cache_root(), 'archives')
+
+
+def archive_suffix(url: str) -> str:
+    name = file_name(url).lower()
+    return next((suffix for suffix in ARCHIVE_SUFFIXES if name.endswith(suffix)), '')
+
+
+class CacheEntry:
+    """One cached archive; ``file`` is relative to the cache folder"""
+
+    __slots__ = ENTRY_FIELDS
+
+    def __init__(self, sha256: str, url: str, size: int, file: str,
+                 created: Optional[float] = None, last_used: Optional[float] = None):
+        self.sha256 = sha256
+        self.url = url
+        self.size = size
+        self.file = file
+        self.created = created or time.time()
+        self.last_used = last_used or self.created
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in ENTRY_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CacheEntry':
+        return cls(**{field: data[field] for field in ENTRY_FIELDS if field in data})
+
+
+class ArchiveCache:
+    """Size-capped LRU cache of archives under ``root``
+
+    The index is re-read before every change, since several installs (and
+    the download queue's jobs) may share the cache; each read-modify-write
+    holds the index lock.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or default_cache_dir()
+        self.index_path = os.path.join(self.root, INDEX_NAME)
+        self.lock = FileLock(os.path.join(self.root, LOCK_NAME))
+        self.max_size = DEFAULT_MAX_SIZE
+        self.entries: Dict[str, CacheEntry] = {}
+        self._load()
+
+    def _load(self):
+        self.entries = {}
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        try:
+            self.max_size = int(data.get('max_size') or DEFAULT_MAX_SIZE)
+        except (TypeError, ValueError):
+            self.max_size = DEFAULT_MAX_SIZE
+        for item in data.get('entries', []):
+            try:
+                entry = CacheEntry.from_dict(item)
+            except (KeyError, TypeError):
+                continue
+            self.entries[entry.sha256] = entry
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = f"{self.index_path}.{uuid.uuid4().hex[:8]}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'max_size': self.max_size, 'entries': [e.to_dict() for e in self.entries.values()]}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def path(self, entry: CacheEntry) -> str:
+        return os.path.join(self.root, entry.file)
+
+    def incoming_path(self, url: str) -> str:
+        """Temporary file to write an archive into before add() (same folder, so add() is a rename)"""
+        os.makedirs(self.root, exist_ok=True)
+        return os.path.join(self.root, f"incoming-{uuid.uuid4().hex[:12]}{archive_suffix(url)}.tmp")
+
+    @property
+    def total_size(self) -> int:
+        return sum(entry.size for entry in self.entries.values())
+
+    def lookup(self, url: str, sha256: Optional[str] = None) -> Optional[CacheEntry]:
+        """Cached archive for ``sha256`` (any URL), or for ``url`` when no digest is known"""
+        with self.lock:
+            self._load()
+            if sha256:
+                entry = self.entries.get(sha256.lower())
+            else:
+                matches = [entry for entry in self.entries.values() if entry.url == url]
+                entry = max(matches, key=lambda e: e.last_used) if matches else None
+            if entry is None:
+                return None
+            try:
+                if os.path.getsize(self.path(entry)) != entry.size:
+                    raise OSError(f"Size changed: {entry.file}")
+            except OSError:
+                # Deleted or truncated behind our back
+                self._discard(entry)
+                self._save()
+                return None
+            entry.last_used = time.time()
+            self._save()
+            return entry
+
+    def add(self, path: str, url: str, sha256: str) -> Optional[CacheEntry]:
+        """Move the verified archive at ``path`` into the cache; None when it exceeds the cap"""
+        size = os.path.getsize(path)
+        with self.lock:
+            self._load()
+            if size > self.max_size:
+                return None
+            entry = CacheEntry(sha256.lower(), url, size, sha256.lower() + archive_suffix(url))
+            dest = self.path(entry)
+            try:
+                os.replace(path, dest)
+            except OSError:
+                # Cache on another volume than the library
+                shutil.move(path, dest)
+            self.entries[entry.sha256] = entry
+            self.evict(keep=(entry.sha256,))
+            self._save()
+            return entry
+
+    def _discard(self, entry: CacheEntry) -> bool:
+        try:
+            os.remove(self.path(entry))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            # In use (Windows keeps open files): try again on the next eviction
+            return False
+        self.entries.pop(entry.sha256, None)
+        return True
+
+    def evict(self, max_size: Optional[int] = None, keep: Iterable[str] = ()) -> List[CacheEntry]:
+        """Drop least recently used archives until the cache fits ``max_size``; returns them
+
+        Works on the loaded index: call it with the lock held, then _save().
+        """
+        limit = self.max_size if max_size is None else max_size
+        removed: List[CacheEntry] = []
+        total = self.total_size
+        for entry in sorted(self.entries.values(), key=lambda e: e.last_used):
+            if total <= limit:
+                break
+            if entry.sha256 in keep:
+                continue
+            if self._discard(entry):
+                total -= entry.size
+                removed.append(entry)
+        return removed
+
+    def prune(self, max_size: Optional[int] = None) -> List[CacheEntry]:
+        """Evict down to ``max_size`` (the configured cap by default) and drop stale stray files"""
+        with self.lock:
+            self._load()
+            removed = self.evict(max_size)
+            known = {entry.file for entry in self.entries.values()} | {INDEX_NAME, LOCK_NAME}
+            cutoff = time.time() - STRAY_AGE
+            for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+                if name in known:
+                    continue
+                path = os.path.join(self.root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                except OSError:
+                    pass
+            self._save()
+            return removed
+
+    def set_limit(self, max_size: int) -> List[CacheEntry]:
+        with self.lock:
+            self._load()
+            self.max_size = max(0, max_size)
+            removed = self.evict()
+            self._save()
+            return removed
+
+    def remove(self, key: str) -> bool:
+        """Remove the archive with this SHA-256 or URL"""
+        with self.lock:
+            self._load()
+            entry = self.entries.get(key.lower()) or next((e for e in self.entries.values() if e.url == key), None)
+            if entry is None or not self._discard(entry):
+                return False
+            self._save()
+            return True
+
+    def listing(self) -> List[Dict[str, Any]]:
+        """Entries, most recently used first"""
+        self._load()
+        return [dict(entry.to_dict(), path=self.path(entry))
+                for entry in sorted(self.entries.values(), key=lambda e: e.last_used, reverse=True)]
+
+
+def main(argv: List[str]) -> int:
+    args = list(argv[1:])
+    root = None
+    if '--cache' in args:
+        index = args.index('--cache')
+        root = args[index + 1]
+        del args[index:index + 2]
+    max_size = None
+    if '--max-size' in args:
+        index = args.index('--max-size')
+        max_size = int(args[index + 1])
+        del args[index:index + 2]
+    if not args or args[0] not in ('list', 'prune', 'limit', 'remove') or (args[0] in ('limit', 'remove') and len(args) < 2):
+        print(json.dumps({"type": "error", "message": "Usage: archive_cache.py <list|prune|limit BYTES|remove KEY> [--max-size BYTES] [--cache DIR]"}))
+        return 1
+
+    cache = ArchiveCache(root)
+    action = args[0]
+    if action == 'list':
+        entries = cache.listing()
+        print(json.dumps({"type": "archive-cache", "root": cache.root, "max_size": cache.max_size,
+                          "total_size": sum(e['size'] for e in entries), "entries": entries}, ensure_ascii=False))
+        return 0
+    if action == 'remove':
+        ok = cache.remove(args[1])
+        print(json.dumps({"type": "archive-cache-removed", "removed": ok}))
+        return 0 if ok else 2
+    removed = cache.set_limit(int(args[1])) if action == 'limit' else cache.prune(max_size)
+    print(json.dumps({"type": "archive-cache-pruned", "removed": [e.sha256 for e in removed],
+                      "freed_bytes": sum(e.size for e in removed), "total_size": cache.total_size,
+                      "max_size": cache.max_size}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
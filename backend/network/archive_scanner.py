@@ -0,0 +1,148 @@
+"""
+Single-pass scanner for builder.blender.org archive pages
+Splits the page into table rows with plain substring searches while it is being
+downloaded, then matches the build link and date inside each short row only.
+
+Benchmark usage (against a saved archive page):
+    python backend/network/archive_scanner.py <archive_page.html> [--repeat N]
+"""
+import re
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+# blender-4.3.0-alpha+main.0123abcd4567-windows.amd64-release.zip
+# Patch builds carry "main-PR12345" as label, daily builds the branch name
+BUILD_LINK_PATTERN = re.compile(
+    r'blender-(\d+\.\d+\.\d+)-(\w+)\+([^.\s"\'<>]+)\.([^-\s"\'<>]+)-windows\.(\w+)-release\.zip'
+)
+ROW_DATE_PATTERN = re.compile(r'\d{2} \w{3} \d{2}:\d{2}')
+DATE_COLON_OFFSET = 9
+
+ROW_START = '<tr'
+ROW_END = '</tr>'
+
+
+class ArchiveRow(NamedTuple):
+    version: str
+    variant: str
+    label: str
+    build_hash: str
+    architecture: str
+    date_str: str
+
+
+def parse_row(row: str) -> Optional[ArchiveRow]:
+    """Extract the first Windows build link of a row and the date that follows it"""
+    # Cheap substring checks first: most rows are Linux/macOS builds
+    match = None
+    marker = row.find('-windows.')
+    while marker != -1:
+        start = row.rfind('blender-', 0, marker)
+        if start != -1:
+            match = BUILD_LINK_PATTERN.match(row, start)
+            if match:
+                break
+        marker = row.find('-windows.', marker + 1)
+    if not match:
+        return None
+    # Anchor the date regex on colons ("14 Nov 02:10" has its colon at offset 9)
+    # instead of letting it try every position of the row
+    date_match = None
+    colon = row.find(':', match.end())
+    while colon != -1:
+        if colon >= DATE_COLON_OFFSET:
+            date_match = ROW_DATE_PATTERN.match(row, colon - DATE_COLON_OFFSET)
+            if date_match:
+                break
+        colon = row.find(':', colon + 1)
+    if not date_match:
+        return None
+    version, variant, label, build_hash, architecture = match.groups()
+    return ArchiveRow(version, variant, label, build_hash, architecture, date_match.group(0))
+
+
+class ArchiveRowScanner:
+    """Incremental <tr>...</tr> splitter fed with text chunks"""
+
+    def __init__(self):
+        self._buffer = ''
+
+    def feed(self, chunk: str) -> Iterator[str]:
+        """Add text and yield every row completed by it"""
+        buffer = self._buffer + chunk
+        pos = 0
+        while True:
+            start = self._find_row_start(buffer, pos)
+            if start == -1:
+                # Keep just enough of the tail to detect a "<tr" split across chunks
+                pos = max(pos, len(buffer) - len(ROW_START))
+                break
+            end = buffer.find(ROW_END, start)
+            if end == -1:
+                pos = start
+                break
+            end += len(ROW_END)
+            yield buffer[start:end]
+            pos = end
+        self._buffer = buffer[pos:]
+
+    @staticmethod
+    def _find_row_start(buffer: str, pos: int) -> int:
+        while True:
+            start = buffer.find(ROW_START, pos)
+            if start == -1 or start + len(ROW_START) >= len(buffer):
+                return start
+            # Skip tags that merely start with "tr" (<track>, ...)
+            if buffer[start + len(ROW_START)] in '> \t\r\n':
+                return start
+            pos = start + len(ROW_START)
+
+
+def scan_archive_rows(text_chunks: Iterable[str]) -> Iterator[ArchiveRow]:
+    """Yield build rows, in page order, from an iterable of decoded text chunks"""
+    scanner = ArchiveRowScanner()
+    for chunk in text_chunks:
+        for row in scanner.feed(chunk):
+            parsed = parse_row(row)
+            if parsed is not None:
+                yield parsed
+
+
+def _legacy_scan(html_content: str):
+    """Previous whole-page DOTALL regex, kept for benchmarking only"""
+    row_pattern = r'<tr[^>]*>.*?blender-(\d+\.\d+\.\d+)-(\w+)\+([^.]+)\.([^-]+)-windows\.(\w+)-release\.zip.*?(\d{2} \w{3} \d{2}:\d{2}).*?</tr>'
+    return re.findall(row_pattern, html_content, re.DOTALL)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    if len(sys.argv) < 2:
+        print("Usage: archive_scanner.py <archive_page.html> [--repeat N]")
+        sys.exit(1)
+
+    repeat = 5
+    if "--repeat" in sys.argv:
+        repeat = int(sys.argv[sys.argv.index("--repeat") + 1])
+
+    with open(sys.argv[1], 'r', encoding='utf-8', errors='replace') as f:
+        page = f.read()
+    chunks = [page[i:i + 64 * 1024] for i in range(0, len(page), 64 * 1024)]
+
+    def best_of(fn):
+        best = float('inf')
+        result = None
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t0)
+        return best, result
+
+    legacy_time, legacy_rows = best_of(lambda: _legacy_scan(page))
+    scan_time, rows = best_of(lambda: list(scan_archive_rows(chunks)))
+
+    print(f"Page size: {len(page) / 1024:.0f} KiB, best of {repeat}")
+    print(f"  legacy DOTALL regex: {legacy_time * 1000:8.1f} ms  ({len(legacy_rows)} rows)")
+    print(f"  streaming scanner:   {scan_time * 1000:8.1f} ms  ({len(rows)} rows)")
+    if scan_time > 0:
+        print(f"  speedup: {legacy_time / scan_time:.1f}x")
@@ -0,0 +1,279 @@
+"""
+Local SQLite catalog of official Blender builds
+fetch_blender_versions.py upserts every stable, daily and patch build it sees;
+the launcher then queries the catalog instead of re-fetching archive pages.
+
+CLI usage:
+    python backend/network/build_catalog.py latest [--type daily] [--arch x64]
+    python backend/network/build_catalog.py since <iso_date> [--type daily] [--limit N] [--offset N]
+    python backend/network/build_catalog.py hash <build_hash>
+    python backend/network/build_catalog.py list [--type daily] [--branch main] [--arch x64] [--limit N] [--offset N]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from build_records import RECORD_FIELDS, BuildRecord, parse_record_date
+from http_cache import default_cache_root
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    url TEXT PRIMARY KEY,
+    version_type TEXT NOT NULL,
+    version TEXT NOT NULL,
+    date TEXT,
+    -- Parsed date (naive UTC ISO) used for ordering and ranges; NULL for labels like 'Official Release'
+    timestamp TEXT,
+    type TEXT,
+    description TEXT,
+    hash TEXT,
+    architecture TEXT,
+    branch TEXT,
+    pr TEXT,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    source TEXT PRIMARY KEY,
+    date TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+# Created once the timestamp column exists (catalogs from older versions gain it first)
+INDEXES = """
+DROP INDEX IF EXISTS idx_builds_branch;
+DROP INDEX IF EXISTS idx_builds_date;
+CREATE INDEX IF NOT EXISTS idx_builds_branch_time ON builds(version_type, branch, timestamp);
+CREATE INDEX IF NOT EXISTS idx_builds_architecture ON builds(architecture);
+CREATE INDEX IF NOT EXISTS idx_builds_version ON builds(version);
+CREATE INDEX IF NOT EXISTS idx_builds_hash ON builds(hash);
+CREATE INDEX IF NOT EXISTS idx_builds_time ON builds(version_type, timestamp);
+"""
+
+TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# Undated builds (release labels) come after every dated one
+NEWEST_FIRST = "timestamp IS NULL, timestamp DESC"
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def default_catalog_path() -> str:
+    return os.path.join(default_cache_root(), 'catalog.sqlite3')
+
+
+def catalog_timestamp(date: Optional[str]) -> Optional[str]:
+    """Sortable form of a record date; None when it is not a timestamp"""
+    parsed = parse_record_date(date)
+    return parsed.strftime(TIMESTAMP_FORMAT) if parsed else None
+
+
+class BuildCatalog:
+    """Upsert and query fetched builds, one row per download URL"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or default_catalog_path()
+        parent = os.path.dirname(self.db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, timeout=10)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        self.conn.executescript(INDEXES)
+
+    def _migrate(self):
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(builds)")}
+        if 'timestamp' in columns:
+            return
+        rows = self.conn.execute("SELECT url, date FROM builds WHERE date IS NOT NULL").fetchall()
+        with self.conn:
+            self.conn.execute("ALTER TABLE builds ADD COLUMN timestamp TEXT")
+            self.conn.executemany("UPDATE builds SET timestamp = ? WHERE url = ?",
+                                  [(catalog_timestamp(row['date']), row['url']) for row in rows])
+
+    def close(self):
+        self.conn.close()
+
+    def upsert(self, version_type: str, versions: Iterable[BuildRecord]) -> int:
+        """Insert new builds and refresh known ones; returns the number of rows written"""
+        now = time.time()
+        rows = [
+            (version_type, now, now,
+             record.timestamp.strftime(TIMESTAMP_FORMAT) if record.dated else None)
+            + tuple(getattr(record, field) for field in RECORD_FIELDS)
+            for record in versions
+            if record.url and record.version
+        ]
+        with self.conn:
+            self.conn.executemany(
+                """
+                INSERT INTO builds (version_type, first_seen, last_seen, timestamp,
+                                    version, url, date, type, description, hash, architecture, branch, pr)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    version_type = excluded.version_type,
+                    last_seen = excluded.last_seen,
+                    version = excluded.version,
+                    date = excluded.date,
+                    timestamp = excluded.timestamp,
+                    type = excluded.type,
+                    description = excluded.description,
+                    hash = excluded.hash,
+                    architecture = excluded.architecture,
+                    branch = excluded.branch,
+                    pr = excluded.pr
+                """,
+                rows,
+            )
+        return len(rows)
+
+    def get_watermark(self, source: str) -> Optional[Tuple[str, str]]:
+        """(date, hash) of the newest build recorded by the last sync of a source"""
+        row = self.conn.execute("SELECT date, hash FROM sync_state WHERE source = ?", (source,)).fetchone()
+        return (row['date'], row['hash']) if row else None
+
+    def set_watermark(self, source: str, date_iso: str, build_hash: str):
+        with self.conn:
+            self.conn.execute(
+                """
+                INSERT INTO sync_state (source, date, hash, updated) VALUES (?, ?, ?, ?)
+                ON CONFLICT(source) DO UPDATE SET
+                    date = excluded.date, hash = excluded.hash, updated = excluded.updated
+                """,
+                (source, date_iso, build_hash or '', time.time()),
+            )
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row) -> Dict[str, Any]:
+        record = {field: row[field] for field in RECORD_FIELDS if row[field] is not None}
+        record['version_type'] = row['version_type']
+        return record
+
+    def _select(self, where: List[str], params: List[Any], order: str,
+                limit: Optional[int] = None, offset: int = 0) -> List[Dict[str, Any]]:
+        sql = "SELECT * FROM builds"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [limit, offset]
+        return [self._to_record(row) for row in self.conn.execute(sql, params)]
+
+    @staticmethod
+    def _filters(version_type: Optional[str] = None, branch: Optional[str] = None,
+                 architecture: Optional[str] = None):
+        where: List[str] = []
+        params: List[Any] = []
+        for column, value in (('version_type', version_type), ('branch', branch), ('architecture', architecture)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        return where, params
+
+    def latest_per_branch(self, version_type: Optional[str] = None,
+                          architecture: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest build of every (branch, architecture) pair; stable and patch builds have no branch"""
+        where, params = self._filters(version_type, None, architecture)
+        # Partitions group NULL branches together; undated rows only win a partition with no dated row
+        sql = f"""
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY version_type, branch, architecture
+                    ORDER BY timestamp IS NULL, timestamp DESC, last_seen DESC
+                ) AS rank
+                FROM builds {'WHERE ' + ' AND '.join(where) if where else ''}
+            )
+            WHERE rank = 1
+            ORDER BY timestamp IS NULL, timestamp DESC
+        """
+        return [self._to_record(row) for row in self.conn.execute(sql, params)]
+
+    def since(self, date_iso: str, version_type: Optional[str] = None,
+              limit: Optional[int] = DEFAULT_PAGE_SIZE, offset: int = 0) -> List[Dict[str, Any]]:
+        """Builds dated at or after an ISO timestamp, newest first; undated builds never match"""
+        since_timestamp = catalog_timestamp(date_iso)
+        if since_timestamp is None:
+            raise ValueError(f"Not an ISO date: {date_iso}")
+        where, params = self._filters(version_type)
+        where.append("timestamp >= ?")
+        params.append(since_timestamp)
+        return self._select(where, params, NEWEST_FIRST, limit, offset)
+
+    def by_hash(self, build_hash: str) -> List[Dict[str, Any]]:
+        """Builds whose commit hash starts with the given prefix"""
+        prefix = build_hash.lower()[:8]
+        # Range form of a prefix match so the hash index is used
+        return self._select(["hash >= ?", "hash < ?"], [prefix, prefix + '~'], NEWEST_FIRST)
+
+    def page(self, version_type: Optional[str] = None, branch: Optional[str] = None,
+             architecture: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+             offset: int = 0) -> List[Dict[str, Any]]:
+        """One page of builds, newest first"""
+        where, params = self._filters(version_type, branch, architecture)
+        return self._select(where, params, NEWEST_FIRST, limit, offset)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description='Query the local Blender build catalog')
+    parser.add_argument('--catalog', default=None, help='Catalog database path')
+    sub = parser.add_subparsers(dest='query')
+
+    latest = sub.add_parser('latest')
+    latest.add_argument('--type', dest='version_type')
+    latest.add_argument('--arch')
+
+    since = sub.add_parser('since')
+    since.add_argument('date')
+    since.add_argument('--type', dest='version_type')
+    since.add_argument('--limit', type=int, default=DEFAULT_PAGE_SIZE)
+    since.add_argument('--offset', type=int, default=0)
+
+    by_hash = sub.add_parser('hash')
+    by_hash.add_argument('build_hash')
+
+    listing = sub.add_parser('list')
+    listing.add_argument('--type', dest='version_type')
+    listing.add_argument('--branch')
+    listing.add_argument('--arch')
+    listing.add_argument('--limit', type=int, default=DEFAULT_PAGE_SIZE)
+    listing.add_argument('--offset', type=int, default=0)
+
+    args = parser.parse_args(argv[1:])
+    if not args.query:
+        print(json.dumps({"type": "error", "message": "Usage: build_catalog.py <latest|since|hash|list> ..."}))
+        return 1
+
+    try:
+        catalog = BuildCatalog(args.catalog)
+        try:
+            if args.query == 'latest':
+                versions = catalog.latest_per_branch(args.version_type, args.arch)
+            elif args.query == 'since':
+                versions = catalog.since(args.date, args.version_type, args.limit, args.offset)
+            elif args.query == 'hash':
+                versions = catalog.by_hash(args.build_hash)
+            else:
+                versions = catalog.page(args.version_type, args.branch, args.arch, args.limit, args.offset)
+        finally:
+            catalog.close()
+    except ValueError as e:
+        print(json.dumps({"type": "error", "message": str(e)}))
+        return 1
+    except sqlite3.Error as e:
+        print(json.dumps({"type": "error", "message": f"Catalog query failed: {e}"}))
+        return 2
+
+    print(json.dumps({"type": "catalog", "query": args.query, "versions": versions}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,109 @@
+"""
+Compact build record shared by the version fetchers
+Records stay as slotted objects while fetched, deduplicated, sorted and stored;
+they become plain dicts only when written out as JSON.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from archive_dates import parse_iso
+
+# Serialized keys, in the order the launcher has always received them
+RECORD_FIELDS = ('version', 'url', 'date', 'type', 'description', 'hash', 'architecture', 'branch', 'pr')
+
+
+def parse_record_date(date: Optional[str]) -> Optional[datetime]:
+    """Naive UTC datetime of a record date; None for labels and unparsable values"""
+    timestamp = parse_iso(date) if date else None
+    if timestamp is not None and timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+class BuildRecord:
+    """One downloadable build (stable release, daily or patch)"""
+
+    __slots__ = RECORD_FIELDS + ('timestamp',)
+
+    def __init__(self, version: str, url: str, date: str, type: str, description: str,
+                 architecture: str, hash: Optional[str] = None, branch: Optional[str] = None,
+                 pr: Optional[str] = None, timestamp: Optional[datetime] = None):
+        self.version = version
+        self.url = url
+        # ISO string (or raw label such as 'Official Release') sent to the launcher
+        self.date = date
+        self.type = type
+        self.description = description
+        self.hash = hash
+        self.architecture = architecture
+        self.branch = branch
+        self.pr = pr
+        # Parsed date used for sorting, never serialized (naive UTC so all records compare)
+        if timestamp is None:
+            timestamp = parse_record_date(date)
+        elif timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        self.timestamp = timestamp or datetime.min
+
+    @property
+    def dated(self) -> bool:
+        """False when the date is a label such as 'Official Release' rather than a timestamp"""
+        return self.timestamp != datetime.min
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Identity used for deduplication: commit hash per architecture, or the URL when there is no hash"""
+        if self.hash:
+            return self.hash, self.architecture
+        return self.url, ''
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {}
+        for field in RECORD_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'BuildRecord':
+        return cls(**{field: data.get(field) for field in RECORD_FIELDS})
+
+    def __repr__(self):
+        return f"BuildRecord({self.version!r}, {self.architecture!r}, {self.date!r})"
+
+
+class BuildIndex:
+    """Insertion-ordered records keyed by build identity for O(1) dedup"""
+
+    def __init__(self, records: Iterable[BuildRecord] = ()):
+        self._records: Dict[Tuple[str, str], BuildRecord] = {}
+        for record in records:
+            self.add(record)
+
+    def add(self, record: BuildRecord) -> bool:
+        """Add a record unless an identical build is already indexed; True when added"""
+        if record.key in self._records:
+            return False
+        self._records[record.key] = record
+        return True
+
+    def get(self, build_hash: str, architecture: str) -> Optional[BuildRecord]:
+        return self._records.get((build_hash, architecture))
+
+    def __contains__(self, record: BuildRecord) -> bool:
+        return record.key in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[BuildRecord]:
+        return iter(self._records.values())
+
+
+def records_to_dicts(records: Iterable[BuildRecord]) -> List[Dict[str, Any]]:
+    return [record.to_dict() for record in records]
+
+
+def records_from_dicts(items: Iterable[Dict[str, Any]]) -> List[BuildRecord]:
+    return [BuildRecord.from_dict(item) for item in items]
@@ -0,0 +1,160 @@
+"""
+Content-addressed file store shared by installed builds
+Each extracted file is hashed while it is written; identical content across
+builds is kept once in the store and hardlinked into every build folder.
+A blob whose only link is the store itself is unreferenced and removed by gc.
+
+The store must sit on the same volume as the builds (hardlinks cannot cross
+volumes), so by default it lives in the library folder next to them.
+
+CLI usage:
+    python backend/network/content_store.py stats <store_dir>
+    python backend/network/content_store.py gc <store_dir> [--dry-run]
+"""
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict
+
+STORE_DIR_NAME = '.blstore'
+# Temp files younger than this may belong to an adopt still in progress
+STRAY_AGE = 24 * 60 * 60
+
+
+def default_store_dir(library_root: str) -> str:
+    return os.path.join(library_root, STORE_DIR_NAME)
+
+
+class ContentStore:
+    """SHA-256 keyed blobs under <root>/objects/ab/cdef..., linked into installs"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects = os.path.join(root, 'objects')
+        os.makedirs(self.objects, exist_ok=True)
+        # Cleared on the first failed link (store on another volume, FAT32, ...)
+        self.enabled = True
+        self.linked = 0
+        self.linked_bytes = 0
+        self.added = 0
+        self._lock = threading.Lock()
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest[2:])
+
+    def has(self, digest: str) -> bool:
+        return os.path.isfile(self.blob_path(digest))
+
+    def _count(self, field: str, size: int = 0):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if field == 'linked':
+                self.linked_bytes += size
+
+    def link_into(self, digest: str, dest: str, size: int) -> bool:
+        """Create ``dest`` as a hardlink to a known blob; False when the blob is unknown"""
+        if not self.enabled:
+            return False
+        blob = self.blob_path(digest)
+        try:
+            os.link(blob, dest)
+        except FileExistsError:
+            tmp = f"{dest}.{threading.get_ident()}.link"
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                return False
+            os.replace(tmp, dest)
+        except FileNotFoundError:
+            return False
+        except OSError:
+            self.enabled = False
+            return False
+        self._count('linked', size)
+        return True
+
+    def adopt(self, path: str, digest: str, size: int) -> bool:
+        """Share a freshly written file: link it to the existing blob, or make it the blob"""
+        if not self.enabled:
+            return False
+        if self.link_into(digest, path, size):
+            return True
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(path, tmp)
+            # Another install may have added the same blob meanwhile; either copy is fine
+            os.replace(tmp, blob)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            self.enabled = False
+            return False
+        self._count('added')
+        return True
+
+    def _iter_blobs(self):
+        for prefix in os.listdir(self.objects):
+            folder = os.path.join(self.objects, prefix)
+            if not os.path.isdir(folder):
+                continue
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                try:
+                    yield path, os.stat(path)
+                except OSError:
+                    continue
+
+    def stats(self) -> Dict[str, Any]:
+        blobs = 0
+        stored = 0
+        saved = 0
+        for _, st in self._iter_blobs():
+            blobs += 1
+            stored += st.st_size
+            # One link is the store itself, one is the first build using it
+            saved += st.st_size * max(0, st.st_nlink - 2)
+        return {"blobs": blobs, "stored_bytes": stored, "saved_bytes": saved}
+
+    def gc(self, dry_run: bool = False) -> Dict[str, Any]:
+        """Remove blobs no build links to any more (link count 1) and leftover temp files"""
+        removed = 0
+        freed = 0
+        cutoff = time.time() - STRAY_AGE
+        for path, st in self._iter_blobs():
+            if path.endswith('.tmp'):
+                # A linked file keeps the mtime of its extraction, but linking it updates the ctime
+                if max(st.st_mtime, st.st_ctime) >= cutoff:
+                    continue
+            elif st.st_nlink > 1:
+                continue
+            removed += 1
+            freed += st.st_size
+            if not dry_run:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        return {"removed": removed, "freed_bytes": freed, "dry_run": dry_run}
+
+
+def main(argv) -> int:
+    if len(argv) < 3 or argv[1] not in ('stats', 'gc'):
+        print(json.dumps({"type": "error", "message": "Usage: content_store.py <stats|gc> <store_dir> [--dry-run]"}))
+        return 1
+    store = ContentStore(argv[2])
+    if argv[1] == 'stats':
+        result = store.stats()
+    else:
+        result = store.gc(dry_run='--dry-run' in argv)
+    print(json.dumps({"type": f"store-{argv[1]}", **result}))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,471 @@
+"""
+Delta install of a zip build from the previous installed build
+Consecutive daily builds share most of their files. The archive's central
+directory (fetched with two small Range requests) lists the CRC-32 and size
+of every member, which plays the role of a zsync control file: members whose
+CRC and size match the previous build's install manifest are copied from
+the local install, and only the byte ranges of the changed members are
+fetched into a sparse copy of the archive and extracted from it. The copy
+only costs the fetched bytes on file systems with sparse files (NTFS once
+the file is flagged, ext4, APFS...); elsewhere it takes the whole archive
+size, which is then checked against the free space first.
+
+Self-test usage (against a local stand-in server):
+    python backend/network/delta_update.py --self-test [--files N] [--changed PERCENT]
+"""
+import hashlib
+import os
+import shutil
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+import zipfile
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import backend_path  # noqa: F401
+from content_store import ContentStore
+from http_cache import USER_AGENT
+from range_downloader import (DEFAULT_CONNECTIONS, DEFAULT_TIMEOUT, CONTENT_RANGE_PATTERN, DownloadCancelled,
+                              DownloadError, RemoteChanged, Segment, SegmentedDownloader, retry_segment,
+                              write_range)
+from throttle import TokenBucket
+from zip_extractor import WRITE_BUFFER, extract_zip, member_path
+
+from utils.install_manifest import read_manifest
+
+if os.name == 'nt':
+    import ctypes
+    import msvcrt
+    from ctypes import wintypes
+
+# Fall back to a full download when the delta is more than this fraction of the archive
+DEFAULT_THRESHOLD = 0.5
+# Bytes read from the end of the archive to find the end-of-central-directory record
+TAIL_SIZE = 256 * 1024
+# Changed members closer than this are fetched in one request (a few wasted bytes beat a round trip)
+MERGE_GAP = 64 * 1024
+POLL_INTERVAL = 0.25
+DELTA_SUFFIX = '.delta'
+
+# DeviceIoControl code flagging an NTFS file as sparse
+FSCTL_SET_SPARSE = 0x000900C4
+
+EOCD_SIGNATURE = b'PK\x05\x06'
+ZIP64_EOCD_SIGNATURE = b'PK\x06\x06'
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class DeltaUnavailable(DownloadError):
+    """Raised when a delta install is impossible or not worth it; download the full archive instead"""
+
+
+def mark_sparse(f) -> bool:
+    """Let the file system leave the unwritten ranges of ``f`` unallocated
+
+    POSIX file systems already do so for the hole left by truncate(); NTFS
+    allocates it unless the file is flagged sparse. False when the flag
+    could not be set (FAT32, exFAT...).
+    """
+    if os.name != 'nt':
+        return True
+    returned = wintypes.DWORD()
+    return bool(ctypes.windll.kernel32.DeviceIoControl(
+        wintypes.HANDLE(msvcrt.get_osfhandle(f.fileno())), FSCTL_SET_SPARSE,
+        None, 0, None, 0, ctypes.byref(returned), None))
+
+
+def central_directory_offset(tail: bytes) -> int:
+    """Offset of the central directory, read from the end record(s) in the archive tail"""
+    index = tail.rfind(EOCD_SIGNATURE)
+    if index < 0 or index + 22 > len(tail):
+        raise DeltaUnavailable("No zip end record in the archive tail")
+    offset = struct.unpack('<I', tail[index + 16:index + 20])[0]
+    if offset == 0xFFFFFFFF:
+        zip64 = tail.rfind(ZIP64_EOCD_SIGNATURE, 0, index)
+        if zip64 < 0 or zip64 + 56 > len(tail):
+            raise DeltaUnavailable("No zip64 end record in the archive tail")
+        offset = struct.unpack('<Q', tail[zip64 + 48:zip64 + 56])[0]
+    return offset
+
+
+def common_root(names: List[str]) -> str:
+    """Top folder shared by every path ('' when there is none); daily builds rename it each time"""
+    tops = {name.split('/', 1)[0] for name in names if '/' in name}
+    if len(tops) != 1 or any('/' not in name for name in names):
+        return ''
+    return tops.pop() + '/'
+
+
+def merge_spans(spans: List[Tuple[int, int]], gap: int = MERGE_GAP) -> List[Segment]:
+    """Coalesce (start, end) byte ranges into segments, bridging gaps up to ``gap`` bytes"""
+    merged: List[Segment] = []
+    for start, end in sorted(spans):
+        if merged and start - merged[-1].end - 1 <= gap:
+            merged[-1] = Segment(merged[-1].start, max(merged[-1].end, end))
+        else:
+            merged.append(Segment(start, end))
+    return merged
+
+
+class DeltaPlan:
+    """What a delta install copies from the previous build and what it fetches"""
+
+    __slots__ = ('members', 'reuse', 'fetch', 'archive_size', 'central_directory')
+
+    def __init__(self, members: List[zipfile.ZipInfo], reuse: List[Tuple[zipfile.ZipInfo, str]],
+                 fetch: List[zipfile.ZipInfo], archive_size: int, central_directory: int):
+        self.members = members
+        # (new member, absolute path of the identical file in the previous build)
+        self.reuse = reuse
+        self.fetch = fetch
+        self.archive_size = archive_size
+        self.central_directory = central_directory
+
+    def spans(self, members: List[zipfile.ZipInfo]) -> List[Segment]:
+        """Byte ranges holding ``members`` (local header, data and descriptor of each)"""
+        ordered = sorted(self.members, key=lambda info: info.header_offset)
+        ends = {info.filename: following.header_offset - 1 for info, following in zip(ordered, ordered[1:])}
+        if ordered:
+            ends[ordered[-1].filename] = self.central_directory - 1
+        return merge_spans([(info.header_offset, ends[info.filename]) for info in members])
+
+    @property
+    def fetch_bytes(self) -> int:
+        return sum(segment.size for segment in self.spans(self.fetch))
+
+    @property
+    def reuse_bytes(self) -> int:
+        return sum(info.file_size for info, _ in self.reuse)
+
+
+class DeltaInstaller:
+    """Install the zip at ``url`` into ``target`` from the build installed in ``previous``"""
+
+    def __init__(self, url: str, previous: str, target: str, threshold: float = DEFAULT_THRESHOLD,
+                 connections: int = DEFAULT_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT,
+                 on_progress: Optional[ProgressCallback] = None, on_assemble: Optional[ProgressCallback] = None,
+                 cancel: Optional[threading.Event] = None, store: Optional[ContentStore] = None,
+                 throttle: Optional[TokenBucket] = None):
+        self.url = url
+        self.previous = previous
+        self.target = target
+        self.threshold = threshold
+        self.connections = max(1, connections)
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.on_assemble = on_assemble
+        self.cancel = cancel or threading.Event()
+        self.store = store
+        self.throttle = throttle
+        self.sparse_path = os.path.join(target, 'blender.zip' + DELTA_SUFFIX)
+        self.remote = None
+        self.plan: Optional[DeltaPlan] = None
+        # Network bytes actually transferred, and what was copied from the previous build instead
+        self.fetched = 0
+        self.reused = 0
+        self.reused_bytes = 0
+        self._fetch_total = 0
+        self._lock = threading.Lock()
+        self._abort = threading.Event()
+
+    def _check_cancel(self):
+        if self.cancel.is_set() or self._abort.is_set():
+            raise DownloadCancelled(f"Delta install cancelled: {self.url}")
+
+    def _add_bytes(self, count: int):
+        with self._lock:
+            self.fetched += count
+        if self.throttle is not None:
+            self.throttle.consume(count, self.cancel)
+
+    def _report(self):
+        if self.on_progress:
+            self.on_progress(self.fetched, self._fetch_total)
+
+    def make_plan(self) -> DeltaPlan:
+        """Fetch the central directory and sort members into reused and fetched ones"""
+        manifest = read_manifest(self.previous)
+        if manifest is None:
+            raise DeltaUnavailable(f"No install manifest in {self.previous}")
+
+        prober = SegmentedDownloader(self.url, self.sparse_path, timeout=self.timeout)
+        response = prober.probe()
+        if response is not None:
+            response.close()
+        self.remote = remote = prober.remote
+        if not remote.accepts_ranges or not remote.size:
+            raise DeltaUnavailable("The server does not support Range requests")
+
+        os.makedirs(self.target, exist_ok=True)
+        # Sparse copy of the archive: only the ranges we fetch take disk space
+        with open(self.sparse_path, 'wb') as f:
+            if not mark_sparse(f) and shutil.disk_usage(self.target).free < remote.size:
+                raise DeltaUnavailable("No sparse files here and not enough free space for the archive copy")
+            f.truncate(remote.size)
+        tail = Segment(max(0, remote.size - TAIL_SIZE), remote.size - 1)
+        self._fetch([tail])
+        with open(self.sparse_path, 'rb') as f:
+            f.seek(tail.start)
+            central_directory = central_directory_offset(f.read())
+        if central_directory < tail.start:
+            self._fetch([Segment(central_directory, tail.start - 1)])
+        try:
+            with zipfile.ZipFile(self.sparse_path) as archive:
+                members = archive.infolist()
+        except zipfile.BadZipFile as e:
+            raise DeltaUnavailable(f"Unreadable central directory: {e}") from e
+
+        def key(rel: str, root: str) -> str:
+            return rel[len(root):] if root else rel
+
+        old_root = common_root([entry[0] for entry in manifest.files])
+        previous = {key(rel, old_root): (rel, size, crc) for rel, size, crc in manifest.files}
+        new_names = {info: os.path.relpath(member_path(self.target, info), self.target).replace(os.sep, '/')
+                     for info in members if not info.is_dir()}
+        new_root = common_root(list(new_names.values()))
+
+        reuse: List[Tuple[zipfile.ZipInfo, str]] = []
+        fetch: List[zipfile.ZipInfo] = []
+        for info, rel in new_names.items():
+            old = previous.get(key(rel, new_root))
+            if old and old[1] == info.file_size and old[2] == f"{info.CRC:08x}":
+                reuse.append((info, os.path.join(self.previous, *old[0].split('/'))))
+            else:
+                fetch.append(info)
+        self.plan = DeltaPlan(members, reuse, fetch, remote.size, central_directory)
+        ratio = self.plan.fetch_bytes / remote.size
+        if ratio > self.threshold:
+            raise DeltaUnavailable(f"Delta is {ratio:.1%} of the archive (threshold {self.threshold:.0%})")
+        return self.plan
+
+    def run(self) -> List[zipfile.ZipInfo]:
+        """Assemble the new build in ``target``; returns every archive member"""
+        try:
+            plan = self.make_plan()
+            self._fetch_total = self.fetched + plan.fetch_bytes
+            self._fetch(plan.spans(plan.fetch))
+            extract = [info.filename for info in plan.fetch]
+            stale = self._copy_reused(plan)
+            if stale:
+                # Files edited in the previous build since it was installed: fetch them after all
+                self._fetch_total += sum(segment.size for segment in plan.spans(stale))
+                self._fetch(plan.spans(stale))
+                extract += [info.filename for info in stale]
+            done = self.reused_bytes
+
+            def report_extraction(extracted, total):
+                if self.on_assemble:
+                    self.on_assemble(done + extracted, done + total)
+
+            # zipfile checks the CRC-32 of every fetched member while extracting it
+            extract_zip(self.sparse_path, self.target, on_progress=report_extraction, cancel=self.cancel,
+                        store=self.store, only=set(extract))
+            return plan.members
+        finally:
+            try:
+                os.remove(self.sparse_path)
+            except OSError:
+                pass
+
+    def _copy_reused(self, plan: DeltaPlan) -> List[zipfile.ZipInfo]:
+        """Copy unchanged files from the previous build; returns members whose local copy did not match"""
+        stale: List[zipfile.ZipInfo] = []
+        total = plan.reuse_bytes
+        last_report = 0.0
+        for info, source in plan.reuse:
+            self._check_cancel()
+            path = member_path(self.target, info)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not self._copy_file(source, path, info):
+                stale.append(info)
+                continue
+            self.reused += 1
+            self.reused_bytes += info.file_size
+            now = time.monotonic()
+            if self.on_assemble and now - last_report >= POLL_INTERVAL:
+                last_report = now
+                self.on_assemble(self.reused_bytes, total)
+        return stale
+
+    def _copy_file(self, source: str, path: str, info: zipfile.ZipInfo) -> bool:
+        """Copy ``source`` checking its CRC-32 against the new archive, then share it through the store"""
+        crc = 0
+        digest = hashlib.sha256() if self.store is not None and self.store.enabled else None
+        try:
+            with open(source, 'rb') as src, open(path, 'wb', buffering=WRITE_BUFFER) as out:
+                while True:
+                    block = src.read(WRITE_BUFFER)
+                    if not block:
+                        break
+                    crc = zlib.crc32(block, crc)
+                    if digest is not None:
+                        digest.update(block)
+                    out.write(block)
+        except OSError:
+            return False
+        if crc != info.CRC:
+            return False
+        if digest is not None:
+            self.store.adopt(path, digest.hexdigest(), info.file_size)
+        mode = info.external_attr >> 16
+        if mode & 0o111:
+            os.chmod(path, mode & 0o7777)
+        return True
+
+    def _fetch(self, segments: List[Segment]):
+        """Fetch byte ranges of the archive into the sparse copy, ``connections`` at a time"""
+        if len(segments) <= 1 or self.connections == 1:
+            for segment in segments:
+                self._fetch_segment(segment)
+            self._report()
+            return
+        with ThreadPoolExecutor(max_workers=self.connections) as pool:
+            pending = {pool.submit(self._fetch_segment, segment) for segment in segments}
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                    self._report()
+            except BaseException:
+                self._abort.set()
+                raise
+
+    def _fetch_segment(self, segment: Segment):
+        retry_segment(segment, self._stream_segment, self._check_cancel)
+
+    def _stream_segment(self, segment: Segment):
+        offset = segment.start + segment.done
+        req = urllib.request.Request(self.remote.url)
+        req.add_header('User-Agent', USER_AGENT)
+        req.add_header('Range', f"bytes={offset}-{segment.end}")
+        if self.remote.validator:
+            # A rebuilt archive answers with the whole new file instead of mixing two builds
+            req.add_header('If-Range', self.remote.validator)
+        response = urllib.request.urlopen(req, timeout=self.timeout)
+        try:
+            match = CONTENT_RANGE_PATTERN.match(response.getheader('Content-Range') or '')
+            if response.status != 206 or not match or int(match.group(1)) != offset:
+                raise RemoteChanged(f"Remote file changed during delta install: {self.url}")
+            with open(self.sparse_path, 'r+b') as f:
+                write_range(response, segment, f, self._check_cancel, lambda _, chunk: self._add_bytes(len(chunk)))
+        finally:
+            response.close()
+
+
+def delta_install(url: str, previous: str, target: str, threshold: float = DEFAULT_THRESHOLD,
+                  connections: int = DEFAULT_CONNECTIONS, on_progress: Optional[ProgressCallback] = None,
+                  on_assemble: Optional[ProgressCallback] = None, cancel: Optional[threading.Event] = None,
+                  store: Optional[ContentStore] = None, throttle: Optional[TokenBucket] = None) -> DeltaInstaller:
+    """Run a delta install and return the installer (members in ``.plan``, counters on the object)
+
+    Raises DeltaUnavailable when the full archive should be downloaded instead.
+    """
+    installer = DeltaInstaller(url, previous, target, threshold, connections, on_progress=on_progress,
+                               on_assemble=on_assemble, cancel=cancel, store=store, throttle=throttle)
+    installer.run()
+    return installer
+
+
+def _build_pair(files: int, changed: float) -> Tuple[bytes, bytes, Dict[str, bytes]]:
+    """Two build-shaped archives under different top folders; ``changed`` of the files differ"""
+    import io
+    import random
+
+    rng = random.Random(7)
+    contents: Dict[str, bytes] = {}
+    for index in range(files):
+        if index % 100 == 99:
+            contents[f"lib_{index}.dll"] = rng.randbytes(rng.randint(1, 3) * 1024 * 1024)
+        else:
+            contents[f"4.3/python/lib/module_{index}.py"] = rng.randbytes(rng.randint(200, 40000))
+    contents['blender.exe'] = rng.randbytes(8 * 1024 * 1024)
+    updated = dict(contents)
+    for name in rng.sample(sorted(contents), max(1, int(len(contents) * changed))):
+        updated[name] = rng.randbytes(len(contents[name]))
+    updated['4.3/python/lib/new_module.py'] = b'print("new")\n'
+    del updated[next(name for name in sorted(updated) if name.endswith('.py'))]
+
+    def pack(top: str, members: Dict[str, bytes]) -> bytes:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+            for name, data in members.items():
+                archive.writestr(f"{top}/{name}", data)
+        return buf.getvalue()
+
+    return (pack('blender-4.3.0-alpha+main.aaaa-windows.amd64-release', contents),
+            pack('blender-4.3.0-alpha+main.bbbb-windows.amd64-release', updated), updated)
+
+
+def _self_test(files: int, changed: float):
+    import tempfile
+
+    from standin_server import StandinServer
+    from utils.install_manifest import InstallManifest, write_manifest
+
+    old_zip, new_zip, expected = _build_pair(files, changed)
+    with tempfile.TemporaryDirectory() as tmp, StandinServer({'/old.zip': old_zip, '/new.zip': new_zip}) as server:
+        previous = os.path.join(tmp, 'previous')
+        old_path = os.path.join(tmp, 'old.zip')
+        with open(old_path, 'wb') as f:
+            f.write(old_zip)
+        members = extract_zip(old_path, previous)
+        write_manifest(previous, InstallManifest(
+            executable=None,
+            files=[(info.filename, info.file_size, f"{info.CRC:08x}") for info in members if not info.is_dir()],
+        ))
+        # A locally edited file must be detected and fetched, not copied
+        edited = os.path.join(previous, 'blender-4.3.0-alpha+main.aaaa-windows.amd64-release', 'blender.exe')
+        with open(edited, 'r+b') as f:
+            f.write(b'patched')
+
+        target = os.path.join(tmp, 'new')
+        t0 = time.perf_counter()
+        installer = delta_install(server.url('/new.zip'), previous, target)
+        elapsed = time.perf_counter() - t0
+        root = os.path.join(target, 'blender-4.3.0-alpha+main.bbbb-windows.amd64-release')
+        ok = not os.path.exists(installer.sparse_path)
+        for name, data in expected.items():
+            with open(os.path.join(root, *name.split('/')), 'rb') as f:
+                ok = ok and f.read() == data
+        listed = sum(len(names) for _, _, names in os.walk(root))
+        ok = ok and listed == len(expected)
+        print(f"  archive {len(new_zip) / 1e6:.1f} MB, fetched {installer.fetched / 1e6:.2f} MB "
+              f"({installer.fetched / len(new_zip):.1%}) in {len(server.requests)} requests, "
+              f"{installer.reused} files reused, {elapsed:.2f} s, identical output: {ok}")
+
+        # Ranges cut off mid-transfer continue from their last byte instead of failing the install
+        server.drops = 3
+        dropped = os.path.join(tmp, 'dropped', os.path.basename(root))
+        delta_install(server.url('/new.zip'), previous, os.path.dirname(dropped))
+        for name, data in expected.items():
+            with open(os.path.join(dropped, *name.split('/')), 'rb') as f:
+                ok = ok and f.read() == data
+        print(f"  with {3 - server.drops} dropped connections, identical output: {ok}")
+
+        try:
+            delta_install(server.url('/new.zip'), previous, os.path.join(tmp, 'too-big'), threshold=0.0)
+            ok = False
+        except DeltaUnavailable as e:
+            print(f"  over threshold: {e}")
+        if not ok:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Delta install self-test')
+    parser.add_argument('--self-test', action='store_true')
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--changed', type=float, default=3.0, help='percent of files that differ')
+    args = parser.parse_args()
+    if not args.self_test:
+        parser.print_usage()
+        raise SystemExit(1)
+    _self_test(args.files, args.changed / 100)
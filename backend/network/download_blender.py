@@ -1,14 +1,32 @@
 """Download and extract official Blender builds, then update config.json."""
+import argparse
 import sys
 import os
 import json
-import urllib.request
-import zipfile
+import threading
+
+import backend_path  # noqa: F401
+from archive_cache import ArchiveCache
+from content_store import ContentStore, default_store_dir
+from delta_update import DEFAULT_THRESHOLD, DeltaUnavailable, delta_install
+from download_verify import CORRUPT_ARCHIVE_ERRORS, ChecksumMismatch, fetch_published_sha256
+from range_downloader import DEFAULT_CONNECTIONS, DownloadCancelled, DownloadError, SegmentedDownloader
+from staged_builds import take_staged
+from tar_stream import install_archive, is_tar_archive, stream_install
+from throttle import TokenBucket
+from zip_extractor import extract_zip, member_path
+
+from utils.config_journal import add_executable, default_config_path
+from utils.install_manifest import InstallManifest, manifest_executable, pick_executable, write_manifest
+from utils.progress_reporter import ProgressReporter
+
+# Chunk and batch callbacks go through here; Electron gets a few progress lines per second at most
+reporter = ProgressReporter()
 
 def get_config_path():
     """Resolve config.json path relative to project root."""
-    # backend/ -> project root one level up
-    return os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'config.json'))
+    # Same file as config_manager.py, update_title.py and the Electron side
+    return default_config_path()
 
 def update_config(blender_exe: str, version: str):
     """Append the blender executable entry into config.json under 'blenders' avoiding duplicates."""
@@ -17,27 +35,15 @@ def update_config(blender_exe: str, version: str):
     try:
         if not os.path.exists(cfg_path):
             log(f"config.json non trouvé, création: {cfg_path}")
-            data = {"blenders": []}
-        else:
-            with open(cfg_path, 'r', encoding='utf-8') as f:
-                raw = f.read().strip() or '{}'
-            data = json.loads(raw)
-        if not isinstance(data, dict):
-            data = {"blenders": []}
-        if "blenders" not in data or not isinstance(data["blenders"], list):
-            data["blenders"] = []
-        # Deduplicate by path
-        already = any(entry.get('path') == blender_exe for entry in data["blenders"] if isinstance(entry, dict))
-        if already:
+        # Deduplicated by path, and committed only if no other install or rename got in first
+        added = add_executable({
+            "path": blender_exe,
+            "name": os.path.basename(blender_exe),
+            "title": title
+        }, cfg_path)
+        if not added:
             log("Entrée déjà présente dans config.json, pas d'ajout")
         else:
-            data["blenders"].append({
-                "path": blender_exe,
-                "name": os.path.basename(blender_exe),
-                "title": title
-            })
-            with open(cfg_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2)
             log("config.json mis à jour avec l'exécutable")
         # Emit separate message for config update
         print(json.dumps({"type": "config-updated", "path": blender_exe, "title": title}), flush=True)
@@ -49,8 +55,8 @@ def log(msg):
     print(json.dumps({"type": "log", "message": msg}), flush=True)
 
 def progress(percent, text):
-    """Send progress update"""
-    print(json.dumps({"type": "progress", "progress": percent, "text": text}), flush=True)
+    """Send a one-off progress update"""
+    reporter.step(percent, text)
 
 def error(msg):
     """Send error"""
@@ -61,14 +67,189 @@ def complete(exe_path):
     print(json.dumps({"type": "complete", "path": exe_path}), flush=True)
 
 def find_blender_exe(directory):
-    """Find blender.exe recursively"""
+    """Find blender.exe (or the blender binary of a Linux build), from the install manifest when there is one"""
+    exe = manifest_executable(directory)
+    if exe:
+        return str(exe)
+    # Installs made before manifests existed: walk the tree
+    linux_exe = None
     for root, dirs, files in os.walk(directory):
         for file in files:
             if file.lower() == 'blender.exe':
                 return os.path.join(root, file)
-    return None
+            if file == 'blender' and linux_exe is None:
+                linux_exe = os.path.join(root, file)
+    return linux_exe
+
+def follow_rate_updates(throttle):
+    """Apply {"type": "rate", "bytes_per_second": N} lines sent on stdin by the download queue"""
+    def read():
+        for line in sys.stdin:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(message, dict) and message.get("type") == "rate":
+                throttle.set_rate(message.get("bytes_per_second"))
+    threading.Thread(target=read, daemon=True).start()
+
+def keep_in_cache(cache, path, url, sha256):
+    """Move a verified archive into the archive cache; None (archive left in place) when it cannot be kept"""
+    if cache is None:
+        return None
+    try:
+        return cache.add(path, url, sha256)
+    except OSError as e:
+        # Disk full, unwritable cache folder...: the install itself does not need the cache
+        log(f"Archive not kept in cache: {e}")
+        return None
+
+def install_zip(url, final_path, expected_sha256, connections, store=None, throttle=None, cache=None):
+    """Download the ZIP (parallel ranges, resumable), verify it, then extract it"""
+    os.makedirs(final_path, exist_ok=True)
+    log(f"Created directory: {final_path}")
+    
+    zip_path = os.path.join(final_path, "blender.zip")
+    log(f"Downloading to: {zip_path}")
+    
+    # Parallel Range requests when the server allows it, one stream otherwise;
+    # an interrupted attempt left blender.zip.part behind and is continued
+    reporter.start_phase("download", 5, 75, "Téléchargement: {percent}%")
+    downloader = SegmentedDownloader(url, zip_path, connections=connections, on_progress=reporter.update,
+                                     throttle=throttle)
+    downloader.run()
+    reporter.finish_phase()
+    if downloader.resumed:
+        log(f"Resumed download, {downloader.resumed} bytes were already on disk")
+    log(f"Download complete: {zip_path}")
+    
+    # The digest was computed while downloading: checking it costs no extra read
+    reporter.start_phase("verify", 75, 80, "Vérification...")
+    if expected_sha256 and downloader.sha256 != expected_sha256:
+        os.remove(zip_path)
+        raise ChecksumMismatch(f"SHA-256 mismatch: expected {expected_sha256}, got {downloader.sha256}")
+    if expected_sha256:
+        log("SHA-256 verified")
+    
+    log("Starting extraction...")
+    reporter.start_phase("extract", 80, 90, "Extraction: {percent}%")
+    # Members are decompressed in parallel; a bad CRC-32 stops at the corrupt member
+    try:
+        members = extract_zip(zip_path, final_path, on_progress=reporter.update, store=store)
+    except CORRUPT_ARCHIVE_ERRORS:
+        # Without a published digest only the member CRCs catch a bad download: fetch it again next time
+        os.remove(zip_path)
+        raise
+    reporter.finish_phase()
+    log("Extraction complete")
+    
+    # Cached only once every member CRC checked out, so a corrupt archive is never reused
+    entry = keep_in_cache(cache, zip_path, url, downloader.sha256)
+    if entry:
+        log(f"Archive kept in cache: {cache.path(entry)}")
+    else:
+        os.remove(zip_path)
+        log("ZIP removed")
+    
+    return zip_manifest(final_path, members, downloader.sha256 or '')
+
+def zip_manifest(final_path, members, archive_sha256):
+    """Install manifest for the members of an extracted ZIP"""
+    def relative(info):
+        return os.path.relpath(member_path(final_path, info), final_path).replace(os.sep, '/')
+    
+    files = [(relative(info), info.file_size, f"{info.CRC:08x}") for info in members if not info.is_dir()]
+    return InstallManifest(
+        executable=pick_executable(entry[0] for entry in files),
+        files=files,
+        directories=[relative(info) for info in members if info.is_dir()],
+        archive_sha256=archive_sha256,
+    )
 
-def download_blender(version, url, target_path, folder_name):
+def install_delta(url, final_path, previous_path, threshold, connections, store=None, throttle=None):
+    """Build the new version from the previous install, fetching only the changed files"""
+    log(f"Trying a delta update from: {previous_path}")
+    
+    reporter.start_phase("download", 5, 75, "Téléchargement des changements: {percent}%")
+    phases = {"assembling": False}
+    
+    def report_assembly(done, total_size):
+        # The fetch is over once files start being copied and extracted
+        if not phases["assembling"]:
+            phases["assembling"] = True
+            reporter.finish_phase()
+            reporter.start_phase("extract", 80, 90, "Assemblage: {percent}%")
+        reporter.update(done, total_size)
+    
+    installer = delta_install(url, previous_path, final_path, threshold, connections,
+                              on_progress=reporter.update, on_assemble=report_assembly, store=store,
+                              throttle=throttle)
+    reporter.finish_phase()
+    plan = installer.plan
+    log(f"Delta update complete: {installer.fetched} of {plan.archive_size} bytes downloaded, "
+        f"{installer.reused} files reused from the previous build")
+    # The whole archive was never downloaded, so its SHA-256 cannot be checked;
+    # every reused and extracted file was checked against the archive's CRC-32 instead
+    log("Files verified against the archive CRC-32 list")
+    return zip_manifest(final_path, plan.members, '')
+
+def install_tar(url, final_path, expected_sha256, store=None, throttle=None, cache=None):
+    """Untar a Linux build straight off the network; only the archive cache gets a copy of the archive"""
+    log(f"Streaming archive into: {final_path}")
+    
+    # Download and extraction overlap, so the whole stream is one download phase
+    reporter.start_phase("download", 5, 90, "Téléchargement et extraction: {percent}%")
+    tee = cache.incoming_path(url) if cache else None
+    members, sha256 = stream_install(url, final_path, expected_sha256, on_progress=reporter.update, store=store,
+                                     throttle=throttle, tee=tee)
+    reporter.finish_phase()
+    log(f"Extraction complete: {len(members)} entries")
+    if expected_sha256:
+        log("SHA-256 verified")
+    if tee:
+        if keep_in_cache(cache, tee, url, sha256):
+            log("Archive kept in cache")
+        else:
+            os.remove(tee)
+    return tar_manifest(members, sha256)
+
+def tar_manifest(members, archive_sha256):
+    """Install manifest for the (member, crc) pairs of an extracted tarball"""
+    files, links, directories = [], [], []
+    for member, crc in members:
+        name = os.path.normpath(member.name).replace(os.sep, '/')
+        if member.isreg():
+            files.append((name, member.size, f"{crc:08x}"))
+        elif member.isdir():
+            directories.append(name)
+        else:
+            links.append(name)
+    return InstallManifest(
+        executable=pick_executable(entry[0] for entry in files),
+        files=files,
+        links=links,
+        directories=directories,
+        archive_sha256=archive_sha256 or '',
+    )
+
+def install_cached(url, final_path, entry, cache, store=None):
+    """Extract an archive found in the archive cache; nothing is downloaded"""
+    archive_path = cache.path(entry)
+    log(f"Using cached archive: {archive_path}")
+    reporter.start_phase("extract", 5, 90, "Extraction: {percent}%")
+    if is_tar_archive(url):
+        members = install_archive(archive_path, final_path, on_progress=reporter.update, store=store)
+        manifest = tar_manifest(members, entry.sha256)
+    else:
+        os.makedirs(final_path, exist_ok=True)
+        members = extract_zip(archive_path, final_path, on_progress=reporter.update, store=store)
+        manifest = zip_manifest(final_path, members, entry.sha256)
+    reporter.finish_phase()
+    log("Extraction complete")
+    return manifest
+
+def download_blender(version, url, target_path, folder_name, connections=DEFAULT_CONNECTIONS, store_dir=None,
+                     previous_path=None, delta_threshold=DEFAULT_THRESHOLD, throttle=None, cache=None):
     """Download and extract Blender"""
     try:
         log(f"Starting download: {version}")
@@ -76,47 +257,81 @@ def download_blender(version, url, target_path, folder_name):
         log(f"Target: {target_path}")
         log(f"Folder: {folder_name}")
         
-        # Create target directory
         final_path = os.path.join(target_path, folder_name)
-        os.makedirs(final_path, exist_ok=True)
-        log(f"Created directory: {final_path}")
         
         progress(5, "Téléchargement démarré...")
         
-        # Download ZIP
-        zip_path = os.path.join(final_path, "blender.zip")
-        log(f"Downloading to: {zip_path}")
+        # Prefetched and extracted in the background: installing is a rename
+        manifest = take_staged(target_path, url, final_path)
+        store = None
+        if manifest is not None:
+            log("Using the prefetched build, nothing to download")
+        else:
+            expected_sha256 = fetch_published_sha256(url)
+            if expected_sha256:
+                log(f"Published SHA-256: {expected_sha256}")
+            else:
+                log("No published checksum found, relying on archive checks")
         
-        def report_hook(block_num, block_size, total_size):
-            if total_size > 0:
-                downloaded = block_num * block_size
-                percent = min(100, int((downloaded / total_size) * 70)) + 5
-                progress(percent, f"Téléchargement: {int((downloaded / total_size) * 100)}%")
+            # Dedup mode: identical files of all installed builds share one copy through hardlinks
+            store = ContentStore(store_dir) if store_dir else None
         
-        urllib.request.urlretrieve(url, zip_path, report_hook)
-        log(f"Download complete: {zip_path}")
+            # Same archive already downloaded (reinstall, second library root): no network needed
+            entry = None
+            if cache:
+                try:
+                    entry = cache.lookup(url, expected_sha256)
+                except OSError as e:
+                    log(f"Archive cache unavailable, installing without it: {e}")
+                    cache = None
+            if entry:
+                try:
+                    manifest = install_cached(url, final_path, entry, cache, store)
+                except CORRUPT_ARCHIVE_ERRORS as e:
+                    log(f"Cached archive is corrupt ({e}), downloading it again")
+                    try:
+                        cache.remove(entry.sha256)
+                    except OSError as e:
+                        log(f"Archive cache unavailable, installing without it: {e}")
+                        cache = None
         
-        progress(80, "Extraction...")
+            if manifest is None and previous_path and not is_tar_archive(url):
+                try:
+                    manifest = install_delta(url, final_path, previous_path, delta_threshold, connections, store, throttle)
+                except DownloadCancelled:
+                    raise
+                except (DownloadError, ChecksumMismatch) as e:
+                    # DeltaUnavailable included: too many changes, no manifest, no Range support...
+                    reason = "skipped" if isinstance(e, DeltaUnavailable) else "failed"
+                    log(f"Delta update {reason} ({e}), downloading the full archive")
         
-        # Extract ZIP
-        log("Starting extraction...")
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(final_path)
-        log("Extraction complete")
+            if manifest is None:
+                if is_tar_archive(url):
+                    manifest = install_tar(url, final_path, expected_sha256, store, throttle, cache)
+                else:
+                    manifest = install_zip(url, final_path, expected_sha256, connections, store, throttle, cache)
         
-        # Delete ZIP
-        os.remove(zip_path)
-        log("ZIP removed")
+        if store is not None:
+            if store.enabled:
+                log(f"Shared store: {store.linked} files ({store.linked_bytes // (1024 * 1024)} MB) linked, {store.added} added")
+            else:
+                log("Shared store unavailable (hardlinks not supported here), files kept as copies")
+        
+        # Executable lookup, verify, uninstall and library scans read this instead of walking the tree
+        manifest.version = version
+        manifest.url = url
+        write_manifest(final_path, manifest)
+        log(f"Install manifest written: {len(manifest.files)} files")
         
         progress(90, "Recherche de l'exécutable...")
         
-        # Find blender.exe
+        # Find blender.exe (blender on Linux)
         blender_exe = find_blender_exe(final_path)
         if not blender_exe:
             error("blender.exe not found")
             return False
         
-        log(f"Found blender.exe: {blender_exe}")
+        log(f"Found executable: {blender_exe}")
         # Update config.json before completion
         update_config(blender_exe, version)
         progress(100, "Installation terminée!")
@@ -128,16 +343,51 @@ def download_blender(version, url, target_path, folder_name):
         log(f"Exception: {type(e).__name__}: {str(e)}")
         return False
 
-if __name__ == '__main__':
-    if len(sys.argv) < 5:
-        error("Usage: download_blender.py <version> <url> <target_path> <folder_name>")
+class IpcArgumentParser(argparse.ArgumentParser):
+    """Reports bad arguments as an error event: the launcher only reads JSON lines"""
+    
+    def error(self, message):
+        error(f"{message}. Usage: download_blender.py <version> <url> <target_path> <folder_name> [options]")
         sys.exit(1)
+
+def main(argv):
+    parser = IpcArgumentParser(description='Download and install a Blender build')
+    parser.add_argument('version')
+    parser.add_argument('url')
+    parser.add_argument('target_path')
+    parser.add_argument('folder_name')
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS)
+    parser.add_argument('--store', default=None, help='shared content store folder')
+    parser.add_argument('--dedup', action='store_true', help='shared content store of the library')
+    # Installed folder of the previous build of the same branch, for delta updates
+    parser.add_argument('--delta-from', dest='previous_path', default=None)
+    parser.add_argument('--delta-threshold', type=float, default=DEFAULT_THRESHOLD)
+    # Bandwidth cap in bytes/s; with --rate-control the download queue adjusts it over stdin
+    parser.add_argument('--rate', type=float, default=None)
+    parser.add_argument('--rate-control', action='store_true')
+    # Archive cache: on by default, --cache DIR moves it, --no-cache skips it
+    parser.add_argument('--cache', default=None)
+    parser.add_argument('--no-cache', action='store_true')
+    args = parser.parse_args(argv[1:])
     
-    version = sys.argv[1]
-    url = sys.argv[2]
-    target_path = sys.argv[3]
-    folder_name = sys.argv[4]
+    store_dir = args.store or (default_store_dir(args.target_path) if args.dedup else None)
+    throttle = None
+    if args.rate is not None or args.rate_control:
+        throttle = TokenBucket(args.rate)
+        if args.rate_control:
+            follow_rate_updates(throttle)
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = ArchiveCache(args.cache)
+        except Exception as e:
+            # The install does not need the cache
+            log(f"Archive cache unavailable ({args.cache or 'default folder'}), installing without it: {e}")
     
     log("Script started")
-    success = download_blender(version, url, target_path, folder_name)
-    sys.exit(0 if success else 1)
+    success = download_blender(args.version, args.url, args.target_path, args.folder_name, args.connections,
+                               store_dir, args.previous_path, args.delta_threshold, throttle, cache)
+    return 0 if success else 1
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
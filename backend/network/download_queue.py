@@ -0,0 +1,358 @@
+"""
+Download queue for Blender installs
+One long-running process owns every install job and runs download_blender.py
+for each of them, so parallel installs stop fighting over the link and disk:
+- connections are handed out under a global and a per-host cap; a job keeps
+  the connections it was given until it finishes;
+- the bandwidth budget is split between running jobs and pushed to each
+  download_blender.py over stdin, where a token bucket enforces it;
+- queued jobs start by priority (higher first), then in arrival order;
+- the queue is saved after every change and reloaded on start, so jobs cut
+  by a restart are queued again and resume from their .part files.
+
+Commands (JSON lines on stdin):
+    {"cmd": "add", "version": ..., "url": ..., "target_path": ..., "folder_name": ..., "priority": 0, "args": []}
+    {"cmd": "cancel", "id": ...}
+    {"cmd": "priority", "id": ..., "priority": N}
+    {"cmd": "limits", "max_connections": N, "per_host": N, "bandwidth": BYTES_PER_S}
+    {"cmd": "list"}
+Events (JSON lines on stdout): every download_blender.py event with a "job"
+field added (progress events carry phase, bytes_per_second and eta), plus
+"job-queued", "job-started", "job-finished", "queue" and a periodic
+"queue-progress" with the aggregate throughput. Closing stdin lets the queue
+drain and exit.
+
+CLI usage:
+    python backend/network/download_queue.py [--max-connections N] [--per-host N] [--bandwidth BYTES] [--state PATH]
+"""
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from typing import Any, Dict, List, Optional
+
+from http_cache import default_cache_root
+from range_downloader import DEFAULT_CONNECTIONS
+from tar_stream import is_tar_archive
+
+DEFAULT_MAX_CONNECTIONS = 8
+DEFAULT_PER_HOST = 4
+POLL_INTERVAL = 0.25
+# Seconds between two aggregate queue-progress events
+PROGRESS_INTERVAL = 1.0
+STATE_FILE = 'download_queue.json'
+DOWNLOAD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'download_blender.py')
+
+JOB_FIELDS = ('id', 'version', 'url', 'target_path', 'folder_name', 'priority', 'args', 'seq')
+
+
+def default_state_path() -> str:
+    return os.path.join(default_cache_root(), STATE_FILE)
+
+
+def emit(message: Dict[str, Any]):
+    print(json.dumps(message, ensure_ascii=False), flush=True)
+
+
+class Job:
+    """One install request; only JOB_FIELDS are persisted"""
+
+    __slots__ = JOB_FIELDS + ('state', 'connections', 'process', 'rate', 'cancelled')
+
+    def __init__(self, id: str, version: str, url: str, target_path: str, folder_name: str,
+                 priority: int = 0, args: Optional[List[str]] = None, seq: int = 0):
+        self.id = id
+        self.version = version
+        self.url = url
+        self.target_path = target_path
+        self.folder_name = folder_name
+        self.priority = priority
+        # Extra download_blender.py options (--dedup, --delta-from ...)
+        self.args = list(args or [])
+        self.seq = seq
+        self.state = 'queued'
+        self.connections = 0
+        self.process: Optional[subprocess.Popen] = None
+        # Smoothed download throughput, as reported by the job's progress events
+        self.rate = 0.0
+        self.cancelled = False
+
+    @property
+    def host(self) -> str:
+        return (urllib.parse.urlsplit(self.url).hostname or '').lower()
+
+    @property
+    def wanted_connections(self) -> int:
+        # tar.xz builds stream over a single connection
+        return 1 if is_tar_archive(self.url) else DEFAULT_CONNECTIONS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in JOB_FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Job':
+        return cls(**{field: data[field] for field in JOB_FIELDS if field in data})
+
+    def summary(self) -> Dict[str, Any]:
+        return {'id': self.id, 'version': self.version, 'state': self.state, 'priority': self.priority,
+                'connections': self.connections, 'bytes_per_second': round(self.rate)}
+
+
+class DownloadQueue:
+    """Priority queue of install jobs run under connection and bandwidth caps"""
+
+    def __init__(self, state_path: Optional[str] = None, max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 per_host: int = DEFAULT_PER_HOST, bandwidth: Optional[float] = None,
+                 script: str = DOWNLOAD_SCRIPT, python: str = sys.executable):
+        self.state_path = state_path or default_state_path()
+        self.max_connections = max(1, max_connections)
+        self.per_host = max(1, per_host)
+        # Bytes per second shared by all running jobs (None = unlimited)
+        self.bandwidth = bandwidth
+        self.script = script
+        self.python = python
+        self.jobs: Dict[str, Job] = {}
+        self.events: 'queue.Queue' = queue.Queue()
+        self._seq = 0
+        self._closed = False
+
+    # Persistence
+
+    def load(self):
+        """Reload unfinished jobs; the ones that were running start again (and resume)"""
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        for entry in data.get('jobs', []) if isinstance(data, dict) else []:
+            try:
+                job = Job.from_dict(entry)
+            except (KeyError, TypeError):
+                continue
+            self.jobs[job.id] = job
+            self._seq = max(self._seq, job.seq)
+
+    def save(self):
+        pending = [job.to_dict() for job in self._ordered() if job.state in ('queued', 'running')]
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': pending}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_path)
+
+    # Commands
+
+    def _ordered(self) -> List[Job]:
+        return sorted(self.jobs.values(), key=lambda job: (-job.priority, job.seq))
+
+    def add(self, version: str, url: str, target_path: str, folder_name: str, priority: int = 0,
+            args: Optional[List[str]] = None, id: Optional[str] = None) -> Job:
+        self._seq += 1
+        job = Job(id or uuid.uuid4().hex[:12], version, url, target_path, folder_name, priority, args, self._seq)
+        self.jobs[job.id] = job
+        emit({'type': 'job-queued', 'job': job.id, 'version': version, 'priority': priority})
+        return job
+
+    def cancel(self, job_id: str):
+        job = self.jobs.get(job_id)
+        if job is None or job.state not in ('queued', 'running'):
+            return
+        job.cancelled = True
+        if job.state == 'queued':
+            self._finish(job, 'cancelled')
+        elif job.process is not None:
+            # The .part file stays behind, so adding the job again resumes it
+            job.process.terminate()
+
+    def handle(self, command: Dict[str, Any]):
+        name = command.get('cmd')
+        if name == 'add':
+            self.add(command['version'], command['url'], command['target_path'], command['folder_name'],
+                     int(command.get('priority', 0)), command.get('args'), command.get('id'))
+        elif name == 'cancel':
+            self.cancel(command.get('id'))
+        elif name == 'priority':
+            job = self.jobs.get(command.get('id'))
+            if job is not None:
+                job.priority = int(command.get('priority', 0))
+        elif name == 'limits':
+            if command.get('max_connections'):
+                self.max_connections = max(1, int(command['max_connections']))
+            if command.get('per_host'):
+                self.per_host = max(1, int(command['per_host']))
+            if 'bandwidth' in command:
+                self.bandwidth = command['bandwidth'] or None
+            self._rebalance()
+        elif name != 'list':
+            emit({'type': 'error', 'message': f"Unknown queue command: {name}"})
+            return
+        self.save()
+        self._emit_queue()
+
+    # Scheduling
+
+    def _running(self) -> List[Job]:
+        return [job for job in self.jobs.values() if job.state == 'running']
+
+    def schedule(self):
+        """Start queued jobs, best first, while connections are free"""
+        started = False
+        for job in self._ordered():
+            if job.state != 'queued':
+                continue
+            running = self._running()
+            free = self.max_connections - sum(j.connections for j in running)
+            free_on_host = self.per_host - sum(j.connections for j in running if j.host == job.host)
+            connections = min(job.wanted_connections, free, free_on_host)
+            if free <= 0:
+                break
+            if connections <= 0:
+                # Host saturated: a job for another host may still fit
+                continue
+            self._start(job, connections)
+            started = True
+        if started:
+            self._rebalance()
+            self.save()
+            self._emit_queue()
+
+    def _share(self) -> Optional[float]:
+        running = len(self._running())
+        return self.bandwidth / running if self.bandwidth and running else None
+
+    def _start(self, job: Job, connections: int):
+        command = [self.python, self.script, job.version, job.url, job.target_path, job.folder_name,
+                   '--connections', str(connections), '--rate-control'] + job.args
+        job.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, text=True, encoding='utf-8', bufsize=1)
+        job.state = 'running'
+        job.connections = connections
+        job.rate = 0.0
+        threading.Thread(target=self._read_output, args=(job,), daemon=True).start()
+        emit({'type': 'job-started', 'job': job.id, 'connections': connections})
+
+    def _read_output(self, job: Job):
+        process = job.process
+        for line in process.stdout:
+            self.events.put(('output', job.id, line))
+        self.events.put(('exit', job.id, process.wait()))
+
+    def _rebalance(self):
+        """Give every running job an equal share of the bandwidth budget"""
+        share = self._share()
+        for job in self._running():
+            try:
+                job.process.stdin.write(json.dumps({'type': 'rate', 'bytes_per_second': share}) + '\n')
+                job.process.stdin.flush()
+            except (OSError, ValueError):
+                # The job is exiting; its exit event frees its share
+                pass
+
+    # Events
+
+    def _on_output(self, job: Job, line: str):
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = {'type': 'log', 'message': line.rstrip()}
+        if not isinstance(message, dict):
+            return
+        if message.get('type') == 'progress':
+            # Only bytes on the wire count toward the shared link; extraction throughput does not
+            job.rate = float(message.get('bytes_per_second') or 0) if message.get('phase') == 'download' else 0.0
+        message['job'] = job.id
+        emit(message)
+
+    def _finish(self, job: Job, state: str, code: Optional[int] = None):
+        job.state = state
+        job.connections = 0
+        job.rate = 0.0
+        job.process = None
+        emit({'type': 'job-finished', 'job': job.id, 'state': state, 'exit_code': code})
+        self.save()
+        self._emit_queue()
+        self._rebalance()
+
+    def _emit_queue(self):
+        emit({'type': 'queue', 'jobs': [job.summary() for job in self._ordered()
+                                        if job.state in ('queued', 'running')]})
+
+    def _emit_progress(self):
+        running = self._running()
+        emit({'type': 'queue-progress', 'running': len(running),
+              'queued': sum(1 for job in self.jobs.values() if job.state == 'queued'),
+              'connections': sum(job.connections for job in running),
+              'bytes_per_second': round(sum(job.rate for job in running)),
+              'jobs': {job.id: round(job.rate) for job in running}})
+
+    def close(self):
+        """Stop taking commands; run() returns once every job has finished"""
+        self._closed = True
+
+    def run(self):
+        """Main loop: apply commands and child events, start jobs, report throughput"""
+        self.schedule()
+        last_progress = time.monotonic()
+        while not (self._closed and not any(job.state in ('queued', 'running') for job in self.jobs.values())):
+            try:
+                event = self.events.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                event = None
+            if event is not None:
+                kind = event[0]
+                if kind == 'command':
+                    try:
+                        self.handle(event[1])
+                    except (KeyError, TypeError, ValueError) as e:
+                        emit({'type': 'error', 'message': f"Bad queue command: {e}"})
+                elif kind == 'output':
+                    self._on_output(self.jobs[event[1]], event[2])
+                elif kind == 'exit':
+                    job = self.jobs[event[1]]
+                    state = 'cancelled' if job.cancelled else ('done' if event[2] == 0 else 'failed')
+                    self._finish(job, state, event[2])
+                elif kind == 'eof':
+                    self.close()
+            self.schedule()
+            now = time.monotonic()
+            if now - last_progress >= PROGRESS_INTERVAL and self._running():
+                last_progress = now
+                self._emit_progress()
+
+
+def read_commands(download_queue: DownloadQueue, stream=None):
+    """Feed JSON-line commands from ``stream`` (stdin) into the queue's event loop"""
+    for line in stream or sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            command = json.loads(line)
+        except ValueError:
+            emit({'type': 'error', 'message': f"Invalid JSON command: {line[:200]}"})
+            continue
+        if isinstance(command, dict):
+            download_queue.events.put(('command', command))
+    download_queue.events.put(('eof',))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Download queue for Blender installs')
+    parser.add_argument('--max-connections', type=int, default=DEFAULT_MAX_CONNECTIONS)
+    parser.add_argument('--per-host', type=int, default=DEFAULT_PER_HOST)
+    parser.add_argument('--bandwidth', type=float, default=None, help='bytes per second for all jobs together')
+    parser.add_argument('--state', default=None, help='queue file (default: launcher cache folder)')
+    args = parser.parse_args()
+
+    download_queue = DownloadQueue(args.state, args.max_connections, args.per_host, args.bandwidth)
+    download_queue.load()
+    threading.Thread(target=read_commands, args=(download_queue,), daemon=True).start()
+    download_queue.run()
@@ -0,0 +1,192 @@
+"""
+Integrity checks for downloaded Blender archives
+SequentialHasher computes the SHA-256 of a file while parallel segments are
+still writing it, so no second read of the archive is needed; published
+``.sha256`` files are fetched from the build servers to compare against.
+"""
+import bisect
+import hashlib
+import lzma
+import re
+import tarfile
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+import zipfile
+import zlib
+from typing import Dict, Iterator, List, Optional
+
+from http_cache import CHUNK_SIZE, USER_AGENT
+
+# Chunks that arrive ahead of the hash cursor are kept in memory up to this size;
+# beyond it they are read back from the part file (still in the OS page cache)
+REORDER_BUFFER = 32 * 1024 * 1024
+POLL_INTERVAL = 0.25
+
+SHA256_PATTERN = re.compile(r'^[0-9a-fA-F]{64}$')
+RELEASE_NAME_PATTERN = re.compile(r'^(blender-\d+\.\d+\.\d+)-')
+
+
+class ChecksumMismatch(Exception):
+    """Raised when a downloaded archive does not match its published digest"""
+
+
+# Raised while extracting a damaged archive (bad member CRC, truncated zip or tar stream)
+CORRUPT_ARCHIVE_ERRORS = (ChecksumMismatch, zipfile.BadZipFile, tarfile.TarError, EOFError, lzma.LZMAError, zlib.error)
+
+
+class SequentialHasher:
+    """SHA-256 of a file written out of order by parallel segments
+
+    Writers call ``feed`` with every chunk they flushed; chunks at the hash
+    cursor are hashed directly. A background thread fills gaps by reading
+    bytes that are already on disk (resumed data, dropped out-of-order chunks)
+    so hashing overlaps the download and ends almost together with it.
+    Segments only need ``start``, ``end`` and ``done`` attributes.
+    """
+
+    def __init__(self, path: str, segments: List, algorithm: str = 'sha256',
+                 buffer_limit: int = REORDER_BUFFER):
+        self.path = path
+        self._segments = sorted(segments, key=lambda s: s.start)
+        self._starts = [s.start for s in self._segments]
+        self.size = self._segments[-1].end + 1 if self._segments else 0
+        self._hash = hashlib.new(algorithm)
+        self.position = 0
+        # Bytes hashed from disk instead of from the network stream
+        self.read_back = 0
+        self.buffer_limit = buffer_limit
+        self._pending: Dict[int, bytes] = {}
+        self._pending_bytes = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._catch_up, daemon=True)
+
+    def start(self) -> 'SequentialHasher':
+        self._thread.start()
+        return self
+
+    def _consume(self, data):
+        self._hash.update(data)
+        self.position += len(data)
+
+    def _drain(self):
+        """Hash buffered chunks that the cursor reached (lock held)"""
+        while self._pending:
+            chunk = self._pending.pop(self.position, None)
+            if chunk is not None:
+                self._pending_bytes -= len(chunk)
+                self._consume(chunk)
+                continue
+            stale = [offset for offset in self._pending if offset < self.position]
+            if not stale:
+                return
+            for offset in stale:
+                chunk = self._pending.pop(offset)
+                self._pending_bytes -= len(chunk)
+                if offset + len(chunk) > self.position:
+                    self._consume(memoryview(chunk)[self.position - offset:])
+
+    def feed(self, offset: int, chunk: bytes):
+        """Offer a chunk that was just written at ``offset``"""
+        with self._cond:
+            end = offset + len(chunk)
+            if end <= self.position:
+                return
+            if offset <= self.position:
+                self._consume(memoryview(chunk)[self.position - offset:])
+                self._drain()
+                self._cond.notify_all()
+            elif self._pending_bytes + len(chunk) <= self.buffer_limit:
+                self._pending[offset] = chunk
+                self._pending_bytes += len(chunk)
+
+    def _frontier(self) -> int:
+        """End of the bytes known to be on disk contiguously from the cursor"""
+        index = bisect.bisect_right(self._starts, self.position) - 1
+        frontier = self.position
+        while 0 <= index < len(self._segments):
+            segment = self._segments[index]
+            frontier = segment.start + segment.done
+            if frontier <= segment.end:
+                break
+            index += 1
+        return frontier
+
+    def _catch_up(self):
+        with open(self.path, 'rb') as f:
+            while True:
+                with self._cond:
+                    while not self._stopped and self.position < self.size and self._frontier() <= self.position:
+                        self._cond.wait(POLL_INTERVAL)
+                    if self._stopped or self.position >= self.size:
+                        self._cond.notify_all()
+                        return
+                    start = self.position
+                    stop = min([self._frontier()] + [o for o in self._pending if o > start])
+                f.seek(start)
+                data = f.read(min(CHUNK_SIZE, stop - start))
+                with self._cond:
+                    if self.position == start and data:
+                        self.read_back += len(data)
+                        self._consume(data)
+                        self._drain()
+
+    def finish(self, timeout: Optional[float] = None) -> str:
+        """Wait until every byte is hashed and return the hex digest"""
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join(timeout)
+        if self.position != self.size:
+            raise ChecksumMismatch(f"Hashed {self.position}/{self.size} bytes only")
+        return self._hash.hexdigest()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+
+def file_name(url: str) -> str:
+    return urllib.parse.unquote(urllib.parse.urlsplit(url).path.rsplit('/', 1)[-1])
+
+
+def checksum_urls(url: str) -> Iterator[str]:
+    """Where the build servers publish digests for an archive URL"""
+    # builder.blender.org: one <archive>.sha256 next to each daily/patch build
+    yield url + '.sha256'
+    # download.blender.org: one blender-X.Y.Z.sha256 listing every file of a release
+    match = RELEASE_NAME_PATTERN.match(file_name(url))
+    if match:
+        yield url.rsplit('/', 1)[0] + f"/{match.group(1)}.sha256"
+
+
+def parse_checksum_file(text: str, filename: str) -> Optional[str]:
+    """Digest for ``filename`` from a sha256sum-style file (or a bare digest)"""
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or not SHA256_PATTERN.match(parts[0]):
+            continue
+        if len(parts) == 1 or parts[-1].lstrip('*') == filename:
+            return parts[0].lower()
+    return None
+
+
+def fetch_published_sha256(url: str, timeout: float = 10.0) -> Optional[str]:
+    """Published SHA-256 of an archive, or None when the server has none"""
+    filename = file_name(url)
+    for checksum_url in checksum_urls(url):
+        req = urllib.request.Request(checksum_url)
+        req.add_header('User-Agent', USER_AGENT)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as response:
+                # Checksum files are tiny; refuse anything that is obviously not one
+                text = response.read(1024 * 1024).decode('utf-8', errors='replace')
+        except (urllib.error.URLError, OSError, ValueError):
+            continue
+        digest = parse_checksum_file(text, filename)
+        if digest:
+            return digest
+    return None
+
@@ -5,24 +5,65 @@ Uses the new archive URLs for improved data access
 """
 import sys
 import json
+import argparse
+import threading
+import time
 import urllib.request
 import re
 from html.parser import HTMLParser
-from typing import List, Dict, Any
+from operator import attrgetter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from datetime import datetime
-import dateutil.parser
+
+from archive_dates import parse_archive_date, parse_http_date, parse_iso, parse_listing_date, parse_month_day
+from archive_scanner import ArchiveRow, scan_archive_rows
+from build_catalog import BuildCatalog
+from build_records import BuildIndex, BuildRecord, parse_record_date, records_from_dicts, records_to_dicts
+from http_cache import CachedResponse, HttpCache, DEFAULT_MAX_BYTES, iter_response
+
+STABLE_RELEASE_URL = "https://download.blender.org/release/"
+USER_AGENT = 'Blender-Launcher/1.0'
+
+# Stable crawl defaults: bounded fan-out, per-request timeout in seconds
+DEFAULT_STABLE_CONCURRENCY = 8
+DEFAULT_REQUEST_TIMEOUT = 8.0
+
+# Sources run in parallel; each one is abandoned after this many seconds
+DEFAULT_SOURCE_DEADLINE = 120.0
+
+# How often waiting loops look at cancellation and deadlines
+POLL_INTERVAL = 0.25
+# How long a source cancelled at the deadline gets to hand back its partial result
+CANCEL_GRACE = 4 * POLL_INTERVAL
+
+_emit_lock = threading.Lock()
+
+class FetchCancelled(Exception):
+    """Raised inside a source fetch once its cancel event is set"""
+
+def emit(payload: Dict[str, Any]):
+    """Write one JSON line for IPC; sources run in threads, so lines must not interleave"""
+    line = json.dumps(payload) + "\n"
+    with _emit_lock:
+        sys.stdout.write(line)
+        sys.stdout.flush()
 
 def log(msg):
     """Log message to stdout for IPC"""
-    print(json.dumps({"type": "log", "message": msg}), flush=True)
+    emit({"type": "log", "message": msg})
 
 def error(msg):
     """Send error"""
-    print(json.dumps({"type": "error", "message": msg}), flush=True)
+    emit({"type": "error", "message": msg})
 
-def versions_found(version_type: str, versions: List[Dict[str, Any]]):
+def versions_found(version_type: str, versions: List[BuildRecord]):
     """Send found versions"""
-    print(json.dumps({"type": "versions", "version_type": version_type, "versions": versions}), flush=True)
+    emit({"type": "versions", "version_type": version_type, "versions": records_to_dicts(versions)})
+
+def _check_cancel(cancel: Optional[threading.Event]):
+    if cancel is not None and cancel.is_set():
+        raise FetchCancelled()
 
 class BlenderArchiveParser(HTMLParser):
     """Parse Blender archive pages to extract version information"""
@@ -30,9 +71,11 @@ class BlenderArchiveParser(HTMLParser):
     def __init__(self, version_type: str):
         super().__init__()
         self.version_type = version_type
-        self.versions = []
+        self.versions = BuildIndex()
         self.html_content = ""
         self.current_date = None
+        # Archive dates carry no year; resolve them against today, computed once
+        self.today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         
     def set_html_content(self, content: str):
         """Store HTML content for date extraction"""
@@ -62,31 +105,25 @@ class BlenderArchiveParser(HTMLParser):
         m = re.search(date_pattern, data.strip())
         if m:
             raw = m.group(1)
-            try:
-                # Parse like '14 Nov 02:10' using current year as default
-                dt = dateutil.parser.parse(raw, default=datetime(datetime.now().year, 1, 1))
-                self.current_date = dt.isoformat()
-            except Exception:
-                self.current_date = raw
+            # Parse like '14 Nov 02:10' using current year as default
+            dt = parse_archive_date(raw, self.today)
+            self.current_date = dt.isoformat() if dt else raw
             
     def extract_date_from_url(self, href: str):
         """Try to extract date information from URL or context"""
         # Look for date patterns in the URL itself
         date_patterns = [
-            r'(\d{2} \w{3} \d{2}:\d{2})',  # 14 Nov 02:10
-            r'(\d{4}-\d{2}-\d{2})',        # 2024-11-14
-            r'(\w{3} \d{1,2})',             # Nov 14
+            (r'(\d{2} \w{3} \d{2}:\d{2})', lambda raw: parse_archive_date(raw, self.today)),  # 14 Nov 02:10
+            (r'(\d{4}-\d{2}-\d{2})', parse_iso),                                             # 2024-11-14
+            (r'(\w{3} \d{1,2})', lambda raw: parse_month_day(raw, self.today)),                # Nov 14
         ]
         
-        for pattern in date_patterns:
+        for pattern, parse in date_patterns:
             match = re.search(pattern, href)
             if match:
                 raw = match.group(1)
-                try:
-                    dt = dateutil.parser.parse(raw, default=datetime(datetime.now().year, 1, 1))
-                    self.current_date = dt.isoformat()
-                except Exception:
-                    self.current_date = raw
+                dt = parse(raw)
+                self.current_date = dt.isoformat() if dt else raw
                 return
     
     def is_windows_build(self, href: str) -> bool:
@@ -118,20 +155,17 @@ class BlenderArchiveParser(HTMLParser):
             # Create unique version identifier with hash
             unique_version = f"{version}-{variant} ({commit_hash[:8]})"
             
-            version_info = {
-                'version': unique_version,
-                'url': href,
-                'date': self.extract_date_from_html(),
-                'type': f"{variant.title()} Patch",
-                'description': f"Patch build {pr_info}",
-                'hash': commit_hash[:8],
-                'architecture': 'x64',
-                'pr': pr_info
-            }
-            
-            # Only add if not already present (avoid duplicates)
-            if not any(v['hash'] == version_info['hash'] for v in self.versions):
-                self.versions.append(version_info)
+            # Only added if not already present (avoid duplicates)
+            self.versions.add(BuildRecord(
+                version=unique_version,
+                url=href,
+                date=self.extract_date_from_html(),
+                type=f"{variant.title()} Patch",
+                description=f"Patch build {pr_info}",
+                hash=commit_hash[:8],
+                architecture='x64',
+                pr=pr_info,
+            ))
     
     def process_daily_build(self, href: str):
         """Process daily build URL"""
@@ -148,256 +182,552 @@ class BlenderArchiveParser(HTMLParser):
             # Create unique version identifier with hash
             unique_version = f"{version}-{build_type} ({commit_hash[:8]})"
             
-            version_info = {
-                'version': unique_version,
-                'url': href,
-                'date': self.extract_date_from_html(),
-                'type': f"{build_type.title()} Daily",
-                'description': f"Daily build from {branch}",
-                'hash': commit_hash[:8],
-                'architecture': 'x64',
-                'branch': branch
-            }
-            
-            # Only add if not already present
-            if not any(v['hash'] == version_info['hash'] for v in self.versions):
-                self.versions.append(version_info)
+            # Only added if not already present
+            self.versions.add(BuildRecord(
+                version=unique_version,
+                url=href,
+                date=self.extract_date_from_html(),
+                type=f"{build_type.title()} Daily",
+                description=f"Daily build from {branch}",
+                hash=commit_hash[:8],
+                architecture='x64',
+                branch=branch,
+            ))
+
 
+def version_resolved(version_type: str, version: BuildRecord):
+    """Send a single version as soon as it is resolved"""
+    emit({"type": "version", "version_type": version_type, "version": version.to_dict()})
 
-def fetch_stable_versions() -> List[Dict[str, Any]]:
-    """Fetch stable Blender versions from official releases"""
+def _open_url(url: str, timeout: float, method: str = 'GET'):
+    """Open a URL with the launcher User-Agent and an explicit timeout"""
+    req = urllib.request.Request(url, method=method)
+    req.add_header('User-Agent', USER_AGENT)
+    return urllib.request.urlopen(req, timeout=timeout)
+
+def _fetch_page(url: str, cache: Optional[HttpCache], timeout: Optional[float] = None) -> CachedResponse:
+    """GET a page through the HTTP cache when one is configured"""
+    if cache is not None:
+        return cache.fetch(url, timeout=timeout)
+    return CachedResponse(url, iter_response(_open_url(url, timeout)), from_cache=False)
+
+def _probe_last_modified(url: str, timeout: float, cache: Optional[HttpCache] = None) -> str:
+    """HEAD a release archive and return its Last-Modified as ISO, or a generic label"""
+    if cache is not None and cache.offline:
+        return 'Official Release'
+    try:
+        with _open_url(url, timeout, method='HEAD') as head_resp:
+            lm = head_resp.getheader('Last-Modified')
+            if lm:
+                parsed = parse_http_date(lm)
+                return parsed.isoformat() if parsed else lm
+    except Exception:
+        # network/404/timeouts: fall back to generic label
+        pass
+    return 'Official Release'
+
+def _stable_version_info(version: str, download_url: str, date_iso: str) -> BuildRecord:
+    return BuildRecord(
+        version=version,
+        url=download_url,
+        date=date_iso,
+        type='Stable Release',
+        description=f'Blender {version} stable release',
+        architecture='x64',
+    )
+
+def _crawl_release_folder(folder_name: str, version: str, timeout: float,
+                          cache: Optional[HttpCache] = None,
+                          cancel: Optional[threading.Event] = None) -> List[BuildRecord]:
+    """List every Windows x64 point release (4.1.0, 4.1.1, ...) inside one BlenderX.Y/ folder"""
+    _check_cancel(cancel)
+    folder_url = f"{STABLE_RELEASE_URL}{folder_name}/"
+    results = []
+    try:
+        listing = _fetch_page(folder_url, cache, timeout).text()
+    except Exception:
+        listing = ''
+
+    # Autoindex rows look like: <a href="blender-4.1.1-windows-x64.zip">...</a>  16-Apr-2024 08:23  327682626
+    file_pattern = re.compile(r'href="(blender-(\d+\.\d+(?:\.\d+)?)-windows-x64\.zip)"')
+    date_pattern = re.compile(r'\d{2}-\w{3}-\d{4} \d{2}:\d{2}')
+    seen = set()
+    for match in file_pattern.finditer(listing):
+        file_name, point_version = match.groups()
+        line_end = listing.find('\n', match.end())
+        date_match = date_pattern.search(listing, match.end(), line_end if line_end != -1 else len(listing))
+        listed_date = date_match.group(0) if date_match else ''
+        if point_version in seen:
+            continue
+        seen.add(point_version)
+        download_url = f"{folder_url}{file_name}"
+        listed_dt = parse_listing_date(listed_date) if listed_date else None
+        date_iso = listed_dt.isoformat() if listed_dt else ''
+        if not date_iso:
+            date_iso = _probe_last_modified(download_url, timeout, cache)
+        results.append(_stable_version_info(point_version, download_url, date_iso))
+
+    if not results:
+        # Listing unavailable or unexpected: keep the historical single-archive probe
+        download_url = f"{folder_url}blender-{version}-windows-x64.zip"
+        results.append(_stable_version_info(version, download_url, _probe_last_modified(download_url, timeout, cache)))
+    return results
+
+def fetch_stable_versions(
+    concurrency: int = DEFAULT_STABLE_CONCURRENCY,
+    timeout: float = DEFAULT_REQUEST_TIMEOUT,
+    deadline: Optional[float] = None,
+    on_version: Optional[Callable[[BuildRecord], None]] = None,
+    cache: Optional[HttpCache] = None,
+    cancel: Optional[threading.Event] = None,
+) -> List[BuildRecord]:
+    """Fetch stable Blender versions from official releases
+
+    Release folders are crawled concurrently by a bounded thread pool. Each
+    resolved version is passed to ``on_version`` as soon as its folder is done;
+    ``timeout`` bounds every single request and ``deadline`` the whole crawl.
+    Setting ``cancel`` abandons the crawl.
+    """
     try:
         log("Fetching stable versions from download.blender.org...")
         
         # Keep using the main release page for stable versions
-        url = "https://download.blender.org/release/"
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Blender-Launcher/1.0')
-        
-        with urllib.request.urlopen(req) as response:
-            html_content = response.read().decode('utf-8')
+        page = _fetch_page(STABLE_RELEASE_URL, cache, timeout)
+        if page.from_cache and page.parsed is not None:
+            page.close()
+            stable_versions = records_from_dicts(page.parsed)
+            log(f"Release index unchanged, reusing {len(stable_versions)} cached stable versions")
+            if on_version:
+                for version_info in stable_versions:
+                    on_version(version_info)
+            return stable_versions
+        html_content = page.text()
         
         # Extract version folders from HTML
-        versions = []
         folder_pattern = r'href="(Blender(\d+\.\d+))/"'
-        matches = re.findall(folder_pattern, html_content)
+        matches = list(dict.fromkeys(re.findall(folder_pattern, html_content)))
         
-        for folder_name, version in matches:
-            download_url = f"https://download.blender.org/release/{folder_name}/blender-{version}-windows-x64.zip"
-
-            # Try to get Last-Modified from the CDN using a HEAD request to obtain a proper timestamp
-            date_iso = 'Official Release'
-            try:
-                head_req = urllib.request.Request(download_url, method='HEAD')
-                head_req.add_header('User-Agent', 'Blender-Launcher/1.0')
-                with urllib.request.urlopen(head_req, timeout=8) as head_resp:
-                    lm = head_resp.getheader('Last-Modified')
-                    if lm:
-                        try:
-                            parsed = dateutil.parser.parse(lm)
-                            date_iso = parsed.isoformat()
-                        except Exception:
-                            date_iso = lm
-            except Exception:
-                # network/404/timeouts: fall back to generic label
-                date_iso = 'Official Release'
-
-            version_info = {
-                'version': version,
-                'url': download_url,
-                'date': date_iso,
-                'type': 'Stable Release',
-                'description': f'Blender {version} stable release',
-                'architecture': 'x64'
-            }
-            versions.append(version_info)
+        versions = []
+        complete = True
+        started = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        try:
+            pending = {executor.submit(_crawl_release_folder, folder_name, version, timeout, cache, cancel)
+                       for folder_name, version in matches}
+            while pending:
+                _check_cancel(cancel)
+                if deadline is not None and time.monotonic() - started >= deadline:
+                    complete = False
+                    log(f"Stable crawl deadline reached, {len(pending)} release folders skipped")
+                    break
+                done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        folder_versions = future.result()
+                    except FetchCancelled:
+                        raise
+                    except Exception as e:
+                        log(f"Release folder crawl failed: {e}")
+                        continue
+                    for version_info in folder_versions:
+                        versions.append(version_info)
+                        if on_version:
+                            on_version(version_info)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
         
         # Sort by version number (descending)
         def version_sort_key(v):
             try:
-                parts = v['version'].split('.')
+                parts = v.version.split('.')
                 return [int(p) for p in parts]
             except:
                 return [0]
         
         stable_versions = sorted(versions, key=version_sort_key, reverse=True)
+        if cache is not None and complete:
+            cache.store_parsed(STABLE_RELEASE_URL, records_to_dicts(stable_versions))
         
         log(f"Found {len(stable_versions)} stable versions")
         return stable_versions
         
+    except FetchCancelled:
+        log("Stable version fetch cancelled")
+        return []
     except Exception as e:
         error(f"Failed to fetch stable versions: {str(e)}")
         return []
 
-def fetch_patch_versions() -> List[Dict[str, Any]]:
+DAILY_ARCHIVE_URL = "https://builder.blender.org/download/daily/archive/"
+PATCH_ARCHIVE_URL = "https://builder.blender.org/download/patch/archive/"
+ARCHIVE_CDN_URL = "https://cdn.builder.blender.org/download"
+
+# Only the most recent patch builds are listed
+PATCH_LIST_LIMIT = 15
+
+EntryMaker = Callable[[ArchiveRow, datetime], Optional[BuildRecord]]
+
+def versions_added(version_type: str, versions: List[BuildRecord]):
+    """Send builds that are new since the last sync"""
+    emit({"type": "versions-added", "version_type": version_type, "versions": records_to_dicts(versions)})
+
+def _arch_display(architecture: str) -> str:
+    """Map archive architecture names to launcher labels"""
+    return 'x64' if architecture == 'amd64' else ('ARM64' if architecture == 'arm64' else architecture.upper())
+
+def _parse_row_date(date_str: str, today: datetime) -> Tuple[datetime, str]:
+    """Parse an archive date once into (sort key, ISO string stored on the record)"""
+    parsed_dt = parse_archive_date(date_str, today)
+    if parsed_dt is None:
+        return datetime.min, date_str
+    return parsed_dt, parsed_dt.isoformat()
+
+def _patch_entry(row: ArchiveRow, today: datetime) -> Optional[BuildRecord]:
+    """Turn a patch archive row into a record; patch builds are labelled main-<PR>"""
+    version, variant, label, commit_hash, architecture, date_str = row
+    if not label.startswith('main-'):
+        return None
+    pr_info = label[len('main-'):]
+    parsed_dt, date_iso = _parse_row_date(date_str, today)
+    return BuildRecord(
+        version=f"{version}-{variant} ({commit_hash[:8]})",
+        url=f"{ARCHIVE_CDN_URL}/patch/archive/blender-{version}-{variant}+main-{pr_info}.{commit_hash}-windows.{architecture}-release.zip",
+        date=date_iso,
+        type=f"{variant.title()} Patch",
+        description=f"Patch build {pr_info}",
+        hash=commit_hash[:8],
+        architecture=_arch_display(architecture),
+        pr=pr_info,
+        timestamp=parsed_dt,
+    )
+
+def _daily_entry(row: ArchiveRow, today: datetime) -> Optional[BuildRecord]:
+    """Turn a daily archive row into a record"""
+    version, build_type, branch, commit_hash, architecture, date_str = row
+    parsed_dt, date_iso = _parse_row_date(date_str, today)
+    return BuildRecord(
+        version=f"{version}-{build_type} ({commit_hash[:8]})",
+        url=f"{ARCHIVE_CDN_URL}/daily/archive/blender-{version}-{build_type}+{branch}.{commit_hash}-windows.{architecture}-release.zip",
+        date=date_iso,
+        type=f"{build_type.title()} Daily",
+        description=f"Daily build from {branch}",
+        hash=commit_hash[:8],
+        architecture=_arch_display(architecture),
+        branch=branch,
+        timestamp=parsed_dt,
+    )
+
+def _reached_known(record: BuildRecord, since: Optional[str],
+                   watermark: Optional[Tuple[str, str]]) -> bool:
+    """True once a row is older than --since or is the row recorded by the last sync
+
+    Rows whose date could not be parsed cannot be placed against either
+    bound, so they never stop the scan.
+    """
+    if not record.dated:
+        return False
+    since_dt = parse_record_date(since) if since else None
+    if since_dt is not None and record.timestamp < since_dt:
+        return True
+    if watermark:
+        mark_date, mark_hash = watermark
+        mark_dt = parse_record_date(mark_date)
+        if mark_dt is not None and (record.timestamp < mark_dt
+                                    or (record.timestamp == mark_dt and record.hash == mark_hash)):
+            return True
+    return False
+
+def _truncate(versions: List[BuildRecord], limit: Optional[int], since: Optional[str],
+              watermark: Optional[Tuple[str, str]]) -> List[BuildRecord]:
+    """Apply --limit/--since/watermark to an already sorted version list"""
+    result = []
+    for version_info in versions:
+        if _reached_known(version_info, since, watermark):
+            break
+        result.append(version_info)
+        if limit is not None and len(result) >= limit:
+            break
+    return result
+
+def _scan_archive_page(page: CachedResponse, make_entry: EntryMaker,
+                       limit: Optional[int] = None, since: Optional[str] = None,
+                       watermark: Optional[Tuple[str, str]] = None,
+                       cancel: Optional[threading.Event] = None) -> Tuple[List[BuildRecord], str, bool]:
+    """Scan an archive page in a single streaming pass, newest rows first
+
+    Scanning stops early, without downloading the rest of the page, once
+    ``limit`` rows were accepted or a known row is reached. Returns the
+    deduplicated records, the raw page text when no row at all was found (for
+    the BlenderArchiveParser fallback) and whether the scan stopped early.
+    """
+    entries = BuildIndex()
+    retained: List[str] = []
+    stopped = False
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def text_chunks():
+        for chunk in page.iter_text():
+            _check_cancel(cancel)
+            if not entries:
+                retained.append(chunk)
+            yield chunk
+
+    try:
+        for row in scan_archive_rows(text_chunks()):
+            record = make_entry(row, today)
+            if record is None or record in entries:
+                continue
+            if _reached_known(record, since, watermark):
+                stopped = True
+                break
+            if not entries:
+                retained.clear()
+            entries.add(record)
+            if limit is not None and len(entries) >= limit:
+                stopped = True
+                break
+    finally:
+        # Also reached when cancelled: drop the connection and the partial cache entry
+        page.close()
+    return list(entries), ('' if entries or stopped else ''.join(retained)), stopped
+
+def _fetch_archive_versions(version_type: str, url: str,
+                            make_entry: EntryMaker,
+                            cache: Optional[HttpCache], limit: Optional[int], since: Optional[str],
+                            watermark: Optional[Tuple[str, str]], cap: Optional[int] = None,
+                            timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+                            cancel: Optional[threading.Event] = None) -> List[BuildRecord]:
+    """Shared daily/patch archive fetch: stream, fall back, sort once, cache the full result"""
+    page = _fetch_page(url, cache, timeout)
+    if page.from_cache and page.parsed is not None:
+        page.close()
+        log(f"{version_type.title()} archive unchanged, reusing {len(page.parsed)} cached builds")
+        return _truncate(records_from_dicts(page.parsed), limit, since, watermark)
+
+    entries, html_content, stopped = _scan_archive_page(page, make_entry, limit, since, watermark, cancel)
+    
+    # If no archive rows were found, fall back to HTML parser
+    fallback = not entries and not stopped
+    if fallback:
+        parser = BlenderArchiveParser(version_type)
+        parser.set_html_content(html_content)
+        parser.feed(html_content)
+        entries = list(parser.versions)
+    
+    # Sort most recent first on the datetime parsed once per row
+    entries.sort(key=attrgetter('timestamp'), reverse=True)
+    versions = entries[:cap]
+    if fallback:
+        versions = _truncate(versions, limit, since, watermark)
+    elif cache is not None and not stopped:
+        # Whole page seen: a later 304 can reuse this list
+        cache.store_parsed(url, records_to_dicts(versions))
+    
+    log(f"Found {len(versions)} {version_type} builds")
+    return versions
+
+def fetch_patch_versions(cache: Optional[HttpCache] = None, limit: Optional[int] = None,
+                         since: Optional[str] = None,
+                         watermark: Optional[Tuple[str, str]] = None,
+                         timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+                         cancel: Optional[threading.Event] = None) -> List[BuildRecord]:
     """Fetch patch build versions from archive"""
     try:
         log("Fetching patch builds from builder.blender.org archive...")
-        
-        # Use the new archive URL for patch builds
-        url = "https://builder.blender.org/download/patch/archive/"
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Blender-Launcher/1.0')
-        
-        with urllib.request.urlopen(req) as response:
-            html_content = response.read().decode('utf-8')
-        
-        # Extract date and version info using regex on the raw HTML
-        versions = []
-        
-        # Pattern to match table rows with version info
-        # Looking for: Blender version, variant, date, architecture, download link
-        row_pattern = r'<tr[^>]*>.*?blender-(\d+\.\d+\.\d+)-(\w+)\+main-([^.]+)\.([^-]+)-windows\.(\w+)-release\.zip.*?(\d{2} \w{3} \d{2}:\d{2}).*?</tr>'
-        matches = re.findall(row_pattern, html_content, re.DOTALL)
-        
-        for match in matches:
-            version, variant, pr_info, commit_hash, architecture, date_str = match
-            
-            # Build the download URL
-            download_url = f"https://cdn.builder.blender.org/download/patch/archive/blender-{version}-{variant}+main-{pr_info}.{commit_hash}-windows.{architecture}-release.zip"
-            
-            # Map architecture names
-            arch_display = 'x64' if architecture == 'amd64' else ('ARM64' if architecture == 'arm64' else architecture.upper())
-            
-            unique_version = f"{version}-{variant} ({commit_hash[:8]})"
-            
-            # Try to parse the found date into ISO format (add current year if missing)
-            try:
-                parsed_dt = dateutil.parser.parse(date_str, default=datetime(datetime.now().year, 1, 1))
-                date_iso = parsed_dt.isoformat()
-            except Exception:
-                date_iso = date_str
-
-            version_info = {
-                'version': unique_version,
-                'url': download_url,
-                'date': date_iso,
-                'type': f"{variant.title()} Patch",
-                'description': f"Patch build {pr_info}",
-                'hash': commit_hash[:8],
-                'architecture': arch_display,
-                'pr': pr_info
-            }
-
-            versions.append(version_info)
-        
-        # If regex parsing failed, fall back to HTML parser
-        if not versions:
-            parser = BlenderArchiveParser('patch')
-            parser.set_html_content(html_content)
-            parser.feed(html_content)
-            versions = parser.versions
-        
-        # Sort and limit patch versions (most recent first)
-        patch_versions = sorted(versions, key=lambda x: x.get('date', ''), reverse=True)[:15]
-        
-        log(f"Found {len(patch_versions)} patch builds")
-        return patch_versions
-        
+        return _fetch_archive_versions('patch', PATCH_ARCHIVE_URL, _patch_entry, cache,
+                                       limit, since, watermark, cap=PATCH_LIST_LIMIT,
+                                       timeout=timeout, cancel=cancel)
+    except FetchCancelled:
+        log("Patch version fetch cancelled")
+        return []
     except Exception as e:
         error(f"Failed to fetch patch versions: {str(e)}")
         return []
 
-def fetch_daily_versions() -> List[Dict[str, Any]]:
-    """Fetch daily build versions from archive"""
+def fetch_daily_versions(cache: Optional[HttpCache] = None, limit: Optional[int] = None,
+                         since: Optional[str] = None,
+                         watermark: Optional[Tuple[str, str]] = None,
+                         timeout: Optional[float] = DEFAULT_REQUEST_TIMEOUT,
+                         cancel: Optional[threading.Event] = None) -> List[BuildRecord]:
+    """Fetch daily build versions from archive
+
+    ``limit`` keeps only the top N rows and ``since`` stops at rows older than
+    an ISO date; ``watermark`` is the (date, hash) of the newest row seen by the
+    previous sync. The page lists newest builds first, so all three stop the
+    download early instead of parsing the whole archive.
+    """
     try:
         log("Fetching daily builds from builder.blender.org archive...")
-        
-        # Use the new archive URL for daily builds
-        url = "https://builder.blender.org/download/daily/archive/"
-        req = urllib.request.Request(url)
-        req.add_header('User-Agent', 'Blender-Launcher/1.0')
-        
-        with urllib.request.urlopen(req) as response:
-            html_content = response.read().decode('utf-8')
-        
-        # Extract date and version info using regex on the raw HTML
-        versions = []
-        
-        # Pattern to match table rows with version info - capture ALL Windows builds (any architecture)
-        row_pattern = r'<tr[^>]*>.*?blender-(\d+\.\d+\.\d+)-(\w+)\+([^.]+)\.([^-]+)-windows\.(\w+)-release\.zip.*?(\d{2} \w{3} \d{2}:\d{2}).*?</tr>'
-        matches = re.findall(row_pattern, html_content, re.DOTALL)
-        
-        for match in matches:
-            version, build_type, branch, commit_hash, architecture, date_str = match
-            
-            # Build the download URL
-            download_url = f"https://cdn.builder.blender.org/download/daily/archive/blender-{version}-{build_type}+{branch}.{commit_hash}-windows.{architecture}-release.zip"
-            
-            # Map architecture names
-            arch_display = 'x64' if architecture == 'amd64' else ('ARM64' if architecture == 'arm64' else architecture.upper())
-            
-            unique_version = f"{version}-{build_type} ({commit_hash[:8]})"
-            # Try to parse the found date into ISO format (add current year if missing)
-            try:
-                parsed_dt = dateutil.parser.parse(date_str, default=datetime(datetime.now().year, 1, 1))
-                date_iso = parsed_dt.isoformat()
-            except Exception:
-                date_iso = date_str
-
-            version_info = {
-                'version': unique_version,
-                'url': download_url,
-                'date': date_iso,
-                'type': f"{build_type.title()} Daily",
-                'description': f"Daily build from {branch}",
-                'hash': commit_hash[:8],
-                'architecture': arch_display,
-                'branch': branch
-            }
-
-            versions.append(version_info)
-        
-        # If regex parsing failed, fall back to HTML parser
-        if not versions:
-            parser = BlenderArchiveParser('daily')
-            parser.set_html_content(html_content)
-            parser.feed(html_content)
-            versions = parser.versions
-        
-        # Sort daily versions (most recent first) - use datetime objects for proper sorting
-        def sort_key(v):
-            date_val = v.get('date', '')
-            if not date_val:
-                return datetime.min
-            try:
-                # Try to parse as ISO datetime
-                return dateutil.parser.parse(date_val)
-            except:
-                return datetime.min
-        
-        daily_versions = sorted(versions, key=sort_key, reverse=True)
-        
-        log(f"Found {len(daily_versions)} daily builds")
-        return daily_versions
-        
+        return _fetch_archive_versions('daily', DAILY_ARCHIVE_URL, _daily_entry, cache,
+                                       limit, since, watermark, timeout=timeout, cancel=cancel)
+    except FetchCancelled:
+        log("Daily version fetch cancelled")
+        return []
     except Exception as e:
         error(f"Failed to fetch daily versions: {str(e)}")
         return []
 
 
 
+def run_sources(tasks: Dict[str, Callable[[threading.Event], List[BuildRecord]]],
+                on_done: Callable[[str, List[BuildRecord]], None],
+                deadline: Optional[float] = None):
+    """Run source fetches concurrently and hand each result over as soon as it completes
+
+    Every task receives its own cancel event. A source still running after
+    ``deadline`` seconds is cancelled and handed over with whatever it returns
+    once cancelled (often nothing), so the total latency is that of the
+    slowest source rather than the sum of all of them. The timeout is reported
+    as a non-fatal ``source-timeout`` event: the launcher fails a refresh on
+    any ``error`` event, and the other sources did finish.
+    """
+    cancels = {name: threading.Event() for name in tasks}
+    executor = ThreadPoolExecutor(max_workers=max(1, len(tasks)))
+    started = time.monotonic()
+    try:
+        futures = {executor.submit(task, cancels[name]): name for name, task in tasks.items()}
+        pending = set(futures)
+        while pending:
+            remaining = None if deadline is None else deadline - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                for future in pending:
+                    cancels[futures[future]].set()
+                # Cancelled tasks notice within a poll interval and return what they have
+                finished, _ = wait(pending, timeout=CANCEL_GRACE)
+                for future in pending:
+                    name = futures[future]
+                    message = f"Timed out fetching {name} versions after {deadline:g}s"
+                    emit({"type": "source-timeout", "version_type": name, "message": message})
+                    versions: List[BuildRecord] = []
+                    if future in finished and future.exception() is None:
+                        versions = future.result()
+                    on_done(name, versions)
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = futures[future]
+                try:
+                    versions = future.result()
+                except Exception as e:
+                    error(f"Failed to fetch {name} versions: {str(e)}")
+                    continue
+                on_done(name, versions)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def main():
-    if len(sys.argv) < 2:
+    parser = argparse.ArgumentParser(description='Fetch official Blender versions')
+    parser.add_argument('version_type', nargs='?', help='stable, daily, patch or all')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_STABLE_CONCURRENCY,
+                        help='Parallel requests for the stable release crawl')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help='Per-request timeout in seconds')
+    parser.add_argument('--deadline', type=float, default=None,
+                        help='Overall deadline in seconds for the stable release crawl')
+    parser.add_argument('--source-deadline', type=float, default=DEFAULT_SOURCE_DEADLINE,
+                        help='Seconds after which a still running source (stable/daily/patch) is cancelled')
+    parser.add_argument('--offline', action='store_true',
+                        help='Serve archive pages from the HTTP cache only')
+    parser.add_argument('--cache-dir', default=None,
+                        help='HTTP cache folder (defaults to the per-user launcher cache)')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help='HTTP cache size limit in megabytes')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Bypass the HTTP cache entirely')
+    parser.add_argument('--catalog', default=None,
+                        help='SQLite build catalog path (defaults to the per-user launcher cache)')
+    parser.add_argument('--no-catalog', action='store_true',
+                        help='Do not record fetched builds in the build catalog')
+    parser.add_argument('--sync', action='store_true',
+                        help='Daily/patch: only report builds newer than the last sync (versions-added events)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='Daily/patch: keep only the N most recent builds')
+    parser.add_argument('--since', default=None,
+                        help='Daily/patch: ignore builds older than this ISO date')
+    args = parser.parse_args()
+
+    if not args.version_type:
         error("Usage: fetch_blender_versions.py <stable|daily|patch|all>")
         sys.exit(1)
+    if args.since and parse_record_date(args.since) is None:
+        error(f"--since expects an ISO date, got: {args.since}")
+        sys.exit(1)
     
-    version_type = sys.argv[1].lower()
-    
-    log("Starting Blender version fetch...")
+    version_type = args.version_type.lower()
     
-    if version_type == 'stable' or version_type == 'all':
-        stable_versions = fetch_stable_versions()
-        versions_found('stable', stable_versions)
+    cache = None
+    if not args.no_cache:
+        try:
+            cache = HttpCache(args.cache_dir, max_bytes=args.cache_max_mb * 1024 * 1024, offline=args.offline)
+        except OSError as e:
+            log(f"HTTP cache unavailable, fetching without it: {e}")
     
-    if version_type == 'daily' or version_type == 'all':
-        daily_versions = fetch_daily_versions()
-        versions_found('daily', daily_versions)
+    catalog = None
+    if not args.no_catalog:
+        try:
+            catalog = BuildCatalog(args.catalog)
+        except Exception as e:
+            log(f"Build catalog unavailable, versions will not be recorded: {e}")
+
+    def publish(source: str, versions: List[BuildRecord]):
+        if catalog is not None:
+            try:
+                catalog.upsert(source, versions)
+            except Exception as e:
+                log(f"Failed to record {source} builds in catalog: {e}")
+        versions_found(source, versions)
+
+    def record_sync(source: str, added: List[BuildRecord]):
+        if added:
+            try:
+                catalog.upsert(source, added)
+                # Versions are newest first: the first dated one becomes the new watermark
+                newest = next((v for v in added if v.dated), None)
+                if newest is not None:
+                    catalog.set_watermark(source, newest.date, newest.hash or '')
+            except Exception as e:
+                log(f"Failed to record {source} builds in catalog: {e}")
+        log(f"{len(added)} new {source} builds since last sync")
+        versions_added(source, added)
+
+    sources = [s for s in ('stable', 'daily', 'patch') if version_type in (s, 'all')]
+    sync = args.sync and catalog is not None
+    if args.sync and catalog is None:
+        log("Sync mode needs the build catalog, fetching full list")
+    # Read watermarks up front: the catalog connection stays on the main thread
+    watermarks = {s: catalog.get_watermark(s) for s in sources if s != 'stable'} if sync else {}
+
+    def archive_task(source: str, fetch: Callable[..., List[BuildRecord]]):
+        return lambda cancel: fetch(cache, limit=args.limit, since=args.since,
+                                    watermark=watermarks.get(source),
+                                    timeout=args.timeout, cancel=cancel)
+
+    tasks = {}
+    for source in sources:
+        if source == 'stable':
+            tasks[source] = lambda cancel: fetch_stable_versions(
+                concurrency=args.concurrency,
+                timeout=args.timeout,
+                deadline=args.deadline,
+                on_version=lambda v: version_resolved('stable', v),
+                cache=cache,
+                cancel=cancel,
+            )
+        else:
+            fetch = fetch_daily_versions if source == 'daily' else fetch_patch_versions
+            tasks[source] = archive_task(source, fetch)
+
+    def on_done(source: str, versions: List[BuildRecord]):
+        if sync and source != 'stable':
+            record_sync(source, versions)
+        else:
+            publish(source, versions)
     
-    if version_type == 'patch' or version_type == 'all':
-        patch_versions = fetch_patch_versions()
-        versions_found('patch', patch_versions)
+    log("Starting Blender version fetch...")
+    run_sources(tasks, on_done, deadline=args.source_deadline)
     
+    if catalog is not None:
+        catalog.close()
     log("Version fetch completed")
 
 if __name__ == '__main__':
@@ -0,0 +1,242 @@
+"""
+Persistent HTTP cache for Blender archive pages
+Stores response bodies with their ETag/Last-Modified validators and revalidates
+them with conditional GETs, so unchanged pages cost a 304 instead of a download
+"""
+import codecs
+import hashlib
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Iterator, Optional
+
+USER_AGENT = 'Blender-Launcher/1.0'
+
+# Archive pages are a few MB at most; keep plenty of them around
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Read size used when streaming bodies from the network or from disk
+CHUNK_SIZE = 64 * 1024
+
+
+def default_cache_root() -> str:
+    """Per-user cache folder for the launcher (overridable with BLENDER_LAUNCHER_CACHE)"""
+    override = os.environ.get('BLENDER_LAUNCHER_CACHE')
+    if override:
+        return override
+    if os.name == 'nt':
+        base = os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), 'AppData', 'Local')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'Blender-Launcher')
+
+
+def iter_response(response, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a urllib response body chunk by chunk, closing it afterwards"""
+    try:
+        while True:
+            chunk = response.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        response.close()
+
+
+class OfflineCacheMiss(Exception):
+    """Raised in offline mode when a URL has never been cached"""
+
+
+class CachedResponse:
+    """Page body streamed either from the network or from the cache"""
+
+    def __init__(self, url: str, chunks: Iterator[bytes], from_cache: bool, parsed: Any = None):
+        self.url = url
+        self._chunks = chunks
+        # True when the body is served from disk (304 or offline mode)
+        self.from_cache = from_cache
+        # Result previously stored with HttpCache.store_parsed for this exact body
+        self.parsed = parsed
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        """Yield the raw body; can only be consumed once"""
+        return self._chunks
+
+    def iter_text(self, encoding: str = 'utf-8') -> Iterator[str]:
+        """Yield the body as decoded text chunks"""
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        for chunk in self._chunks:
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield tail
+
+    def read(self) -> bytes:
+        return b''.join(self._chunks)
+
+    def text(self, encoding: str = 'utf-8') -> str:
+        return self.read().decode(encoding, errors='replace')
+
+    def close(self):
+        """Stop streaming early; a partially read network body is not cached"""
+        close = getattr(self._chunks, 'close', None)
+        if close:
+            close()
+
+
+class HttpCache:
+    """Size-bounded on-disk cache revalidated with If-None-Match/If-Modified-Since"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES, offline: bool = False):
+        self.cache_dir = cache_dir or os.path.join(default_cache_root(), 'http')
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, url: str):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.body', base + '.json'
+
+    def _tmp_path(self, path: str) -> str:
+        return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+    def _load_meta(self, url: str) -> Optional[Dict[str, Any]]:
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or not os.path.exists(body_path):
+            return None
+        return meta
+
+    def _write_meta(self, url: str, meta: Dict[str, Any]):
+        _, meta_path = self._paths(url)
+        tmp_path = self._tmp_path(meta_path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def _iter_body_file(self, url: str) -> Iterator[bytes]:
+        body_path, _ = self._paths(url)
+        with open(body_path, 'rb') as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def _serve_cached(self, url: str, meta: Dict[str, Any]) -> CachedResponse:
+        with self._lock:
+            meta['last_used'] = time.time()
+            self._write_meta(url, meta)
+        return CachedResponse(url, self._iter_body_file(url), from_cache=True, parsed=meta.get('parsed'))
+
+    def fetch(self, url: str, timeout: Optional[float] = None) -> CachedResponse:
+        """GET a URL, revalidating any cached copy; a 304 reuses the stored body and parsed result"""
+        meta = self._load_meta(url)
+
+        if self.offline:
+            if meta is None:
+                raise OfflineCacheMiss(f"Not available offline: {url}")
+            return self._serve_cached(url, meta)
+
+        req = urllib.request.Request(url)
+        req.add_header('User-Agent', USER_AGENT)
+        if meta:
+            if meta.get('etag'):
+                req.add_header('If-None-Match', meta['etag'])
+            if meta.get('last_modified'):
+                req.add_header('If-Modified-Since', meta['last_modified'])
+
+        try:
+            response = urllib.request.urlopen(req, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta is not None:
+                return self._serve_cached(url, meta)
+            raise
+
+        return CachedResponse(url, self._tee(url, response), from_cache=False)
+
+    def _tee(self, url: str, response) -> Iterator[bytes]:
+        """Stream a fresh response to the caller while writing it into the cache"""
+        etag = response.getheader('ETag')
+        last_modified = response.getheader('Last-Modified')
+        body_path, _ = self._paths(url)
+        tmp_path = self._tmp_path(body_path)
+        size = 0
+        committed = False
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in iter_response(response):
+                    f.write(chunk)
+                    size += len(chunk)
+                    yield chunk
+            # Stored even without validators: the body is still useful in offline mode
+            now = time.time()
+            with self._lock:
+                os.replace(tmp_path, body_path)
+                committed = True
+                self._write_meta(url, {
+                    'url': url,
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'size': size,
+                    'stored_at': now,
+                    'last_used': now,
+                    'parsed': None,
+                })
+                self._evict()
+        finally:
+            response.close()
+            if not committed:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    def store_parsed(self, url: str, parsed: Any):
+        """Attach the parsed result of the current cached body so a later 304 can skip parsing"""
+        with self._lock:
+            meta = self._load_meta(url)
+            if meta is None:
+                return
+            meta['parsed'] = parsed
+            self._write_meta(url, meta)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes (lock held)"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            meta_path = os.path.join(self.cache_dir, name)
+            try:
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            size = int(meta.get('size') or 0)
+            total += size
+            entries.append((meta.get('last_used') or 0, size, meta_path))
+
+        entries.sort()
+        for _, size, meta_path in entries:
+            if total <= self.max_bytes:
+                break
+            body_path = meta_path[:-len('.json')] + '.body'
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
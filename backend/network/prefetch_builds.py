@@ -0,0 +1,268 @@
+"""
+Opt-in background prefetch of the newest daily builds
+Looks up the newest daily build of each configured branch and, when it is
+not available locally yet, downloads it ahead of time:
+- ``cache`` mode stores the verified archive in the archive cache, so the
+  install only extracts it;
+- ``staged`` mode also extracts it under <library>/.blstaged, so the install
+  is a folder rename.
+
+Budgets: downloads go through a token bucket (--rate), stop for the day once
+--daily-budget bytes were fetched, and are skipped when the disk would keep
+less than --min-free bytes or staged builds would exceed --staged-budget.
+Downloads resume from their .part file, so the launcher can start this when
+idle and kill it when the user needs the link.
+
+CLI usage:
+    python backend/network/prefetch_builds.py [--branch main ...] [--architecture x64]
+        [--mode cache|staged --library DIR] [--rate BYTES] [--daily-budget BYTES]
+        [--min-free BYTES] [--staged-budget BYTES] [--watch SECONDS]
+"""
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+import backend_path  # noqa: F401
+from archive_cache import ArchiveCache, archive_suffix
+from build_records import BuildRecord
+from download_verify import CORRUPT_ARCHIVE_ERRORS, ChecksumMismatch, fetch_published_sha256
+from http_cache import HttpCache, default_cache_root
+from range_downloader import DownloadError, SegmentedDownloader
+from staged_builds import discard_staged, folder_size, staged_builds, staged_manifest, staged_path
+from tar_stream import install_archive, is_tar_archive
+from throttle import TokenBucket
+from zip_extractor import extract_zip
+
+from utils.install_manifest import write_manifest
+
+DEFAULT_BRANCHES = ('main',)
+DEFAULT_ARCHITECTURE = 'x64'
+# Background traffic stays well below a typical link
+DEFAULT_RATE = 2 * 1024 * 1024
+DEFAULT_DAILY_BUDGET = 2 * 1024 * 1024 * 1024
+DEFAULT_MIN_FREE = 10 * 1024 * 1024 * 1024
+DEFAULT_STAGED_BUDGET = 3 * 1024 * 1024 * 1024
+# Daily rows read from the archive page (newest first)
+LISTING_LIMIT = 60
+STATE_FILE = 'prefetch.json'
+# Room an extracted build takes, as a multiple of its archive (estimate for the disk checks)
+EXTRACTED_RATIO = 3
+
+
+def emit(message: Dict[str, Any]):
+    print(json.dumps(message, ensure_ascii=False), flush=True)
+
+
+def log(msg: str):
+    emit({"type": "log", "message": msg})
+
+
+def newest_per_branch(records: List[BuildRecord], branches, architecture: str) -> List[BuildRecord]:
+    """Newest record of each wanted branch, in branch order"""
+    newest: Dict[str, BuildRecord] = {}
+    for record in records:
+        if record.branch in branches and record.architecture == architecture:
+            best = newest.get(record.branch)
+            if best is None or record.timestamp > best.timestamp:
+                newest[record.branch] = record
+    return [newest[branch] for branch in branches if branch in newest]
+
+
+class Prefetcher:
+    """One prefetch pass over a list of daily build records"""
+
+    def __init__(self, branches=DEFAULT_BRANCHES, architecture: str = DEFAULT_ARCHITECTURE,
+                 mode: str = 'cache', library: Optional[str] = None, rate: Optional[float] = DEFAULT_RATE,
+                 daily_budget: Optional[int] = DEFAULT_DAILY_BUDGET, min_free: int = DEFAULT_MIN_FREE,
+                 staged_budget: int = DEFAULT_STAGED_BUDGET, cache: Optional[ArchiveCache] = None,
+                 state_path: Optional[str] = None):
+        if mode == 'staged' and not library:
+            raise ValueError("Staged prefetch needs the library folder")
+        self.branches = tuple(branches)
+        self.architecture = architecture
+        self.mode = mode
+        self.library = library
+        self.throttle = TokenBucket(rate)
+        self.daily_budget = daily_budget
+        self.min_free = min_free
+        self.staged_budget = staged_budget
+        self.cache = cache or ArchiveCache()
+        self.state_path = state_path or os.path.join(default_cache_root(), STATE_FILE)
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {}
+        return self._for_today(state if isinstance(state, dict) else {})
+
+    @staticmethod
+    def _for_today(state: Dict[str, Any]) -> Dict[str, Any]:
+        """The state itself, or a fresh one keeping the staged builds when the day changed"""
+        today = date.today().isoformat()
+        if state.get('day') == today:
+            return state
+        # The byte budget is per calendar day
+        staged = state.get('staged')
+        return {'day': today, 'downloaded': 0, 'staged': staged if isinstance(staged, dict) else {}}
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _skip(self, record: BuildRecord, reason: str):
+        emit({"type": "prefetch-skipped", "branch": record.branch, "version": record.version, "reason": reason})
+
+    def run(self, records: List[BuildRecord]) -> List[BuildRecord]:
+        """Prefetch the newest build of each branch; returns the builds fetched in this pass"""
+        fetched = []
+        # A --watch process lives for days: each pass starts from today's budget
+        self.state = self._for_today(self.state)
+        for record in newest_per_branch(records, self.branches, self.architecture):
+            try:
+                if self.prefetch(record):
+                    fetched.append(record)
+            except (DownloadError, OSError) + CORRUPT_ARCHIVE_ERRORS as e:
+                # Try again on the next pass; a .part file keeps what was already downloaded
+                self._skip(record, f"failed: {e}")
+        return fetched
+
+    def _ready(self, record: BuildRecord, sha256: Optional[str]) -> bool:
+        if self.mode == 'staged':
+            return staged_manifest(self.library, record.url) is not None
+        return self.cache.lookup(record.url, sha256) is not None
+
+    def prefetch(self, record: BuildRecord) -> bool:
+        sha256 = fetch_published_sha256(record.url)
+        if self._ready(record, sha256):
+            return False
+
+        entry = self.cache.lookup(record.url, sha256)
+        if entry is None:
+            entry = self._download(record, sha256)
+            if entry is None:
+                return False
+        path = self.cache.path(entry)
+        if self.mode == 'staged':
+            try:
+                path = self._stage(record, path, entry.sha256)
+            except CORRUPT_ARCHIVE_ERRORS:
+                # Damaged in the cache: the next pass downloads it again
+                self.cache.remove(entry.sha256)
+                raise
+            if path is None:
+                return False
+        emit({"type": "prefetched", "branch": record.branch, "version": record.version,
+              "url": record.url, "mode": self.mode, "path": path})
+        return True
+
+    def _download(self, record: BuildRecord, sha256: Optional[str]):
+        archive = os.path.join(self.cache.root, f"prefetch-{record.hash or 'build'}{archive_suffix(record.url)}")
+        os.makedirs(self.cache.root, exist_ok=True)
+        downloader = SegmentedDownloader(record.url, archive, throttle=self.throttle)
+        response = downloader.probe()
+        if response is not None:
+            response.close()
+        size = downloader.remote.size or 0
+        if self.daily_budget is not None and self.state['downloaded'] + size > self.daily_budget:
+            self._skip(record, "daily bandwidth budget reached")
+            return None
+        if size > self.cache.max_size:
+            self._skip(record, "larger than the archive cache")
+            return None
+        if shutil.disk_usage(self.cache.root).free - size < self.min_free:
+            self._skip(record, "not enough free disk space")
+            return None
+
+        log(f"Prefetching {record.version} ({size} bytes)")
+        try:
+            downloader.run()
+        finally:
+            # Bytes resumed from a .part file were counted by the pass that fetched them
+            self.state['downloaded'] += max(0, downloader.downloaded - downloader.resumed)
+            self._save_state()
+        if sha256 and downloader.sha256 != sha256:
+            os.remove(archive)
+            raise ChecksumMismatch(f"SHA-256 mismatch: expected {sha256}, got {downloader.sha256}")
+        return self.cache.add(archive, record.url, downloader.sha256)
+
+    def _stage(self, record: BuildRecord, archive: str, sha256: str) -> Optional[str]:
+        """Extract into the library's staging folder, replacing older staged builds of the branch"""
+        # Imported here: only staged mode needs the install pipeline's manifest helpers
+        from download_blender import tar_manifest, zip_manifest
+
+        target = staged_path(self.library, record.url)
+        needed = EXTRACTED_RATIO * os.path.getsize(archive)
+        if shutil.disk_usage(self.library).free - needed < self.min_free:
+            self._skip(record, "not enough free disk space")
+            return None
+        staged = self.state.setdefault('staged', {})
+        previous = staged.get(record.branch)
+        # The branch's previous build is replaced, so it does not count against the budget
+        others = sum(folder_size(path) for path in staged_builds(self.library) if path not in (target, previous))
+        if others + needed > self.staged_budget:
+            self._skip(record, "staged builds budget reached")
+            return None
+
+        discard_staged(target)
+        if is_tar_archive(record.url):
+            manifest = tar_manifest(install_archive(archive, target), sha256)
+        else:
+            os.makedirs(target, exist_ok=True)
+            manifest = zip_manifest(target, extract_zip(archive, target), sha256)
+        manifest.version = record.version
+        manifest.url = record.url
+        # Written last: a staged folder without a manifest is ignored and replaced
+        write_manifest(target, manifest)
+        # Only now that the new build is complete: until then the branch keeps its previous one
+        if previous and previous != target:
+            discard_staged(previous)
+        staged[record.branch] = target
+        self._save_state()
+        return target
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    from fetch_blender_versions import fetch_daily_versions
+
+    parser = argparse.ArgumentParser(description='Prefetch the newest daily builds')
+    parser.add_argument('--branch', action='append', dest='branches', default=None)
+    parser.add_argument('--architecture', default=DEFAULT_ARCHITECTURE)
+    parser.add_argument('--mode', choices=('cache', 'staged'), default='cache')
+    parser.add_argument('--library', default=None, help='library folder (staged mode)')
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help='bytes per second, 0 = unlimited')
+    parser.add_argument('--daily-budget', type=int, default=DEFAULT_DAILY_BUDGET)
+    parser.add_argument('--min-free', type=int, default=DEFAULT_MIN_FREE)
+    parser.add_argument('--staged-budget', type=int, default=DEFAULT_STAGED_BUDGET)
+    parser.add_argument('--watch', type=float, default=None, help='repeat every N seconds')
+    args = parser.parse_args(argv[1:])
+
+    try:
+        prefetcher = Prefetcher(args.branches or DEFAULT_BRANCHES, args.architecture, args.mode, args.library,
+                                args.rate, args.daily_budget, args.min_free, args.staged_budget)
+    except ValueError as e:
+        emit({"type": "error", "message": str(e)})
+        return 1
+    while True:
+        records = fetch_daily_versions(HttpCache(), limit=LISTING_LIMIT)
+        fetched = prefetcher.run(records)
+        emit({"type": "prefetch-complete", "fetched": [record.version for record in fetched],
+              "downloaded_today": prefetcher.state['downloaded']})
+        if not args.watch:
+            return 0
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,510 @@
+"""
+Segmented, resumable HTTP downloader for Blender archives
+Splits a download into byte ranges fetched over several connections straight
+into a preallocated ``.part`` file, and falls back to a single stream when the
+server does not honour Range requests. A ``.part.json`` sidecar records the URL,
+validator (ETag/Last-Modified) and the byte ranges already on disk, so an
+interrupted download continues with ``Range`` + ``If-Range`` instead of
+restarting; a changed validator discards the partial file. The SHA-256 of the
+file is computed while it downloads (see download_verify.SequentialHasher).
+
+Self-test usage (against a local stand-in server):
+    python backend/network/range_downloader.py --self-test [--size-mb N] [--connections N]
+"""
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from download_verify import SequentialHasher
+from http_cache import CHUNK_SIZE, USER_AGENT
+from throttle import TokenBucket
+
+DEFAULT_CONNECTIONS = 4
+DEFAULT_TIMEOUT = 30.0
+# Below this a segment costs more in connection setup than it gains in throughput
+MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+SEGMENT_RETRIES = 3
+POLL_INTERVAL = 0.25
+# How often the sidecar is rewritten while segments are running
+SIDECAR_INTERVAL = 1.0
+
+PART_SUFFIX = '.part'
+SIDECAR_SUFFIX = '.part.json'
+
+CONTENT_RANGE_PATTERN = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class DownloadError(Exception):
+    """Raised when a download cannot be completed"""
+
+
+class DownloadCancelled(DownloadError):
+    """Raised when the cancel event is set during a download"""
+
+
+class ConnectionDropped(ConnectionError):
+    """Raised when the server closes a Range response early; the segment continues from its last byte"""
+
+
+# Worth another request for the rest of the segment (ConnectionDropped is an OSError)
+RETRYABLE_ERRORS = (urllib.error.URLError, http.client.HTTPException, OSError)
+
+
+class RangesUnsupported(DownloadError):
+    """Raised by a segment when the server answers a Range request with the full body"""
+
+
+class RemoteChanged(DownloadError):
+    """Raised when the file changed on the server while it was being downloaded"""
+
+
+def retry_segment(segment: 'Segment', stream: Callable[['Segment'], None], check_cancel: Callable[[], None]):
+    """Call ``stream`` until ``segment`` is complete, resuming from its last written byte
+
+    A failed request that still wrote bytes does not use up a retry: only
+    attempts that made no progress count against SEGMENT_RETRIES.
+    """
+    attempt = 0
+    while not segment.complete:
+        check_cancel()
+        done = segment.done
+        try:
+            stream(segment)
+        except RETRYABLE_ERRORS as e:
+            attempt = 1 if segment.done > done else attempt + 1
+            if attempt > SEGMENT_RETRIES:
+                raise DownloadError(f"Range {segment.start}-{segment.end} failed: {e}") from e
+            time.sleep(min(2 ** attempt * 0.5, 5))
+
+
+def write_range(response, segment: 'Segment', f, check_cancel: Callable[[], None],
+                on_chunk: Callable[[int, bytes], None]):
+    """Write the body of a Range response into ``f`` at the segment's current offset
+
+    ``on_chunk(offset, chunk)`` runs once a chunk is flushed and counted in
+    ``segment.done``. Raises ConnectionDropped when the body ends early.
+    """
+    f.seek(segment.start + segment.done)
+    while not segment.complete:
+        check_cancel()
+        chunk = response.read(min(CHUNK_SIZE, segment.size - segment.done))
+        if not chunk:
+            raise ConnectionDropped(f"Connection closed at byte {segment.start + segment.done}")
+        f.write(chunk)
+        # Flush before counting the bytes so the sidecar never claims unwritten data
+        f.flush()
+        offset = segment.start + segment.done
+        segment.done += len(chunk)
+        on_chunk(offset, chunk)
+
+
+class Segment:
+    """Inclusive byte range [start, end] and how much of it is already on disk"""
+
+    __slots__ = ('start', 'end', 'done')
+
+    def __init__(self, start: int, end: int, done: int = 0):
+        self.start = start
+        self.end = end
+        self.done = done
+
+    @property
+    def size(self) -> int:
+        return self.end - self.start + 1
+
+    @property
+    def complete(self) -> bool:
+        return self.done >= self.size
+
+
+class RemoteFile(NamedTuple):
+    url: str
+    size: Optional[int]
+    accepts_ranges: bool
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+    @property
+    def validator(self) -> Optional[str]:
+        """Value sent as If-Range; a weak ETag cannot be used for ranges"""
+        if self.etag and not self.etag.startswith('W/'):
+            return self.etag
+        return self.last_modified
+
+
+def split_segments(size: int, connections: int, min_size: int = MIN_SEGMENT_SIZE) -> List[Segment]:
+    """Cut [0, size) into at most ``connections`` contiguous segments"""
+    count = max(1, min(connections, size // max(1, min_size)))
+    step = -(-size // count)
+    return [Segment(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def resplit_segments(segments: List[Segment], connections: int,
+                     min_size: int = MIN_SEGMENT_SIZE) -> List[Segment]:
+    """Split what is left of resumed segments so every connection has work again"""
+    result = [s for s in segments if s.complete]
+    # Bytes already written stay covered by a completed segment
+    result += [Segment(s.start, s.start + s.done - 1, s.done) for s in segments if s.done and not s.complete]
+    remaining = [Segment(s.start + s.done, s.end) for s in segments if not s.complete]
+    while remaining and len(remaining) < connections:
+        largest = max(remaining, key=lambda s: s.size)
+        if largest.size < 2 * min_size:
+            break
+        middle = largest.start + largest.size // 2
+        remaining.remove(largest)
+        remaining += [Segment(largest.start, middle - 1), Segment(middle, largest.end)]
+    return sorted(result + remaining, key=lambda s: s.start)
+
+
+def _request(url: str, headers: Optional[dict] = None) -> urllib.request.Request:
+    req = urllib.request.Request(url)
+    req.add_header('User-Agent', USER_AGENT)
+    for name, value in (headers or {}).items():
+        req.add_header(name, value)
+    return req
+
+
+def _content_range(response):
+    match = CONTENT_RANGE_PATTERN.match(response.getheader('Content-Range') or '')
+    if not match:
+        return None
+    total = match.group(3)
+    return int(match.group(1)), int(match.group(2)), (int(total) if total != '*' else None)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SegmentedDownloader:
+    """Download one URL to a file over up to ``connections`` parallel Range requests"""
+
+    def __init__(self, url: str, dest: str, connections: int = DEFAULT_CONNECTIONS,
+                 timeout: float = DEFAULT_TIMEOUT, on_progress: Optional[ProgressCallback] = None,
+                 cancel: Optional[threading.Event] = None, throttle: Optional[TokenBucket] = None):
+        self.url = url
+        self.dest = dest
+        self.part_path = dest + PART_SUFFIX
+        self.sidecar_path = dest + SIDECAR_SUFFIX
+        self.connections = max(1, connections)
+        self.timeout = timeout
+        self.on_progress = on_progress
+        self.cancel = cancel or threading.Event()
+        # Bandwidth budget shared by every connection (and possibly other downloads)
+        self.throttle = throttle
+        self.remote: Optional[RemoteFile] = None
+        self.downloaded = 0
+        # Bytes found on disk from a previous attempt
+        self.resumed = 0
+        # Hex SHA-256 of the downloaded file, set once run() succeeds
+        self.sha256: Optional[str] = None
+        self._hasher: Optional[SequentialHasher] = None
+        self._lock = threading.Lock()
+        # Set when one segment fails so the others stop at their next chunk
+        self._abort = threading.Event()
+        self._restarted = False
+
+    def _check_cancel(self):
+        if self.cancel.is_set() or self._abort.is_set():
+            raise DownloadCancelled(f"Download cancelled: {self.url}")
+
+    def _report(self):
+        if self.on_progress:
+            self.on_progress(self.downloaded, self.remote.size if self.remote else None)
+
+    def _add_bytes(self, count: int):
+        with self._lock:
+            self.downloaded += count
+        if self.throttle is not None:
+            self.throttle.consume(count, self.cancel)
+
+    def probe(self):
+        """Ask for the first byte to learn size, range support, validators and the post-redirect URL
+
+        Returns the open response when the server ignored the Range header, so
+        the single-stream fallback can keep reading it instead of asking again.
+        """
+        response = urllib.request.urlopen(_request(self.url, {'Range': 'bytes=0-0'}), timeout=self.timeout)
+        final_url = response.geturl()
+        etag = response.getheader('ETag')
+        last_modified = response.getheader('Last-Modified')
+        content_range = _content_range(response) if response.status == 206 else None
+        if content_range and content_range[2] is not None:
+            response.read()
+            response.close()
+            self.remote = RemoteFile(final_url, content_range[2], True, etag, last_modified)
+            return None
+        length = response.getheader('Content-Length')
+        size = int(length) if length and response.status == 200 else None
+        self.remote = RemoteFile(final_url, size, False, etag, last_modified)
+        if response.status != 200:
+            response.close()
+            return None
+        return response
+
+    def _load_sidecar(self) -> Optional[List[Segment]]:
+        """Segments of a previous attempt at the same, unchanged remote file"""
+        try:
+            with open(self.sidecar_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            part_size = os.path.getsize(self.part_path)
+        except (OSError, ValueError):
+            return None
+        remote = self.remote
+        if (state.get('url') != self.url or state.get('size') != remote.size or part_size != remote.size
+                or not remote.validator or state.get('validator') != remote.validator):
+            return None
+        try:
+            return [Segment(int(start), int(end), int(done)) for start, end, done in state.get('segments', [])]
+        except (TypeError, ValueError):
+            return None
+
+    def _save_sidecar(self, segments: List[Segment]):
+        state: Dict[str, Any] = {
+            'url': self.url,
+            'final_url': self.remote.url,
+            'size': self.remote.size,
+            'validator': self.remote.validator,
+            'segments': [[s.start, s.end, s.done] for s in segments],
+        }
+        tmp_path = self.sidecar_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.sidecar_path)
+
+    def discard_partial(self):
+        """Forget any partial download of this file"""
+        _remove(self.part_path)
+        _remove(self.sidecar_path)
+
+    def _finish(self):
+        os.replace(self.part_path, self.dest)
+        _remove(self.sidecar_path)
+
+    def run(self) -> int:
+        """Download to ``dest``; returns the number of bytes written (resumed bytes included)"""
+        self._check_cancel()
+        response = self.probe()
+        remote = self.remote
+        if remote.accepts_ranges and remote.size and remote.size > 0:
+            segments = self._load_sidecar()
+            if segments is None:
+                self.discard_partial()
+                segments = split_segments(remote.size, self.connections)
+            else:
+                self.resumed = sum(s.done for s in segments)
+                segments = resplit_segments(segments, self.connections)
+            try:
+                return self._run_segmented(segments)
+            except RangesUnsupported:
+                # Some mirrors answer the probe but not later ranges; start over on one stream
+                self._abort.clear()
+            except RemoteChanged:
+                # The build was replaced mid-download: the bytes on disk are useless
+                if self._restarted:
+                    raise
+                self._restarted = True
+                self._abort.clear()
+                self.discard_partial()
+                self.resumed = 0
+                self.downloaded = 0
+                return self.run()
+            self.downloaded = 0
+        self.discard_partial()
+        return self._run_single(response)
+
+    def _run_single(self, response=None) -> int:
+        """Plain sequential download, reusing the probe response when there is one"""
+        if response is None:
+            response = urllib.request.urlopen(_request(self.remote.url), timeout=self.timeout)
+        last_report = 0.0
+        digest = hashlib.sha256()
+        try:
+            with open(self.part_path, 'wb') as f:
+                while True:
+                    self._check_cancel()
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    digest.update(chunk)
+                    self._add_bytes(len(chunk))
+                    now = time.monotonic()
+                    if now - last_report >= POLL_INTERVAL:
+                        last_report = now
+                        self._report()
+        finally:
+            response.close()
+        if self.remote.size is not None and self.downloaded != self.remote.size:
+            raise DownloadError(f"Incomplete download: {self.downloaded}/{self.remote.size} bytes")
+        self.sha256 = digest.hexdigest()
+        self._finish()
+        self._report()
+        return self.downloaded
+
+    def _run_segmented(self, segments: List[Segment]) -> int:
+        if self.resumed:
+            self.downloaded = self.resumed
+        else:
+            # Preallocate so every segment can write at its own offset
+            with open(self.part_path, 'wb') as f:
+                f.truncate(self.remote.size)
+        self._save_sidecar(segments)
+        self._hasher = SequentialHasher(self.part_path, segments).start()
+
+        last_saved = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.connections) as pool:
+            pending = {pool.submit(self._fetch_segment, s) for s in segments if not s.complete}
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                    self._report()
+                    if time.monotonic() - last_saved >= SIDECAR_INTERVAL:
+                        last_saved = time.monotonic()
+                        self._save_sidecar(segments)
+            except BaseException:
+                self._abort.set()
+                self._hasher.stop()
+                raise
+            finally:
+                # Whatever happened, keep the ranges that made it to disk for the next attempt
+                pool.shutdown(wait=True)
+                self._save_sidecar(segments)
+        self.sha256 = self._hasher.finish()
+        self._finish()
+        return self.downloaded
+
+    def _fetch_segment(self, segment: Segment):
+        """Fetch the missing part of a segment, retrying from the last written byte"""
+        retry_segment(segment, self._stream_segment, self._check_cancel)
+
+    def _write_chunk(self, offset: int, chunk: bytes):
+        self._add_bytes(len(chunk))
+        self._hasher.feed(offset, chunk)
+
+    def _stream_segment(self, segment: Segment):
+        offset = segment.start + segment.done
+        headers = {'Range': f"bytes={offset}-{segment.end}"}
+        if self.remote.validator:
+            headers['If-Range'] = self.remote.validator
+        response = urllib.request.urlopen(_request(self.remote.url, headers), timeout=self.timeout)
+        try:
+            content_range = _content_range(response) if response.status == 206 else None
+            if not content_range or content_range[0] != offset:
+                etag = response.getheader('ETag')
+                if response.status == 200 and self.remote.validator and etag and etag != self.remote.etag:
+                    raise RemoteChanged(f"Remote file changed during download: {self.url}")
+                raise RangesUnsupported(f"Server ignored Range bytes={offset}-{segment.end}")
+            with open(self.part_path, 'r+b') as f:
+                write_range(response, segment, f, self._check_cancel, self._write_chunk)
+        finally:
+            response.close()
+
+
+def download(url: str, dest: str, connections: int = DEFAULT_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT,
+             on_progress: Optional[ProgressCallback] = None, cancel: Optional[threading.Event] = None,
+             throttle: Optional[TokenBucket] = None) -> int:
+    """Download ``url`` to ``dest`` with parallel ranges when possible; returns the byte count"""
+    return SegmentedDownloader(url, dest, connections, timeout, on_progress, cancel, throttle).run()
+
+
+def _self_test(size_mb: int, connections: int):
+    import tempfile
+
+    from standin_server import StandinServer
+
+    payload = os.urandom(size_mb * 1024 * 1024)
+    # Throttle each connection so parallel segments have something to win
+    rate = 8 * 1024 * 1024
+    files = {'/blender.zip': payload}
+
+    def check(dest, expected, label, elapsed, size, digest=None):
+        with open(dest, 'rb') as f:
+            ok = f.read() == expected
+        if digest is not None:
+            ok = ok and digest == hashlib.sha256(expected).hexdigest()
+        print(f"  {label:<30} {elapsed:6.2f} s  {size / elapsed / 1e6:7.1f} MB/s  {'ok' if ok else 'MISMATCH'}")
+        if not ok:
+            raise SystemExit(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dest = os.path.join(tmp, 'blender.zip')
+        for label, ranges, conns in (('single stream', True, 1),
+                                     (f'{connections} connections', True, connections),
+                                     ('no range support (fallback)', False, connections)):
+            with StandinServer(files, ranges=ranges, rate=rate) as server:
+                downloader = SegmentedDownloader(server.url('/blender.zip'), dest, conns)
+                t0 = time.perf_counter()
+                size = downloader.run()
+                check(dest, payload, label, time.perf_counter() - t0, size, downloader.sha256)
+            os.remove(dest)
+
+        # Interrupt halfway, then resume; then change the file behind a partial download
+        with StandinServer(files, rate=rate) as server:
+            cancel = threading.Event()
+            def stop_halfway(done, total):
+                if total and done >= total // 2:
+                    cancel.set()
+            try:
+                download(server.url('/blender.zip'), dest, connections, on_progress=stop_halfway, cancel=cancel)
+            except DownloadCancelled:
+                pass
+            downloader = SegmentedDownloader(server.url('/blender.zip'), dest, connections)
+            t0 = time.perf_counter()
+            size = downloader.run()
+            check(dest, payload, f'resumed ({downloader.resumed * 100 // size}% on disk)',
+                  time.perf_counter() - t0, size - downloader.resumed, downloader.sha256)
+            os.remove(dest)
+
+            cancel.clear()
+            try:
+                download(server.url('/blender.zip'), dest, connections, on_progress=stop_halfway, cancel=cancel)
+            except DownloadCancelled:
+                pass
+            changed = os.urandom(len(payload))
+            server.files['/blender.zip'] = changed
+            downloader = SegmentedDownloader(server.url('/blender.zip'), dest, connections)
+            t0 = time.perf_counter()
+            size = downloader.run()
+            check(dest, changed, f'changed ETag (resumed {downloader.resumed} B)',
+                  time.perf_counter() - t0, size, downloader.sha256)
+            os.remove(dest)
+
+        # Connections dropped mid-segment while the download runs: each segment continues where it stopped
+        for label, conns in (('dropped connections (single)', 1), (f'dropped connections ({connections})', connections)):
+            with StandinServer(files, rate=rate, drops=2 * conns) as server:
+                downloader = SegmentedDownloader(server.url('/blender.zip'), dest, conns)
+                t0 = time.perf_counter()
+                size = downloader.run()
+                check(dest, payload, label, time.perf_counter() - t0, size, downloader.sha256)
+            os.remove(dest)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Segmented downloader self-test')
+    parser.add_argument('--self-test', action='store_true')
+    parser.add_argument('--size-mb', type=int, default=32)
+    parser.add_argument('--connections', type=int, default=DEFAULT_CONNECTIONS)
+    args = parser.parse_args()
+    if not args.self_test:
+        parser.print_usage()
+        raise SystemExit(1)
+    print(f"Downloading {args.size_mb} MB from a local stand-in throttled per connection")
+    _self_test(args.size_mb, args.connections)
@@ -0,0 +1,60 @@
+"""
+Install folders staged ahead of time by the prefetcher
+A staged build is fully extracted, manifest included, under
+<library>/.blstaged/<key>; installing it is a rename into place, which is
+instant because the staging folder sits on the library's volume.
+"""
+import hashlib
+import os
+import shutil
+from typing import List, Optional
+
+import backend_path  # noqa: F401
+from tar_stream import promote
+
+from utils.install_manifest import InstallManifest, read_manifest
+
+STAGED_DIR_NAME = '.blstaged'
+
+
+def staged_root(library_root: str) -> str:
+    return os.path.join(library_root, STAGED_DIR_NAME)
+
+
+def staged_path(library_root: str, url: str) -> str:
+    return os.path.join(staged_root(library_root), hashlib.sha1(url.encode('utf-8')).hexdigest()[:16])
+
+
+def staged_manifest(library_root: str, url: str) -> Optional[InstallManifest]:
+    """Manifest of the staged build for ``url``, if one is complete"""
+    manifest = read_manifest(staged_path(library_root, url))
+    return manifest if manifest is not None and manifest.url == url else None
+
+
+def take_staged(library_root: str, url: str, final_path: str) -> Optional[InstallManifest]:
+    """Move the staged build for ``url`` to ``final_path``; None when nothing is staged"""
+    manifest = staged_manifest(library_root, url)
+    if manifest is None:
+        return None
+    promote(staged_path(library_root, url), final_path)
+    return manifest
+
+
+def staged_builds(library_root: str) -> List[str]:
+    root = staged_root(library_root)
+    return [os.path.join(root, name) for name in os.listdir(root)] if os.path.isdir(root) else []
+
+
+def folder_size(path: str) -> int:
+    total = 0
+    for folder, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.lstat(os.path.join(folder, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def discard_staged(path: str):
+    shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,149 @@
+"""
+Local HTTP stand-in for the Blender download servers
+Serves in-memory files with ETag, HEAD and single-range support so the download
+helpers can be exercised (and benchmarked) without touching the real CDN.
+A per-connection rate limit mimics the single-stream throughput cap of the CDN,
+and ``drops`` cuts the next N responses halfway, like a flaky link.
+"""
+import hashlib
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+
+def _parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single 'bytes=start-end' range; None when unsupported or unsatisfiable"""
+    if not header.startswith('bytes=') or ',' in header:
+        return None
+    start_str, _, end_str = header[len('bytes='):].partition('-')
+    try:
+        if start_str:
+            start = int(start_str)
+            end = int(end_str) if end_str else size - 1
+        else:
+            # Suffix range: last N bytes
+            start = max(0, size - int(end_str))
+            end = size - 1
+    except ValueError:
+        return None
+    end = min(end, size - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+class StandinServer:
+    """Threaded local server for a dict of path -> bytes; use as a context manager"""
+
+    def __init__(self, files: Dict[str, bytes], ranges: bool = True, rate: Optional[int] = None,
+                 drops: int = 0):
+        self.files = dict(files)
+        # False makes the server ignore Range headers, like a plain static host
+        self.ranges = ranges
+        # Bytes per second per connection (None = unthrottled)
+        self.rate = rate
+        # Number of upcoming response bodies to cut off halfway by closing the socket
+        self.drops = drops
+        self.requests = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    def etag(self, path: str) -> str:
+        return '"' + hashlib.sha1(self.files[path]).hexdigest()[:16] + '"'
+
+    def url(self, path: str) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self) -> 'StandinServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def _serve(self, head: bool):
+                path = self.path.split('?', 1)[0]
+                with server._lock:
+                    server.requests.append((self.command, path, self.headers.get('Range')))
+                body = server.files.get(path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                etag = server.etag(path)
+                size = len(body)
+                byte_range = None
+                range_header = self.headers.get('Range')
+                if server.ranges and range_header:
+                    if_range = self.headers.get('If-Range')
+                    # A stale If-Range validator means "send the whole new file"
+                    if if_range is None or if_range == etag:
+                        byte_range = _parse_range(range_header, size)
+                        if byte_range is None:
+                            self.send_response(416)
+                            self.send_header('Content-Range', f"bytes */{size}")
+                            self.send_header('Content-Length', '0')
+                            self.end_headers()
+                            return
+
+                if byte_range:
+                    start, end = byte_range
+                    self.send_response(206)
+                    self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+                else:
+                    start, end = 0, size - 1
+                    self.send_response(200)
+                if server.ranges:
+                    self.send_header('Accept-Ranges', 'bytes')
+                self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(end - start + 1))
+                self.end_headers()
+                if not head:
+                    self._write_body(memoryview(body)[start:end + 1])
+
+            def _write_body(self, view: memoryview):
+                block = 64 * 1024
+                started = time.monotonic()
+                sent = 0
+                limit = len(view)
+                with server._lock:
+                    if server.drops > 0 and limit > 1:
+                        server.drops -= 1
+                        limit //= 2
+                try:
+                    while sent < limit:
+                        self.wfile.write(view[sent:min(sent + block, limit)])
+                        sent += min(block, limit - sent)
+                        if server.rate:
+                            ahead = sent / server.rate - (time.monotonic() - started)
+                            if ahead > 0:
+                                time.sleep(ahead)
+                    if limit < len(view):
+                        self.wfile.flush()
+                        self.close_connection = True
+                        self.connection.shutdown(socket.SHUT_RDWR)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+        return Handler
@@ -0,0 +1,403 @@
+"""
+Streaming tar.xz install for Linux Blender builds
+The archive is never written to disk: a network thread reads the HTTP
+response into a small bounded pipe while the main thread decompresses (lzma
+releases the GIL) and untars it member by member, so download and
+decompression overlap. A dropped connection is continued with Range/If-Range
+when the server allows it, and the SHA-256 is computed on the fly.
+
+Self-test usage (against a local stand-in server):
+    python backend/network/tar_stream.py --self-test [--files N]
+"""
+import hashlib
+import os
+import queue
+import shutil
+import tarfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from typing import Callable, List, Optional, Tuple
+
+from content_store import ContentStore
+from download_verify import ChecksumMismatch
+from http_cache import CHUNK_SIZE, USER_AGENT
+from range_downloader import DownloadError
+from throttle import TokenBucket
+
+DEFAULT_TIMEOUT = 30.0
+# Compressed bytes buffered between the network and the decompressor
+PIPE_CHUNKS = 64
+WRITE_BUFFER = 1024 * 1024
+RECONNECT_RETRIES = 3
+POLL_INTERVAL = 0.25
+STAGING_SUFFIX = '.partial'
+
+ProgressCallback = Callable[[int, Optional[int]], None]
+
+
+class StreamCancelled(Exception):
+    """Raised when the cancel event is set during a streamed install"""
+
+
+def is_tar_archive(url: str) -> bool:
+    return url.split('?', 1)[0].lower().endswith(('.tar.xz', '.tar.gz', '.tar.bz2', '.tar'))
+
+
+class ResponsePipe:
+    """Read-only file object fed by a background download thread"""
+
+    def __init__(self, url: str, timeout: float = DEFAULT_TIMEOUT, cancel: Optional[threading.Event] = None,
+                 throttle: Optional[TokenBucket] = None, tee: Optional[str] = None):
+        self.url = url
+        self.timeout = timeout
+        self.cancel = cancel or threading.Event()
+        self.throttle = throttle
+        # Optional file receiving a copy of the compressed stream (archive cache)
+        self.tee = tee
+        self.size: Optional[int] = None
+        self.received = 0
+        self.sha256: Optional[str] = None
+        self._digest = hashlib.sha256()
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=PIPE_CHUNKS)
+        self._buffer = b''
+        self._offset = 0
+        self._error: Optional[BaseException] = None
+        self._eof = False
+        # Set by close() so the network thread stops without touching the caller's event
+        self._abort = threading.Event()
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+
+    def start(self) -> 'ResponsePipe':
+        self._thread.start()
+        return self
+
+    def _open(self, validator: Optional[str]):
+        req = urllib.request.Request(self.url)
+        req.add_header('User-Agent', USER_AGENT)
+        if self.received:
+            req.add_header('Range', f"bytes={self.received}-")
+            if validator:
+                req.add_header('If-Range', validator)
+        response = urllib.request.urlopen(req, timeout=self.timeout)
+        if self.received and response.status != 206:
+            response.close()
+            raise DownloadError(f"Cannot continue {self.url}: the server restarted or replaced the file")
+        return response
+
+    def _put(self, item):
+        # Blocks while the decompressor is behind, which throttles the download
+        while True:
+            if self.cancel.is_set() or self._abort.is_set():
+                raise StreamCancelled(f"Install cancelled: {self.url}")
+            try:
+                self._queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def _produce(self):
+        validator = None
+        attempt = 0
+        tee = open(self.tee, 'wb') if self.tee else None
+        try:
+            while True:
+                try:
+                    response = self._open(validator)
+                except (urllib.error.URLError, OSError):
+                    attempt += 1
+                    if attempt > RECONNECT_RETRIES or not self.received:
+                        raise
+                    time.sleep(min(2 ** attempt * 0.5, 5))
+                    continue
+                try:
+                    if self.size is None:
+                        length = response.getheader('Content-Length')
+                        self.size = int(length) if length else None
+                        etag = response.getheader('ETag')
+                        validator = etag if etag and not etag.startswith('W/') else response.getheader('Last-Modified')
+                    while True:
+                        chunk = response.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        self._digest.update(chunk)
+                        if tee is not None:
+                            tee.write(chunk)
+                        self.received += len(chunk)
+                        if self.throttle is not None:
+                            self.throttle.consume(len(chunk), self._abort)
+                        self._put(chunk)
+                except (urllib.error.URLError, OSError):
+                    attempt += 1
+                    if attempt > RECONNECT_RETRIES or not validator:
+                        raise
+                    continue
+                finally:
+                    response.close()
+                if self.size is not None and self.received < self.size:
+                    # Connection closed early without an error: continue where it stopped
+                    attempt += 1
+                    if attempt > RECONNECT_RETRIES or not validator:
+                        raise DownloadError(f"Incomplete download: {self.received}/{self.size} bytes")
+                    continue
+                self.sha256 = self._digest.hexdigest()
+                break
+        except BaseException as e:
+            self._error = e
+        finally:
+            if tee is not None:
+                tee.close()
+            try:
+                self._put(None)
+            except StreamCancelled:
+                pass
+
+    def read(self, size: int = -1) -> bytes:
+        """tarfile's stream mode calls read(bufsize) until it gets b''"""
+        parts = []
+        remaining = size
+        while remaining != 0:
+            available = len(self._buffer) - self._offset
+            if available:
+                take = available if remaining < 0 else min(available, remaining)
+                parts.append(self._buffer[self._offset:self._offset + take])
+                self._offset += take
+                if remaining > 0:
+                    remaining -= take
+                continue
+            if self._eof:
+                break
+            try:
+                chunk = self._queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # A cancelled network thread may exit without queueing its end marker
+                if self.cancel.is_set() or self._abort.is_set():
+                    raise StreamCancelled(f"Install cancelled: {self.url}")
+                continue
+            if chunk is None:
+                self._eof = True
+                if self._error is not None:
+                    raise self._error
+                break
+            self._buffer, self._offset = chunk, 0
+        return b''.join(parts)
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop the network thread, waiting up to ``timeout`` seconds for it to let go of its files"""
+        self._abort.set()
+        if timeout:
+            self._thread.join(timeout)
+
+
+def _safe_members(archive: tarfile.TarFile, target: str):
+    """Yield members that stay inside ``target`` (tarfile's data filter when available)"""
+    data_filter = getattr(tarfile, 'data_filter', None)
+    root = os.path.realpath(target)
+    for member in archive:
+        if data_filter is not None:
+            member = data_filter(member, target)
+        else:
+            path = os.path.realpath(os.path.join(target, member.name))
+            if os.path.commonpath([root, path]) != root or member.isdev():
+                raise tarfile.TarError(f"Refusing unsafe archive member {member.name}")
+        yield member
+
+
+def _extract_file(archive: tarfile.TarFile, member: tarfile.TarInfo, target: str,
+                  store: Optional[ContentStore] = None) -> int:
+    """Write a regular member and return its CRC-32, computed on the bytes being written
+
+    With a content store the member is also hashed and shared with other builds.
+    """
+    path = os.path.join(target, member.name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    crc = 0
+    digest = hashlib.sha256() if store is not None and store.enabled else None
+    source = archive.extractfile(member)
+    with open(path, 'wb', buffering=WRITE_BUFFER) as out:
+        while True:
+            block = source.read(WRITE_BUFFER)
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+            if digest is not None:
+                digest.update(block)
+            out.write(block)
+    if digest is not None:
+        store.adopt(path, digest.hexdigest(), member.size)
+    if member.mode is not None:
+        os.chmod(path, member.mode)
+    os.utime(path, (member.mtime, member.mtime))
+    return crc
+
+
+def promote(staging: str, final: str):
+    """Move a fully extracted staging folder into place"""
+    if not os.path.exists(final):
+        os.replace(staging, final)
+        return
+    for name in os.listdir(staging):
+        dest = os.path.join(final, name)
+        if os.path.isdir(dest) and not os.path.islink(dest):
+            shutil.rmtree(dest)
+        os.replace(os.path.join(staging, name), dest)
+    os.rmdir(staging)
+
+
+def _untar(fileobj, staging: str, store: Optional[ContentStore],
+           tick: Callable[[], None]) -> List[Tuple[tarfile.TarInfo, Optional[int]]]:
+    """Extract a tar stream member by member into ``staging``, calling ``tick`` after each"""
+    members: List[Tuple[tarfile.TarInfo, Optional[int]]] = []
+    # Members were already checked by _safe_members; don't filter them twice
+    extract_options = {'filter': 'fully_trusted'} if hasattr(tarfile, 'data_filter') else {}
+    with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+        for member in _safe_members(archive, staging):
+            if member.isreg():
+                members.append((member, _extract_file(archive, member, staging, store)))
+            else:
+                archive.extract(member, staging, **extract_options)
+                members.append((member, None))
+            tick()
+        # Drain the end-of-archive padding so a digest of the stream covers the whole file
+        while fileobj.read(CHUNK_SIZE):
+            pass
+    return members
+
+
+def _staging(target: str) -> str:
+    staging = target.rstrip('/\\') + STAGING_SUFFIX
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    return staging
+
+
+def stream_install(url: str, target: str, expected_sha256: Optional[str] = None,
+                   timeout: float = DEFAULT_TIMEOUT, on_progress: Optional[ProgressCallback] = None,
+                   cancel: Optional[threading.Event] = None,
+                   store: Optional[ContentStore] = None,
+                   throttle: Optional[TokenBucket] = None,
+                   tee: Optional[str] = None) -> Tuple[List[Tuple[tarfile.TarInfo, Optional[int]]], str]:
+    """Download and untar ``url`` into ``target`` in one pass
+
+    Returns (member, crc32) pairs, where the CRC-32 of each regular file is
+    computed while it is written (None for directories and links), and the
+    SHA-256 of the archive. With ``tee``, a copy of the archive is written
+    there too (removed if the install fails).
+
+    Members are written to ``target + '.partial'`` and moved into ``target``
+    only once the whole stream was read and its digest matched.
+    """
+    staging = _staging(target)
+    pipe = ResponsePipe(url, timeout, cancel, throttle, tee).start()
+    last_report = [0.0]
+
+    def tick():
+        now = time.monotonic()
+        if on_progress and now - last_report[0] >= POLL_INTERVAL:
+            last_report[0] = now
+            on_progress(pipe.received, pipe.size)
+
+    try:
+        members = _untar(pipe, staging, store, tick)
+        if expected_sha256 and pipe.sha256 != expected_sha256:
+            raise ChecksumMismatch(f"SHA-256 mismatch: expected {expected_sha256}, got {pipe.sha256}")
+        promote(staging, target)
+    except BaseException:
+        pipe.close(POLL_INTERVAL * 4 if tee else None)
+        shutil.rmtree(staging, ignore_errors=True)
+        if tee:
+            try:
+                os.remove(tee)
+            except OSError:
+                pass
+        raise
+    if on_progress:
+        on_progress(pipe.received, pipe.size)
+    return members, pipe.sha256
+
+
+def install_archive(path: str, target: str, on_progress: Optional[ProgressCallback] = None,
+                    store: Optional[ContentStore] = None) -> List[Tuple[tarfile.TarInfo, Optional[int]]]:
+    """Untar a local archive (e.g. from the archive cache) the same way stream_install does"""
+    staging = _staging(target)
+    size = os.path.getsize(path)
+    last_report = [0.0]
+    try:
+        with open(path, 'rb') as f:
+            def tick():
+                now = time.monotonic()
+                if on_progress and now - last_report[0] >= POLL_INTERVAL:
+                    last_report[0] = now
+                    on_progress(f.tell(), size)
+
+            members = _untar(f, staging, store, tick)
+        promote(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    if on_progress:
+        on_progress(size, size)
+    return members
+
+
+def _self_test(files: int):
+    import io
+    import random
+    import tempfile
+
+    from standin_server import StandinServer
+
+    rng = random.Random(1)
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:xz', preset=1) as archive:
+        def add(name, data, mode=0o644):
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = mode
+            archive.addfile(info, io.BytesIO(data))
+        add('blender-4.3.0-linux-x64/blender', rng.randbytes(4 * 1024 * 1024), 0o755)
+        for index in range(files):
+            add(f'blender-4.3.0-linux-x64/4.3/python/lib/module_{index}.py', bytes(rng.randint(100, 20000)))
+        link = tarfile.TarInfo('blender-4.3.0-linux-x64/lib/libfoo.so')
+        link.type = tarfile.SYMTYPE
+        link.linkname = 'libfoo.so.1'
+        archive.addfile(link)
+    payload = buf.getvalue()
+    digest = hashlib.sha256(payload).hexdigest()
+
+    with tempfile.TemporaryDirectory() as tmp, StandinServer({'/b.tar.xz': payload}, rate=4 * 1024 * 1024) as server:
+        target = os.path.join(tmp, 'Blender 4.3')
+        t0 = time.perf_counter()
+        members, _ = stream_install(server.url('/b.tar.xz'), target, digest)
+        elapsed = time.perf_counter() - t0
+        exe = os.path.join(target, 'blender-4.3.0-linux-x64', 'blender')
+        with open(exe, 'rb') as f:
+            ok = zlib.crc32(f.read()) == members[0][1]
+        ok = ok and len(members) == files + 2 and os.access(exe, os.X_OK) and not os.path.exists(target + STAGING_SUFFIX)
+        print(f"  {len(payload) / 1e6:.1f} MB tar.xz, {len(members)} members in {elapsed:.2f} s, "
+              f"no archive on disk: {not any(n.endswith('.xz') for n in os.listdir(tmp))}, ok: {ok}")
+
+        bad_target = os.path.join(tmp, 'bad')
+        try:
+            stream_install(server.url('/b.tar.xz'), bad_target, '0' * 64)
+            ok = False
+        except ChecksumMismatch:
+            ok = ok and not os.path.exists(bad_target) and not os.path.exists(bad_target + STAGING_SUFFIX)
+        print(f"  wrong digest rejected and staging removed: {ok}")
+        if not ok:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Streaming tar install self-test')
+    parser.add_argument('--self-test', action='store_true')
+    parser.add_argument('--files', type=int, default=2000)
+    args = parser.parse_args()
+    if not args.self_test:
+        parser.print_usage()
+        raise SystemExit(1)
+    _self_test(args.files)
@@ -0,0 +1,65 @@
+"""
+Token-bucket bandwidth limiting for the download helpers
+Every reader takes one token per byte it received; tokens refill at the
+configured rate, so all connections sharing a bucket stay under one budget.
+The rate can change while downloads run (the download queue rebalances it
+as jobs start and finish).
+"""
+import threading
+import time
+from typing import Optional
+
+# Tokens that may pile up while idle, in seconds of the rate
+BURST_SECONDS = 0.5
+MIN_BURST = 256 * 1024
+POLL_INTERVAL = 0.25
+
+
+class TokenBucket:
+    """Thread-safe byte budget; a rate of None (or 0) means unlimited"""
+
+    def __init__(self, rate: Optional[float] = None):
+        self.rate: Optional[float] = None
+        self.burst = MIN_BURST
+        self.tokens = 0.0
+        # Bytes that went through the bucket, throttled or not
+        self.consumed = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.set_rate(rate)
+
+    def set_rate(self, rate: Optional[float]):
+        with self._lock:
+            self._refill()
+            self.rate = rate if rate and rate > 0 else None
+            if self.rate:
+                self.burst = max(MIN_BURST, self.rate * BURST_SECONDS)
+                self.tokens = min(self.tokens, self.burst)
+
+    def _refill(self):
+        """Add the tokens earned since the last update (lock held)"""
+        now = time.monotonic()
+        if self.rate:
+            self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, count: int, cancel: Optional[threading.Event] = None):
+        """Account for ``count`` bytes, sleeping until the budget allows them"""
+        with self._lock:
+            self.consumed += count
+            if not self.rate:
+                return
+            self._refill()
+            # Going into debt lets a chunk through immediately; the wait below pays it back
+            self.tokens -= count
+        while True:
+            with self._lock:
+                if not self.rate:
+                    return
+                self._refill()
+                if self.tokens >= 0:
+                    return
+                delay = -self.tokens / self.rate
+            if cancel is not None and cancel.is_set():
+                return
+            time.sleep(min(delay, POLL_INTERVAL))
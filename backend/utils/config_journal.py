@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Crash-safe writes of config.json.
+
+Changes are appended to ``config.json.journal`` as small JSON lines, then
+compacted: the snapshot plus the pending journal entries are written to a
+temporary file, fsynced once and renamed over ``config.json``. A crash
+therefore leaves either the old or the new file, never a truncated one, and
+entries not yet compacted are replayed by the next reader or writer.
+
+Changes recorded within ``window`` seconds share one compaction, and all
+processes serialize on ``config.json.lock``.
+
+Every script writes through this module: ``transact`` (and the
+``add_executable``/``update_executable``/``remove_executable`` helpers
+built on it) reads the config, decides on its changes and records them
+only if no other writer committed in between, compare-and-swap on a
+revision counter kept in the lock file; otherwise it reads again and
+retries.
+
+A ``replace`` entry remembers which config.json it was recorded over.
+Electron writes the file directly, without the lock; if it did so before
+the entry was compacted, the entry is dropped rather than reverting that
+edit, and ``commit`` reports a ConfigConflict.
+"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+# os.replace fails on Windows while another process reads the file; retry this long
+REPLACE_RETRY = 1.0
+# Attempts of a transaction before giving up on concurrent writers
+CAS_RETRIES = 20
+# Overrides the location of config.json for every backend script
+CONFIG_ENV = "BLENDER_LAUNCHER_CONFIG"
+
+Op = Dict[str, Any]
+# (mtime in ns, size, inode) of the snapshot file
+Stamp = Tuple[int, int, int]
+T = TypeVar("T")
+
+
+class ConfigConflict(Exception):
+    """Another writer committed since the revision a change was based on."""
+
+
+def default_config_path() -> str:
+    """config.json at the project root (where Electron reads it), unless overridden."""
+    override = os.environ.get(CONFIG_ENV)
+    if override:
+        return os.path.abspath(override)
+    # backend/utils -> project root two levels up
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "config.json"))
+
+
+def file_stamp(path: str) -> Optional[Stamp]:
+    """Identity of a file on disk, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def normalize_config(config: Any) -> Dict[str, Any]:
+    """Coerce a parsed config into ``{"blenders": [...], ...}``."""
+    if not isinstance(config, dict):
+        config = {}
+    if not isinstance(config.get("blenders"), list):
+        config["blenders"] = []
+    return config
+
+
+def apply_op(config: Dict[str, Any], op: Op) -> None:
+    """Apply one journal entry to ``config`` in place.
+
+    Entries are idempotent, since a crash between the rename and the
+    journal reset replays them on the snapshot that already contains them.
+
+    Args:
+        config: Normalized configuration.
+        op: ``{"op": "add", "entry": {...}}`` (skipped when the path is
+            already listed), ``{"op": "update", "path": ..., "fields": {...}}``,
+            ``{"op": "remove", "path": ...}`` or ``{"op": "replace", "config": {...}}``
+            (``record`` adds the ``"base"`` stamp it was recorded over).
+    """
+    blenders = config["blenders"]
+    kind = op.get("op")
+    if kind == "replace":
+        config.clear()
+        config.update(normalize_config(json.loads(json.dumps(op.get("config")))))
+    elif kind == "add":
+        entry = op.get("entry") or {}
+        if not any(isinstance(b, dict) and b.get("path") == entry.get("path") for b in blenders):
+            blenders.append(dict(entry))
+    elif kind == "update":
+        for blender in blenders:
+            if isinstance(blender, dict) and blender.get("path") == op.get("path"):
+                blender.update(op.get("fields") or {})
+                break
+    elif kind == "remove":
+        for i, blender in enumerate(blenders):
+            if isinstance(blender, dict) and blender.get("path") == op.get("path"):
+                del blenders[i]
+                break
+
+
+def is_stale(op: Op, stamp: Optional[Stamp]) -> bool:
+    """True for a ``replace`` entry recorded over another config.json than ``stamp``."""
+    if op.get("op") != "replace" or "base" not in op:
+        return False
+    base = op["base"]
+    return (tuple(base) if isinstance(base, list) else base) != stamp
+
+
+def write_snapshot(path: str, config: Dict[str, Any]) -> None:
+    """Write ``config`` to a temporary file, fsync it and rename it over ``path``."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        deadline = time.monotonic() + REPLACE_RETRY
+        while True:
+            try:
+                os.replace(tmp_path, path)
+                return
+            except PermissionError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FileLock:
+    """Exclusive lock on ``path`` shared by every process; reentrant within one instance.
+
+    While held, ``fd`` is the open lock file; ConfigJournal keeps the
+    revision counter in it.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> "FileLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    if os.name == "nt":
+                        # LK_LOCK gives up after ten seconds; keep waiting like flock does
+                        while True:
+                            try:
+                                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                                break
+                            except OSError:
+                                continue
+                    else:
+                        fcntl.flock(fd, fcntl.LOCK_EX)
+                except BaseException:
+                    os.close(fd)
+                    raise
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    @property
+    def fd(self) -> int:
+        if self._fd is None:
+            raise RuntimeError("Lock not held")
+        return self._fd
+
+    def __exit__(self, *exc: Any) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                if os.name == "nt":
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+
+class ConfigJournal:
+    """Journaled, batched writer for one config file.
+
+    Args:
+        path: Path of config.json.
+        window: Seconds to wait for more changes before compacting (0 = right away).
+        on_due: Called from a timer thread when a batch is due; defaults to
+            ``commit``. Owners that keep their own copy of the config pass a
+            method that takes their lock and then commits.
+    """
+
+    def __init__(self, path: str, window: float = 0.0, on_due: Optional[Callable[[], Any]] = None):
+        self.path = os.path.abspath(path)
+        self.journal_path = self.path + JOURNAL_SUFFIX
+        self.lock = FileLock(self.path + LOCK_SUFFIX)
+        self.window = window
+        self.on_due = on_due or self.commit
+        # Snapshots written by this instance, to compare batching with one write per change
+        self.commits = 0
+        self._timer: Optional[threading.Timer] = None
+        self._timer_lock = threading.Lock()
+
+    def ensure_exists(self, config: Dict[str, Any]) -> bool:
+        """Write ``config`` if the file does not exist yet; returns True when it was created."""
+        with self.lock:
+            if os.path.exists(self.path):
+                return False
+            write_snapshot(self.path, config)
+            self.commits += 1
+            return True
+
+    def _read_snapshot(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = f.read().strip() or "{}"
+        except FileNotFoundError:
+            raw = "{}"
+        return normalize_config(json.loads(raw))
+
+    def _read_journal(self) -> List[Op]:
+        ops = []
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        op = json.loads(line)
+                    except ValueError:
+                        # Torn last line of a crashed append: that change never completed
+                        continue
+                    if isinstance(op, dict):
+                        ops.append(op)
+        except FileNotFoundError:
+            pass
+        return ops
+
+    def _replay(self, config: Dict[str, Any], ops: List[Op], stamp: Optional[Stamp]) -> int:
+        """Apply ``ops`` to the snapshot read with ``stamp``; returns how many stale entries were skipped."""
+        stale = 0
+        for op in ops:
+            if is_stale(op, stamp):
+                stale += 1
+                continue
+            apply_op(config, op)
+        return stale
+
+    def revision(self) -> int:
+        """Number of changes committed so far, by every writer."""
+        with self.lock:
+            os.lseek(self.lock.fd, 0, os.SEEK_SET)
+            try:
+                return int(os.read(self.lock.fd, 32).strip() or 0)
+            except ValueError:
+                return 0
+
+    def advance(self, expected_revision: Optional[int] = None) -> int:
+        """Compare-and-swap the revision counter; returns the new revision.
+
+        Args:
+            expected_revision: Revision the caller's change was based on
+                (None skips the check).
+
+        Raises:
+            ConfigConflict: Another writer committed since ``expected_revision``.
+        """
+        with self.lock:
+            current = self.revision()
+            if expected_revision is not None and current != expected_revision:
+                raise ConfigConflict(f"Config revision is {current}, expected {expected_revision}")
+            # Fixed width, so the counter is overwritten in place
+            os.lseek(self.lock.fd, 0, os.SEEK_SET)
+            os.write(self.lock.fd, b"%020d\n" % (current + 1))
+            return current + 1
+
+    def read(self) -> Tuple[Dict[str, Any], Optional[Stamp], int]:
+        """Snapshot with the pending journal entries applied, its stamp and the revision.
+
+        Raises:
+            ValueError: config.json is not valid JSON.
+        """
+        with self.lock:
+            config = self._read_snapshot()
+            # Taken after reading: an edit in between makes a replacement look stale, never current
+            stamp = file_stamp(self.path)
+            self._replay(config, self._read_journal(), stamp)
+            return config, stamp, self.revision()
+
+    def record(self, ops: Iterable[Op], expected_revision: Optional[int] = None) -> int:
+        """Append changes to the journal and schedule their compaction; returns the new revision.
+
+        Args:
+            ops: Journal entries (see apply_op).
+            expected_revision: Revision the changes were based on; None records them unconditionally.
+
+        Raises:
+            ConfigConflict: Another writer committed since ``expected_revision``.
+        """
+        ops = list(ops)
+        with self.lock:
+            stamp = file_stamp(self.path)
+            # A whole replacement only applies to the file it was recorded over
+            lines = "".join(json.dumps(dict(op, base=stamp) if op.get("op") == "replace" else op,
+                                       ensure_ascii=False) + "\n" for op in ops)
+            if not lines:
+                return self.revision()
+            revision = self.advance(expected_revision)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        if self.window <= 0:
+            self.on_due()
+            return revision
+        with self._timer_lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.window, self._due)
+                self._timer.daemon = True
+                self._timer.start()
+        return revision
+
+    def _due(self) -> None:
+        with self._timer_lock:
+            self._timer = None
+        self.on_due()
+
+    def pending(self) -> bool:
+        try:
+            return os.path.getsize(self.journal_path) > 0
+        except OSError:
+            return False
+
+    def commit(self) -> Tuple[Dict[str, Any], Optional[Stamp], int]:
+        """Compact the journal into config.json; returns the config, its new stamp and the revision.
+
+        Entries recorded by other processes are compacted too. Nothing is
+        written when the journal is empty.
+
+        Raises:
+            ConfigConflict: config.json was edited outside the journal since a
+                pending ``replace`` was recorded; that entry was dropped, the
+                others were compacted.
+            ValueError: config.json is not valid JSON.
+        """
+        with self._timer_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        with self.lock:
+            config = self._read_snapshot()
+            stamp = file_stamp(self.path)
+            ops = self._read_journal()
+            stale = 0
+            if ops:
+                stale = self._replay(config, ops, stamp)
+                write_snapshot(self.path, config)
+                self.commits += 1
+                # The snapshot is durable: the entries it absorbed can go
+                os.remove(self.journal_path)
+            if stale:
+                raise ConfigConflict(f"config.json was changed by another program: {stale} pending replacement(s) dropped")
+            return config, file_stamp(self.path), self.revision()
+
+    def overwrite(self, config: Dict[str, Any]) -> Optional[Stamp]:
+        """Write a whole config right away and drop the journal; returns the new stamp.
+
+        For owners that already folded the pending entries into ``config``
+        (read them under ``self.lock`` first).
+        """
+        with self.lock:
+            write_snapshot(self.path, config)
+            self.commits += 1
+            try:
+                os.remove(self.journal_path)
+            except FileNotFoundError:
+                pass
+            return file_stamp(self.path)
+
+
+def transact(plan: Callable[[Dict[str, Any]], Tuple[List[Op], T]], path: Optional[str] = None,
+             retries: int = CAS_RETRIES) -> T:
+    """Read the config, plan changes from it and record them unless another writer got in first.
+
+    Args:
+        plan: Called with the current config (a private copy); returns the
+            journal entries to record (possibly none) and the value to hand
+            back. It runs again on a fresh config after a conflict, so it
+            must not have side effects.
+        path: config.json to change (default_config_path() by default).
+        retries: Attempts before giving up.
+
+    Returns:
+        The value returned by the successful ``plan`` call.
+
+    Raises:
+        ConfigConflict: Every attempt lost the race.
+        ValueError: config.json is not valid JSON.
+    """
+    journal = ConfigJournal(path or default_config_path())
+    for _ in range(retries):
+        config, _, revision = journal.read()
+        ops, result = plan(config)
+        try:
+            journal.record(ops, expected_revision=revision)
+        except ConfigConflict:
+            continue
+        return result
+    raise ConfigConflict(f"Gave up after {retries} conflicting attempts")
+
+
+def _find(config: Dict[str, Any], exe_path: str) -> Optional[Dict[str, Any]]:
+    return next((b for b in config["blenders"] if isinstance(b, dict) and b.get("path") == exe_path), None)
+
+
+def add_executable(entry: Dict[str, Any], path: Optional[str] = None) -> bool:
+    """Add an executable unless its path is already listed; returns True when it was added."""
+    def plan(config: Dict[str, Any]) -> Tuple[List[Op], bool]:
+        if _find(config, entry.get("path")) is not None:
+            return [], False
+        return [{"op": "add", "entry": entry}], True
+    return transact(plan, path)
+
+
+def update_executable(exe_path: str, fields: Dict[str, Any], path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Change some fields of an executable; returns its previous entry, None if it is not listed."""
+    def plan(config: Dict[str, Any]) -> Tuple[List[Op], Optional[Dict[str, Any]]]:
+        previous = _find(config, exe_path)
+        if previous is None:
+            return [], None
+        return [{"op": "update", "path": exe_path, "fields": fields}], previous
+    return transact(plan, path)
+
+
+def remove_executable(exe_path: str, path: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Remove an executable; returns the removed entry, None if it is not listed."""
+    def plan(config: Dict[str, Any]) -> Tuple[List[Op], Optional[Dict[str, Any]]]:
+        removed = _find(config, exe_path)
+        if removed is None:
+            return [], None
+        return [{"op": "remove", "path": exe_path}], removed
+    return transact(plan, path)
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Install manifest written next to every downloaded build.
+
+The manifest is built from the archive member list while extracting, so
+locating the executable, checking integrity, uninstalling and library scans
+read one small file instead of walking tens of thousands of files.
+
+CLI usage:
+    python backend/utils/install_manifest.py exe <install_folder>
+    python backend/utils/install_manifest.py verify <install_folder> [--crc]
+    python backend/utils/install_manifest.py uninstall <install_folder>
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+MANIFEST_NAME = ".blmanifest"
+FORMAT_VERSION = 1
+
+# Executable names, in order of preference
+EXECUTABLE_NAMES = ("blender.exe", "blender")
+
+# (relative posix path, size, crc32 as 8 hex digits or None)
+FileEntry = Tuple[str, int, Optional[str]]
+
+
+@dataclass
+class InstallManifest:
+    executable: Optional[str]
+    files: List[FileEntry] = field(default_factory=list)
+    links: List[str] = field(default_factory=list)
+    directories: List[str] = field(default_factory=list)
+    version: str = ""
+    url: str = ""
+    archive_sha256: str = ""
+    created: str = ""
+
+    def to_dict(self) -> dict:
+        return {
+            "format": FORMAT_VERSION,
+            "version": self.version,
+            "url": self.url,
+            "archive_sha256": self.archive_sha256,
+            "created": self.created or datetime.now().isoformat(timespec="seconds"),
+            "executable": self.executable,
+            "files": [list(entry) for entry in self.files],
+            "links": self.links,
+            "directories": self.directories,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "InstallManifest":
+        return cls(
+            executable=data.get("executable"),
+            files=[(str(p), int(s), c) for p, s, c in data.get("files", [])],
+            links=list(data.get("links", [])),
+            directories=list(data.get("directories", [])),
+            version=data.get("version", ""),
+            url=data.get("url", ""),
+            archive_sha256=data.get("archive_sha256", ""),
+            created=data.get("created", ""),
+        )
+
+
+def pick_executable(paths: Iterable[str]) -> Optional[str]:
+    """Choose the Blender executable among archive member paths (shallowest match wins)."""
+    best: Optional[Tuple[int, int, str]] = None
+    for path in paths:
+        name = path.rsplit("/", 1)[-1]
+        for rank, candidate in enumerate(EXECUTABLE_NAMES):
+            # Windows names are case-insensitive, the Linux binary is not
+            matches = (name.lower() == candidate) if candidate.endswith(".exe") else (name == candidate)
+            if matches:
+                key = (rank, path.count("/"), path)
+                if best is None or key < best:
+                    best = key
+    return best[2] if best else None
+
+
+def _outside(rel: str) -> bool:
+    """True for manifest entries that would resolve outside the install folder."""
+    return rel.startswith(("/", "\\")) or ":" in rel or ".." in rel.replace("\\", "/").split("/")
+
+
+def manifest_path(root: str | Path) -> Path:
+    return Path(root) / MANIFEST_NAME
+
+
+def write_manifest(root: str | Path, manifest: InstallManifest) -> Path:
+    """Write the manifest atomically into ``root``."""
+    path = manifest_path(root)
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(manifest.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
+
+
+def read_manifest(root: str | Path) -> Optional[InstallManifest]:
+    try:
+        with manifest_path(root).open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("format") != FORMAT_VERSION:
+        return None
+    try:
+        return InstallManifest.from_dict(data)
+    except (TypeError, ValueError):
+        return None
+
+
+def manifest_executable(root: str | Path) -> Optional[Path]:
+    """Absolute executable path recorded in the manifest, if it still exists."""
+    manifest = read_manifest(root)
+    if manifest is None or not manifest.executable:
+        return None
+    exe = Path(root) / manifest.executable
+    return exe if exe.is_file() else None
+
+
+def _file_crc32(path: Path) -> str:
+    crc = 0
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            crc = zlib.crc32(block, crc)
+    return f"{crc:08x}"
+
+
+def verify_install(root: str | Path, check_crc: bool = False) -> dict:
+    """Compare an install folder with its manifest.
+
+    Args:
+        root: Install folder containing the manifest.
+        check_crc: Also read every file and compare its CRC-32 (slow).
+
+    Returns:
+        dict: ``ok`` plus the lists of missing, resized and corrupt files.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return {"ok": False, "error": "No install manifest"}
+    root = Path(root)
+    missing: List[str] = []
+    resized: List[str] = []
+    corrupt: List[str] = []
+    for rel, size, crc in manifest.files:
+        path = root / rel
+        try:
+            actual = path.stat().st_size
+        except OSError:
+            missing.append(rel)
+            continue
+        if actual != size:
+            resized.append(rel)
+        elif check_crc and crc and _file_crc32(path) != crc:
+            corrupt.append(rel)
+    missing += [rel for rel in manifest.links if not os.path.lexists(root / rel)]
+    return {
+        "ok": not (missing or resized or corrupt),
+        "files": len(manifest.files),
+        "missing": missing,
+        "resized": resized,
+        "corrupt": corrupt,
+    }
+
+
+def uninstall(root: str | Path) -> dict:
+    """Remove what the install created, keeping files the user added.
+
+    Returns:
+        dict: Number of removed files and directories, and the leftovers.
+    """
+    manifest = read_manifest(root)
+    if manifest is None:
+        return {"ok": False, "error": "No install manifest"}
+    root = Path(root)
+    entries = [rel for rel in [entry[0] for entry in manifest.files] + manifest.links if not _outside(rel)]
+    removed_files = 0
+    for rel in entries:
+        try:
+            (root / rel).unlink()
+            removed_files += 1
+        except FileNotFoundError:
+            pass
+    # Deepest directories first; non-empty ones hold user files and stay
+    directories = {rel for rel in manifest.directories if not _outside(rel)}
+    for rel in entries:
+        parent = rel.rsplit("/", 1)[0] if "/" in rel else ""
+        while parent:
+            directories.add(parent)
+            parent = parent.rsplit("/", 1)[0] if "/" in parent else ""
+    removed_dirs = 0
+    for rel in sorted(directories, key=lambda d: d.count("/"), reverse=True):
+        try:
+            (root / rel).rmdir()
+            removed_dirs += 1
+        except OSError:
+            pass
+    manifest_path(root).unlink()
+    leftovers = [p.name for p in root.iterdir()] if root.is_dir() else []
+    if not leftovers:
+        root.rmdir()
+    return {"ok": True, "files": removed_files, "directories": removed_dirs, "leftovers": leftovers}
+
+
+def main(argv: list[str]) -> int:
+    if len(argv) < 3 or argv[1] not in ("exe", "verify", "uninstall"):
+        print(json.dumps({"success": False, "error": "Usage: install_manifest.py <exe|verify|uninstall> <install_folder> [--crc]"}))
+        return 1
+
+    action, root = argv[1], Path(argv[2]).resolve()
+    if action == "exe":
+        exe = manifest_executable(root)
+        print(json.dumps({"success": exe is not None, "exe": exe.as_posix() if exe else None}, ensure_ascii=False))
+        return 0 if exe else 2
+    if action == "verify":
+        result = verify_install(root, check_crc="--crc" in argv)
+    else:
+        result = uninstall(root)
+    print(json.dumps({"success": result.pop("ok"), **result}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Rate-limited progress events with throughput and ETA.
+
+Download and extraction code calls back for every chunk or batch; sending
+each of those to Electron would mean tens of thousands of JSON lines per
+install. ``ProgressReporter`` coalesces them to a fixed cadence and adds
+the phase, bytes per second and a smoothed ETA to every event.
+"""
+from __future__ import annotations
+
+import json
+import time
+from typing import Any, Callable, Dict, Optional
+
+# At most one event per interval while a phase runs...
+DEFAULT_INTERVAL = 0.5
+# ...and only when the phase moved by at least this fraction (or the heartbeat is due)
+DEFAULT_MIN_DELTA = 0.005
+HEARTBEAT = 2.0
+# Weight of the newest sample in the smoothed throughput
+DEFAULT_SMOOTHING = 0.3
+
+Emitter = Callable[[Dict[str, Any]], None]
+
+
+def emit_json(message: Dict[str, Any]) -> None:
+    """Default emitter: one JSON line on stdout, the format every network script uses."""
+    print(json.dumps(message, ensure_ascii=False), flush=True)
+
+
+class ProgressReporter:
+    """Coalesce progress callbacks into ``{"type": "progress", ...}`` events.
+
+    Each phase (``download``, ``verify``, ``extract``...) maps its own
+    ``done``/``total`` counter onto a slice of the overall percentage, so
+    callers pass raw counters instead of computing percentages themselves.
+
+    Args:
+        emit: Called with each event dict (default: JSON line on stdout).
+        interval: Minimum seconds between two events of a phase.
+        min_delta: Minimum progress, as a fraction of the phase, between two events.
+        smoothing: Weight of the newest throughput sample (0..1).
+        clock: Monotonic clock, replaceable for tests.
+    """
+
+    def __init__(self, emit: Optional[Emitter] = None, interval: float = DEFAULT_INTERVAL,
+                 min_delta: float = DEFAULT_MIN_DELTA, smoothing: float = DEFAULT_SMOOTHING,
+                 clock: Callable[[], float] = time.monotonic):
+        self.emit = emit or emit_json
+        self.interval = interval
+        self.min_delta = min_delta
+        self.smoothing = smoothing
+        self.clock = clock
+        self.phase = ""
+        self.low = 0
+        self.high = 100
+        self.text = ""
+        self.done = 0
+        self.total: Optional[int] = None
+        self.rate = 0.0
+        # Events actually emitted, to compare with the number of callbacks
+        self.emitted = 0
+        self._last_time = 0.0
+        self._last_done = 0
+        self._sample_time = 0.0
+        self._sample_done: Optional[int] = None
+
+    def start_phase(self, phase: str, low: int, high: int, text: str = "") -> None:
+        """Begin a phase covering ``low``..``high`` percent.
+
+        Args:
+            phase: Phase name sent with every event.
+            low: Overall percentage at the start of the phase.
+            high: Overall percentage at its end.
+            text: Label; ``{percent}`` is replaced by the phase's own percentage.
+        """
+        self.phase, self.low, self.high, self.text = phase, low, high, text
+        self.done, self.total, self.rate = 0, None, 0.0
+        # The first update sets the baseline, so resumed bytes do not count as throughput
+        self._sample_done = None
+        self._send(self.clock(), self.low, self._label(0))
+
+    def update(self, done: int, total: Optional[int] = None) -> bool:
+        """Record the phase counter; returns True when an event was emitted."""
+        self.done = done
+        if total:
+            self.total = total
+        now = self.clock()
+        if self._sample_done is None:
+            self._sample_time, self._sample_done = now, done
+        elapsed = now - self._last_time
+        if elapsed < self.interval:
+            return False
+        moved = done - self._last_done
+        if self.total and moved < self.min_delta * self.total and elapsed < HEARTBEAT:
+            return False
+        self._sample(now)
+        fraction = min(1.0, done / self.total) if self.total else 0.0
+        self._send(now, self.low + int(fraction * (self.high - self.low)), self._label(int(fraction * 100)))
+        return True
+
+    def step(self, percent: int, text: str) -> None:
+        """Emit a one-off event (phase boundaries, final steps), bypassing the cadence."""
+        self._send(self.clock(), percent, text, detail=False)
+
+    def finish_phase(self) -> None:
+        """Emit the end of the phase if the cadence held it back."""
+        if self.total and self._last_done < self.done:
+            now = self.clock()
+            self._sample(now)
+            self._send(now, self.high, self._label(100))
+
+    @property
+    def eta(self) -> Optional[int]:
+        """Seconds left in the phase at the smoothed rate, or None when unknown."""
+        if not self.total or self.rate <= 0:
+            return None
+        return max(0, int((self.total - self.done) / self.rate + 0.5))
+
+    def _label(self, percent: int) -> str:
+        return self.text.replace("{percent}", str(percent)) if self.text else self.phase
+
+    def _sample(self, now: float) -> None:
+        elapsed = now - self._sample_time
+        if self._sample_done is None or elapsed <= 0:
+            self._sample_time, self._sample_done = now, self.done
+            return
+        sample = max(0, self.done - self._sample_done) / elapsed
+        self.rate = sample if not self.rate else self.rate + self.smoothing * (sample - self.rate)
+        self._sample_time, self._sample_done = now, self.done
+
+    def _send(self, now: float, percent: int, text: str, detail: bool = True) -> None:
+        message: Dict[str, Any] = {"type": "progress", "progress": percent, "text": text}
+        if detail and self.phase:
+            message["phase"] = self.phase
+            message["done"] = self.done
+            message["total"] = self.total
+            message["bytes_per_second"] = int(self.rate)
+            message["eta"] = self.eta
+        self.emit(message)
+        self.emitted += 1
+        self._last_time = now
+        self._last_done = self.done
@@ -9,33 +9,25 @@ import json
 import sys
 import os
 
+from backend.utils.config_journal import default_config_path, update_executable
+
 def update_title(exe_path, new_title):
     """Met à jour le titre d'un exécutable dans config.json"""
     
-    # Chemin du fichier config.json
-    config_path = 'config.json'
+    # Chemin du fichier config.json (racine du projet, quel que soit le dossier courant)
+    config_path = default_config_path()
     
     try:
-        # Step 1: Read the JSON file
-        with open(config_path, 'r', encoding='utf-8') as file:
-            data = json.load(file)
+        if not os.path.exists(config_path):
+            raise FileNotFoundError(config_path)
         
-        # Step 2: Modify the data
-        found = False
-        for blender in data.get('blenders', []):
-            if blender.get('path') == exe_path:
-                blender['title'] = new_title
-                found = True
-                break
+        # Read, check and write in one transaction: retried if another script wrote in between
+        previous = update_executable(exe_path, {"title": new_title}, config_path)
         
-        if not found:
+        if previous is None:
             print(f'{{"success": false, "error": "Exécutable non trouvé: {exe_path}"}}')
             return
         
-        # Step 3: Write the updated data back to the file
-        with open(config_path, 'w', encoding='utf-8') as file:
-            json.dump(data, file, indent=2, ensure_ascii=False)
-        
         print(f'{{"success": true, "message": "Titre mis à jour avec succès"}}')
         
     except FileNotFoundError: